@@ -0,0 +1,217 @@
+"""Benchmark suite for the DataCleaning package with a stored baseline and regression threshold.
+
+Generates synthetic frames over a grid of row counts, widths, null ratios, categorical cardinalities
+and datetime mixes, times every pipeline step and the whole DataCleaningPipeline, and reports
+throughput and peak traced memory.
+
+Run from the repository root after `pip install -e .`:
+    python benchmarks/bench_data_cleaning.py --grid quick                       # print results
+    python benchmarks/bench_data_cleaning.py --grid quick --save-baseline       # record this machine's baseline
+    python benchmarks/bench_data_cleaning.py --grid quick --check               # exit 1 on a regression
+
+Timings only compare on the machine that produced them, so baselines are recorded per machine under
+benchmarks/baselines/ (not committed) together with a description of the machine. --check refuses,
+with exit status 2, to compare against a missing baseline or one recorded on another machine.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from DataCleaning.DataCleaningPipeline import DataCleaningPipeline
+from DataCleaning.PipelineProfiler import InMemoryMetricsSink
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+# Cases whose dense one-hot block (rows x categorical columns x cardinality float64s) would exceed this
+# run with sparse_encoding=True, e.g. cardinality 50_000 at a million rows would need hundreds of GB
+DENSE_ONEHOT_LIMIT_BYTES = 1 << 30
+
+# rows, (numeric, categorical) widths, null ratios, categorical cardinalities, datetime columns
+GRIDS = {
+    "quick": {
+        "rows": [1_000, 10_000, 100_000],
+        "widths": [(8, 2)],
+        "null_ratios": [0.0, 0.1],
+        "cardinalities": [10, 200],
+        "datetime_columns": [0, 3]
+    },
+    "full": {
+        "rows": [1_000, 10_000, 100_000, 1_000_000, 10_000_000],
+        "widths": [(8, 2), (64, 8)],
+        "null_ratios": [0.0, 0.1, 0.5],
+        "cardinalities": [10, 1_000, 50_000],
+        "datetime_columns": [0, 3]
+    }
+}
+
+def make_frame(rows: int, numeric_columns: int, categorical_columns: int, null_ratio: float,
+               cardinality: int, datetime_columns: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for i in range(numeric_columns):
+        values = rng.normal(size=rows)
+        if null_ratio:
+            values[rng.random(rows) < null_ratio] = np.nan
+        columns[f'numeric_{i}'] = values
+    categories = np.array([f'category_{i}' for i in range(cardinality)], dtype=object)
+    for i in range(categorical_columns):
+        values = categories[rng.integers(0, cardinality, rows)]
+        if null_ratio:
+            values[rng.random(rows) < null_ratio] = None
+        columns[f'categorical_{i}'] = values
+    start = np.datetime64('2020-01-01', 'ns')
+    for i in range(datetime_columns):
+        offsets = rng.integers(0, 4 * 365 * 24 * 3600, rows).astype('timedelta64[s]')
+        # Alternate between naive datetimes, tz-aware datetimes and timedeltas
+        kind = i % 3
+        if kind == 0:
+            columns[f'datetime_{i}'] = pd.Series(start + offsets)
+        elif kind == 1:
+            columns[f'datetime_{i}'] = pd.Series(start + offsets).dt.tz_localize('UTC')
+        else:
+            columns[f'timedelta_{i}'] = pd.Series(offsets.astype('timedelta64[ns]'))
+    return pd.DataFrame(columns)
+
+def needs_sparse_encoding(rows: int, widths, cardinality: int) -> bool:
+    return rows * widths[1] * min(cardinality, rows) * 8 > DENSE_ONEHOT_LIMIT_BYTES
+
+def case_name(rows, widths, null_ratio, cardinality, datetime_columns) -> str:
+    name = f"rows={rows}/width={widths[0]}+{widths[1]}/nulls={null_ratio}/card={cardinality}/dates={datetime_columns}"
+    return name + "/sparse" if needs_sparse_encoding(rows, widths, cardinality) else name
+
+def run_case(data: pd.DataFrame, repeats: int, sparse_encoding: bool = False) -> dict:
+    step_times = {}
+    pipeline_times = []
+    for _ in range(repeats):
+        sink = InMemoryMetricsSink()
+        pipeline = DataCleaningPipeline(sparse_encoding=sparse_encoding, metrics_sink=sink)
+        # Timings are taken without tracemalloc, whose overhead would dominate the small cases
+        pipeline.profiler.track_memory = False
+        start = time.perf_counter()
+        pipeline.process(data.copy())
+        pipeline_times.append(time.perf_counter() - start)
+        for metrics in sink.metrics:
+            step_times.setdefault(metrics.step, []).append(metrics.wall_seconds)
+
+    tracemalloc.start()
+    DataCleaningPipeline(sparse_encoding=sparse_encoding).process(data.copy())
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    pipeline_seconds = statistics.median(pipeline_times)
+    return {
+        "pipeline_seconds": pipeline_seconds,
+        "rows_per_second": len(data) / pipeline_seconds,
+        "step_seconds": {step: statistics.median(times) for step, times in step_times.items()},
+        "peak_memory_bytes": peak_memory,
+        "input_bytes": int(data.memory_usage(deep=True).sum())
+    }
+
+def run_grid(grid: dict, repeats: int) -> dict:
+    results = {}
+    for rows, widths, null_ratio, cardinality, datetime_columns in itertools.product(
+            grid["rows"], grid["widths"], grid["null_ratios"], grid["cardinalities"], grid["datetime_columns"]):
+        name = case_name(rows, widths, null_ratio, cardinality, datetime_columns)
+        data = make_frame(rows, widths[0], widths[1], null_ratio, min(cardinality, rows), datetime_columns)
+        results[name] = run_case(data, repeats, needs_sparse_encoding(rows, widths, cardinality))
+        result = results[name]
+        print(f"{name:<70} {result['pipeline_seconds']:9.4f}s {result['rows_per_second']:14,.0f} rows/s "
+              f"peak {result['peak_memory_bytes'] / 2 ** 20:9.1f} MiB", file=sys.stderr)
+    return results
+
+def find_regressions(results: dict, baseline: dict, threshold: float, min_seconds: float) -> list:
+    """Cases or steps that got slower than baseline * (1 + threshold) by more than min_seconds, or use more memory."""
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]
+        timings = [("pipeline", result["pipeline_seconds"], expected["pipeline_seconds"])]
+        timings += [(step, seconds, expected["step_seconds"].get(step)) for step, seconds in result["step_seconds"].items()]
+        for label, seconds, expected_seconds in timings:
+            if expected_seconds is None:
+                continue
+            if seconds > expected_seconds * (1 + threshold) and seconds - expected_seconds > min_seconds:
+                regressions.append(f"{name} {label}: {seconds:.4f}s vs baseline {expected_seconds:.4f}s")
+        if result["peak_memory_bytes"] > expected["peak_memory_bytes"] * (1 + threshold):
+            regressions.append(f"{name} peak memory: {result['peak_memory_bytes']:,} bytes "
+                               f"vs baseline {expected['peak_memory_bytes']:,} bytes")
+    return regressions
+
+def machine_description() -> dict:
+    """What a baseline's timings depend on besides the code: host, hardware and library versions."""
+    return {
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__
+    }
+
+def default_baseline_path(grid: str, machine: dict) -> str:
+    machine_id = hashlib.blake2b(json.dumps(machine, sort_keys=True).encode(), digest_size=6).hexdigest()
+    return os.path.join(BASELINE_DIR, f"baseline_{grid}.{machine['host']}.{machine_id}.json")
+
+def load_baseline(path: str, machine: dict) -> dict:
+    """The results of the baseline at path; exits with status 2 if it is missing or from another machine."""
+    if not os.path.exists(path):
+        print(f"No baseline recorded on this machine at {path}. Record one with --save-baseline first.",
+              file=sys.stderr)
+        sys.exit(2)
+    with open(path, 'r') as file:
+        baseline = json.load(file)
+    if baseline.get("machine") != machine:
+        print(f"The baseline at {path} was recorded on another machine ({baseline.get('machine', 'unknown')}), "
+              f"this is {machine}. Record one here with --save-baseline.", file=sys.stderr)
+        sys.exit(2)
+    return baseline["results"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", choices=sorted(GRIDS), default="quick")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--baseline",
+                        help="Baseline file (default: benchmarks/baselines/baseline_<grid>.<host>.<machine id>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if any case regressed")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative slowdown (default 0.25)")
+    parser.add_argument("--min-seconds", type=float, default=0.01,
+                        help="Slowdowns smaller than this are treated as noise (default 0.01)")
+    args = parser.parse_args()
+
+    machine = machine_description()
+    baseline_path = args.baseline or default_baseline_path(args.grid, machine)
+    # Fail before the run rather than after it
+    baseline = load_baseline(baseline_path, machine) if args.check else None
+    results = run_grid(GRIDS[args.grid], args.repeats)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(baseline_path)), exist_ok=True)
+        with open(baseline_path, 'w') as file:
+            json.dump({"machine": machine, "results": results}, file, indent=4)
+        print(f"Baseline written to {baseline_path}", file=sys.stderr)
+        return
+
+    print(json.dumps(results, indent=4))
+    if args.check:
+        regressions = find_regressions(results, baseline, args.threshold, args.min_seconds)
+        if regressions:
+            print("\nPERFORMANCE REGRESSION", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+        print("No performance regressions against the baseline.", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Hybrid (BM25 candidates reranked by embedding) dataset search against pure embedding search.
+
+Builds a synthetic catalog of dataset descriptions and searches it with near-exact phrases such as
+"NBA player stats 2023", each written from one catalog entry. Reports per-query latency of
+search_top_k (pure embedding) and search_hybrid, with an empty and a warm query-embedding cache,
+and recall: how often the source entry is the top result, and how much of the pure-embedding
+top 5 the hybrid top 5 recovers.
+
+Uses the sentence-transformers model when it can be loaded, else a hashed bag-of-words encoder
+(numbers then exclude the model's forward pass; its cost is what the query cache saves).
+
+Run from the repository root after `pip install -e .`:
+    python benchmarks/bench_hybrid_search.py [datasets] [queries]
+"""
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from DataStorage.DatasetMetadata import DatasetMetadata
+
+TOP_K = 5
+LEAGUES = ["NBA", "NFL", "MLB", "NHL", "Premier League", "La Liga", "Serie A", "Bundesliga", "WNBA", "MLS"]
+SUBJECTS = ["player stats", "team standings", "game results", "injury reports", "betting odds", "salaries",
+            "draft picks", "play by play", "box scores", "attendance", "transfers", "referee assignments"]
+GRAINS = ["per game", "per season", "per week", "by venue", "by team", "by player"]
+
+class HashingEncoder:
+    """Unit-length hashed bag of words, a stand-in when the real model cannot be downloaded."""
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True):
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, zlib.crc32(word.encode()) % self.dimension] += 1.0
+        return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+def _timed_per_query(function, queries):
+    start = time.perf_counter()
+    results = [function(query) for query in queries]
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = np.random.default_rng(0)
+    datasets = []
+    for i in range(size):
+        league, subject, grain = LEAGUES[i % len(LEAGUES)], SUBJECTS[rng.integers(len(SUBJECTS))], GRAINS[rng.integers(len(GRAINS))]
+        year = int(rng.integers(1990, 2025))
+        datasets.append({"id": f"{league}_{subject}_{year}_{i}".lower().replace(" ", "_"),
+                         "description": f"{league} {subject} {grain} for the {year} season",
+                         "data_source": "api", "data_link": ""})
+    sources = rng.choice(size, n_queries, replace=False)
+    queries = [" ".join(datasets[i]["description"].split()[:-3] + [datasets[i]["description"].split()[-2]])
+               for i in sources]
+
+    try:
+        DatasetMetadata.similarity_model.encode(["warm up"])
+        encoder = DatasetMetadata.SIMILARITY_MODEL_NAME
+    except Exception:
+        DatasetMetadata.similarity_model = HashingEncoder()
+        encoder = "hashed bag of words"
+
+    with tempfile.TemporaryDirectory() as directory:
+        DatasetMetadata.set_metadata_file(f"{directory}/metadata.json")
+        start = time.perf_counter()
+        DatasetMetadata.add_datasets(datasets)
+        print(f"{size:,} datasets, {n_queries} queries, encoder: {encoder}; indexed in {time.perf_counter() - start:.1f}s")
+
+        DatasetMetadata.QUERY_CACHE_SIZE = 0
+        dense, dense_ms = _timed_per_query(lambda query: DatasetMetadata.search_top_k(query, TOP_K), queries)
+        hybrid, hybrid_ms = _timed_per_query(lambda query: DatasetMetadata.search_hybrid(query, TOP_K), queries)
+        DatasetMetadata.QUERY_CACHE_SIZE = 1024
+        DatasetMetadata.encode_queries(queries)
+        _, dense_cached_ms = _timed_per_query(lambda query: DatasetMetadata.search_top_k(query, TOP_K), queries)
+        _, hybrid_cached_ms = _timed_per_query(lambda query: DatasetMetadata.search_hybrid(query, TOP_K), queries)
+        start = time.perf_counter()
+        DatasetMetadata.encode_descriptions(queries)
+        encode_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+        def recall_at_1(results):
+            return np.mean([bool(matches) and matches[0][0]["id"] == datasets[i]["id"] for matches, i in zip(results, sources)])
+        overlap = np.mean([len({d["id"] for d, _ in h} & {d["id"] for d, _ in e}) / TOP_K for h, e in zip(hybrid, dense)])
+        print(f"  query embedding (batched)           {encode_ms:7.2f} ms/query")
+        print(f"  search_top_k, no query cache        {dense_ms:7.2f} ms/query  source@1={recall_at_1(dense):.3f}")
+        print(f"  search_hybrid, no query cache       {hybrid_ms:7.2f} ms/query  source@1={recall_at_1(hybrid):.3f}  "
+              f"overlap with search_top_k@{TOP_K}={overlap:.3f}")
+        print(f"  search_top_k, cached query          {dense_cached_ms:7.2f} ms/query")
+        print(f"  search_hybrid, cached query         {hybrid_cached_ms:7.2f} ms/query")
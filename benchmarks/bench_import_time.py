@@ -0,0 +1,39 @@
+"""Import time of the modules that pull in DatasetMetadata, each in a fresh interpreter.
+
+Reports the best of a few wall-clock runs and whether the import left sentence_transformers (and
+so torch) loaded. Modules whose own dependencies are missing are reported as failing.
+
+Run from the repository root after `pip install -e .`:
+    python benchmarks/bench_import_time.py [repeats]
+"""
+import os
+import subprocess
+import sys
+import time
+
+MODULES = ['DataStorage.DatasetMetadata', 'DataCollection.DataGatherer', 'Entry.Entry']
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+def import_time(module: str, repeats: int):
+    code = f"import sys, {module}; print('sentence_transformers' in sys.modules)"
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(SRC))
+    best, loaded = float('inf'), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        best, loaded = min(best, elapsed), result.stdout.strip()
+    return best, loaded
+
+if __name__ == "__main__":
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    baseline, _ = import_time('json', repeats)
+    print(f"interpreter start-up: {baseline:.2f}s")
+    for module in MODULES:
+        seconds, detail = import_time(module, repeats)
+        if seconds is None:
+            print(f"  {module:<30} failed: {detail}")
+        else:
+            print(f"  {module:<30} {seconds:6.2f}s  sentence_transformers imported: {detail}")
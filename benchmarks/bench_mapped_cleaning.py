@@ -0,0 +1,67 @@
+"""Peak resident memory of DataCleaner.clean_mapped_dataset against the size of the dataset on disk.
+
+Writes a synthetic dataset of memory-mapped column files block by block, then cleans it in a fresh
+process and reports that process's peak RSS next to the size of one column and of the whole dataset.
+
+Run from the repository root after `pip install -e .`:
+    python benchmarks/bench_mapped_cleaning.py [rows] [numeric columns]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from DataCleaning.DataCleaner import DataCleaner
+from DataCleaning.MappedDataset import MappedDataset, MappedDatasetWriter
+
+CATEGORIES = [f'category_{i}' for i in range(20)]
+
+def write_dataset(directory: str, rows: int, numeric_columns: int, block_rows: int = 1_000_000):
+    rng = np.random.default_rng(0)
+    writer = MappedDatasetWriter(directory, rows, categories={'category': CATEGORIES})
+    for start in range(0, rows, block_rows):
+        n = min(block_rows, rows - start)
+        block = pd.DataFrame({f'x{i}': rng.normal(size=n) for i in range(numeric_columns)},
+                             index=pd.RangeIndex(start, start + n))
+        block.loc[block.index[::10], 'x0'] = np.nan
+        block['category'] = rng.choice(CATEGORIES, n).astype(object)
+        writer.write(start, block)
+    writer.close()
+
+def clean(source: str, output: str):
+    start = time.perf_counter()
+    DataCleaner().clean_mapped_dataset(source, output)
+    seconds = time.perf_counter() - start
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{seconds:.3f} {peak_mib:.1f}")
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--clean"]:
+        clean(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    numeric_columns = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with tempfile.TemporaryDirectory() as directory:
+        source, output = os.path.join(directory, "raw"), os.path.join(directory, "clean")
+        write_dataset(source, rows, numeric_columns)
+        dataset_mib = MappedDataset(source).nbytes / 1024 ** 2
+        # A fresh process so the peak RSS only covers the cleaning itself
+        result = subprocess.run([sys.executable, __file__, "--clean", source, output],
+                                capture_output=True, text=True, check=True)
+        seconds, peak_mib = map(float, result.stdout.split()[-2:])
+        baseline = subprocess.run([sys.executable, "-c", "import resource, DataCleaning.DataCleaner; "
+                                   "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)"],
+                                  capture_output=True, text=True, check=True)
+        import_mib = float(baseline.stdout.split()[-1])
+
+    print(f"rows={rows:,} columns={numeric_columns + 1}")
+    print(f"dataset on disk:          {dataset_mib:10.1f} MiB")
+    print(f"one float64 column:       {rows * 8 / 1024 ** 2:10.1f} MiB")
+    print(f"peak RSS after imports:   {import_mib:10.1f} MiB")
+    print(f"peak RSS while cleaning:  {peak_mib:10.1f} MiB ({seconds:.2f}s)")
@@ -0,0 +1,58 @@
+"""Reading a local raw dataset from JSON against its memory-mapped columnar copy.
+
+Times json.load + DataFrame construction, the one-off conversion, a full columnar read, a
+projected read filtered to one team and one season, and the first chunk of iter_chunks.
+
+Run from the repository root after `pip install -e .`:
+    python benchmarks/bench_raw_data.py [rows]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from DataStorage.RawDataStore import RawDataStore
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = np.random.default_rng(0)
+    teams = np.array([f"team_{i}" for i in range(30)])
+    records = pd.DataFrame({
+        "team": teams[rng.integers(30, size=rows)],
+        "date": (pd.Timestamp("2000-01-01") + pd.to_timedelta(rng.integers(0, 9000, size=rows), unit='D')).strftime('%Y-%m-%d'),
+        "points": rng.integers(70, 140, size=rows),
+        "rebounds": rng.integers(20, 70, size=rows),
+        "minutes": rng.normal(240, 5, size=rows),
+    }).to_dict("records")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "games.json")
+        with open(path, 'w') as file:
+            json.dump(records, file)
+        del records
+
+        def parse_json():
+            with open(path, 'r') as file:
+                return pd.DataFrame(json.load(file))
+        _, json_seconds = _timed(parse_json)
+        store = RawDataStore()
+        _, convert_seconds = _timed(lambda: store.convert(path))
+        _, full_seconds = _timed(lambda: store.read(path))
+        _, first_chunk_seconds = _timed(lambda: next(store.iter_chunks(path, chunk_rows=10_000)))
+        data, filtered_seconds = _timed(lambda: store.read(path, columns=["date", "points"],
+                                                           filters={"team": "team_7"}, timeframe="2010"))
+        print(f"rows={rows:,} json={os.path.getsize(path) / 2 ** 20:.0f} MiB")
+        print(f"  json.load + DataFrame     {json_seconds:6.2f}s")
+        print(f"  one-off conversion        {convert_seconds:6.2f}s")
+        print(f"  columnar full read        {full_seconds:6.2f}s")
+        print(f"  team + season, 2 columns  {filtered_seconds:6.2f}s  ({len(data):,} rows)")
+        print(f"  first 10k-row chunk       {first_chunk_seconds:6.3f}s")
@@ -0,0 +1,78 @@
+"""Accuracy, memory and speed of the approximate statistics against their exact counterparts.
+
+For growing column sizes reports the heavy-hitter count error and mode agreement, the HyperLogLog
+distinct-count error and the quantile sketch rank error, each next to the exact computation.
+
+Run from the repository root after `pip install -e .`:
+    python benchmarks/bench_sketches.py [max rows]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from DataCleaning.Sketches import HeavyHitters, HyperLogLog, QuantileSketch
+
+CHUNK_ROWS = 1_000_000
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def _chunks(values, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(values), chunk_rows):
+        yield values[start:start + chunk_rows]
+
+def heavy_hitters(values: pd.Series, error: float = 0.001):
+    exact, exact_seconds = _timed(lambda: values.value_counts())
+
+    def sketch():
+        heavy = HeavyHitters(error)
+        for chunk in _chunks(values):
+            heavy.update(chunk)
+        return heavy
+    heavy, seconds = _timed(sketch)
+    max_error = (exact - heavy.counts.reindex(exact.index, fill_value=0)).max() / len(values)
+    print(f"  heavy hitters  error={max_error:.5f} (bound {error}) mode ok={heavy.counts.idxmax() == exact.idxmax()} "
+          f"counters={len(heavy.counts):,} vs {len(exact):,}  {seconds:.2f}s vs exact {exact_seconds:.2f}s")
+
+def distinct_count(values: pd.Series, error: float = 0.01):
+    exact, exact_seconds = _timed(lambda: values.nunique())
+
+    def sketch():
+        hll = HyperLogLog(error)
+        for chunk in _chunks(values):
+            hll.update(chunk)
+        return hll
+    hll, seconds = _timed(sketch)
+    print(f"  hyperloglog    error={abs(hll.estimate() - exact) / exact:.5f} (std {error}) "
+          f"bytes={hll.registers.nbytes:,}  {seconds:.2f}s vs exact {exact_seconds:.2f}s")
+
+def quantiles(values: np.ndarray, error: float = 0.001):
+    q = np.linspace(0.01, 0.99, 99)
+    ordered, exact_seconds = _timed(lambda: np.sort(values))
+
+    def sketch():
+        quantile_sketch = QuantileSketch(error)
+        for chunk in _chunks(values):
+            quantile_sketch.update(chunk)
+        return quantile_sketch
+    quantile_sketch, seconds = _timed(sketch)
+    ranks = np.searchsorted(ordered, quantile_sketch.quantile(q)) / len(values)
+    items = sum(level.size for level in quantile_sketch.levels)
+    print(f"  quantiles      rank error={np.max(np.abs(ranks - q)):.5f} (bound {error}) "
+          f"items={items:,}  {seconds:.2f}s vs exact sort {exact_seconds:.2f}s")
+
+if __name__ == "__main__":
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    rng = np.random.default_rng(0)
+    rows = 100_000
+    while rows <= max_rows:
+        print(f"rows={rows:,}")
+        categories = pd.Series(rng.zipf(1.2, rows) % 10_000_000).astype(str)
+        heavy_hitters(categories)
+        distinct_count(categories)
+        quantiles(rng.lognormal(size=rows))
+        rows *= 10
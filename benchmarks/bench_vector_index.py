@@ -0,0 +1,52 @@
+"""Recall, query latency and memory of the vector indexes behind dataset search against exact search.
+
+Vectors are unit-length and clustered like sentence embeddings of related descriptions. Recall@k is
+the share of the exact top k each index returns.
+
+Run from the repository root after `pip install -e .`:
+    python benchmarks/bench_vector_index.py [rows] [dimension]
+"""
+import sys
+import time
+
+import numpy as np
+
+from DataStorage.VectorIndex import BruteForceIndex, IVFIndex
+
+TOP_K = 10
+QUERIES = 200
+
+def clustered_vectors(rows: int, dimension: int, clusters: int, rng) -> np.ndarray:
+    centers = rng.normal(size=(clusters, dimension))
+    vectors = centers[rng.integers(clusters, size=rows)] + 1.5 * rng.normal(size=(rows, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def evaluate(name: str, index, keys, vectors, queries, exact):
+    start = time.perf_counter()
+    index.add(keys, vectors)
+    build_seconds = time.perf_counter() - start
+
+    hits = 0
+    start = time.perf_counter()
+    for query, expected in zip(queries, exact):
+        hits += len(expected & {key for key, _ in index.search(query, TOP_K)})
+    latency_ms = (time.perf_counter() - start) / len(queries) * 1000
+    print(f"  {name:<28} recall@{TOP_K}={hits / (TOP_K * len(queries)):.3f}  {latency_ms:7.2f} ms/query  "
+          f"build {build_seconds:6.2f}s  {index.nbytes / 2 ** 20:7.1f} MiB")
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    dimension = int(sys.argv[2]) if len(sys.argv) > 2 else 384
+    rng = np.random.default_rng(0)
+    vectors = clustered_vectors(rows, dimension, clusters=max(10, rows // 200), rng=rng)
+    keys = [f"dataset_{i}" for i in range(rows)]
+    queries = vectors[rng.choice(rows, QUERIES, replace=False)] + 0.1 * rng.normal(size=(QUERIES, dimension))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    exact = [{keys[i] for i in np.argsort(-(vectors @ query))[:TOP_K]} for query in queries]
+
+    print(f"rows={rows:,} dimension={dimension}")
+    for quantization in ['float32', 'float16', 'int8']:
+        evaluate(f"brute force {quantization}", BruteForceIndex(quantization), keys, vectors, queries, exact)
+    for n_probe in [4, 8, 16, 32]:
+        evaluate(f"ivf n_probe={n_probe}", IVFIndex(n_probe=n_probe), keys, vectors, queries, exact)
+    evaluate("ivf n_probe=16 int8", IVFIndex(n_probe=16, quantization='int8'), keys, vectors, queries, exact)
@@ -0,0 +1,46 @@
+"""Storage growth of VersionStore when a dataset is committed again after small edits.
+
+Commits a base version, then versions with a few rows appended, a few rows inserted in the middle
+and one value edited, and reports the bytes each version added against a full copy.
+
+Run from the repository root after `pip install -e .`:
+    python benchmarks/bench_versions.py [rows]
+"""
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from DataStorage.VersionStore import VersionStore
+
+def _games(rows, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "team": np.array([f"team_{i}" for i in range(30)])[rng.integers(30, size=rows)],
+        "points": rng.integers(70, 140, size=rows),
+        "minutes": rng.normal(240, 5, size=rows),
+    })
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    base = _games(rows, 0)
+    appended = pd.concat([base, _games(1000, 1)], ignore_index=True)
+    inserted = pd.concat([appended.iloc[:rows // 2], _games(100, 2), appended.iloc[rows // 2:]], ignore_index=True)
+    edited = inserted.copy()
+    edited.loc[rows // 4, "points"] = 0
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = VersionStore(directory)
+        full = None
+        for name, data in [("base", base), ("+1000 rows at end", appended),
+                           ("+100 rows in middle", inserted), ("1 value edited", edited)]:
+            start = time.perf_counter()
+            version = store.commit("games", data)
+            seconds = time.perf_counter() - start
+            written = store.manifest("games", version)["bytes_written"]
+            full = full or written
+            print(f"  {name:22s} {seconds:6.2f}s  wrote {written / 2 ** 20:7.2f} MiB ({written / full:6.1%} of a full copy)")
+        print(f"  diff v1..v4: {store.diff('games', 1)}")
+        print(f"  total stored {store.nbytes / 2 ** 20:.2f} MiB for 4 versions")
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing_extensions import Dict, Optional, Tuple
+
+# Bump when the on-disk layout changes so stale entries are never read back
+CACHE_FORMAT_VERSION = 1
+
+class CleaningCache:
+    """Content-addressed on-disk cache of cleaned DataFrames.
+
+    Entries are keyed by a hash of the input's contents and schema together with the pipeline
+    configuration. Each entry is a directory holding one .npy file per dense column, which is
+    memory-mapped back on a hit, a CSC matrix for the SparseDtype columns and the fitted pipeline.
+    Entries older than max_age_seconds are dropped and the least recently used ones are evicted
+    once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = 10 * 1024 ** 3,
+                 max_age_seconds: Optional[float] = 7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(data: pd.DataFrame, config: Dict) -> Optional[str]:
+        """Cache key of data cleaned with config, or None if data holds unhashable cells such as dicts or lists."""
+        try:
+            row_hashes = pd.util.hash_pandas_object(data, index=True).to_numpy()
+        except TypeError:
+            return None
+        digest = hashlib.blake2b(digest_size=20)
+        schema = {
+            "version": CACHE_FORMAT_VERSION,
+            "columns": [str(col) for col in data.columns],
+            "dtypes": [str(dtype) for dtype in data.dtypes],
+            "config": config
+        }
+        digest.update(json.dumps(schema, sort_keys=True, default=str).encode())
+        digest.update(row_hashes.tobytes())
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str) -> Optional[Tuple[object, pd.DataFrame]]:
+        """Return (fitted pipeline, cleaned data) for key, or None on a miss."""
+        entry_path = self._entry_path(key)
+        meta_path = os.path.join(entry_path, "meta.json")
+        if not os.path.exists(meta_path) or self._is_expired(entry_path):
+            self.misses += 1
+            return None
+
+        with open(meta_path, 'r') as file:
+            meta = json.load(file)
+        pipeline = joblib.load(os.path.join(entry_path, "pipeline.joblib"))
+        data = _read_frame(entry_path, meta)
+        # Touch the entry so eviction sees it as recently used
+        os.utime(meta_path)
+        self.hits += 1
+        return pipeline, data
+
+    def put(self, key: str, data: pd.DataFrame, pipeline: object):
+        entry_path = self._entry_path(key)
+        staging_path = tempfile.mkdtemp(dir=self.cache_dir, prefix=".staging-")
+        try:
+            joblib.dump(pipeline, os.path.join(staging_path, "pipeline.joblib"))
+            _write_frame(staging_path, data)
+            # The entry only becomes visible once it is complete
+            if os.path.exists(entry_path):
+                shutil.rmtree(entry_path)
+            os.rename(staging_path, entry_path)
+        except Exception:
+            shutil.rmtree(staging_path, ignore_errors=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            entry_path = os.path.join(self.cache_dir, name)
+            if name.startswith(".") or not os.path.isdir(entry_path):
+                continue
+            if self._is_expired(entry_path):
+                shutil.rmtree(entry_path, ignore_errors=True)
+                continue
+            entries.append((_last_used(entry_path), _directory_size(entry_path), entry_path))
+
+        if self.max_bytes is None:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def _is_expired(self, entry_path: str) -> bool:
+        return self.max_age_seconds is not None and time.time() - _last_used(entry_path) > self.max_age_seconds
+
+def _last_used(entry_path: str) -> float:
+    meta_path = os.path.join(entry_path, "meta.json")
+    return os.path.getmtime(meta_path if os.path.exists(meta_path) else entry_path)
+
+def _directory_size(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+def _write_frame(path: str, data: pd.DataFrame):
+    columns = []
+    sparse_columns = []
+    for i, (name, dtype) in enumerate(data.dtypes.items()):
+        values = data.iloc[:, i]
+        if isinstance(dtype, pd.SparseDtype) and dtype.fill_value != 0:
+            # Only zero-filled columns fit a scipy matrix; anything else is densified and re-sparsified on read
+            np.save(os.path.join(path, f"{i}.npy"), values.sparse.to_dense().to_numpy())
+            columns.append({"name": name, "kind": "densified", "dtype": str(dtype.subtype),
+                            "fill_value": dtype.fill_value})
+        elif isinstance(dtype, pd.SparseDtype):
+            sparse_columns.append(i)
+            columns.append({"name": name, "kind": "sparse", "dtype": str(dtype.subtype)})
+        elif isinstance(dtype, np.dtype) and dtype != object:
+            np.save(os.path.join(path, f"{i}.npy"), values.to_numpy())
+            columns.append({"name": name, "kind": "dense", "dtype": str(dtype)})
+        elif isinstance(values.array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+            # Nullable numeric columns: the values and the mask are stored side by side
+            np.save(os.path.join(path, f"{i}.npy"), values.to_numpy(dtype=dtype.numpy_dtype, na_value=0))
+            np.save(os.path.join(path, f"{i}.mask.npy"), values.isna().to_numpy())
+            columns.append({"name": name, "kind": "masked", "dtype": str(dtype)})
+        else:
+            np.save(os.path.join(path, f"{i}.npy"), values.to_numpy(dtype=object), allow_pickle=True)
+            columns.append({"name": name, "kind": "object", "dtype": str(dtype)})
+
+    if sparse_columns:
+        sparse.save_npz(os.path.join(path, "sparse.npz"), data.iloc[:, sparse_columns].sparse.to_coo().tocsc())
+
+    if isinstance(data.index, pd.RangeIndex):
+        index = {"start": data.index.start, "stop": data.index.stop, "step": data.index.step}
+    else:
+        np.save(os.path.join(path, "index.npy"), data.index.to_numpy(), allow_pickle=True)
+        index = None
+
+    with open(os.path.join(path, "meta.json"), 'w') as file:
+        json.dump({"columns": columns, "sparse_columns": sparse_columns, "range_index": index}, file)
+
+def _load_mapped(file_path: str) -> np.ndarray:
+    # Copy-on-write mapping: pages are read lazily and in-place edits stay private to this process.
+    # The plain ndarray view hides the memmap subclass from pandas without copying.
+    return np.load(file_path, mmap_mode='c').view(np.ndarray)
+
+def _read_frame(path: str, meta: Dict) -> pd.DataFrame:
+    if meta["range_index"] is not None:
+        index = pd.RangeIndex(**meta["range_index"])
+    else:
+        index = pd.Index(np.load(os.path.join(path, "index.npy"), allow_pickle=True))
+
+    sparse_block = None
+    if meta["sparse_columns"]:
+        sparse_block = pd.DataFrame.sparse.from_spmatrix(sparse.load_npz(os.path.join(path, "sparse.npz")), index=index)
+
+    arrays = {}
+    for i, column in enumerate(meta["columns"]):
+        if column["kind"] == "dense":
+            arrays[i] = _load_mapped(os.path.join(path, f"{i}.npy"))
+        elif column["kind"] == "masked":
+            values = _load_mapped(os.path.join(path, f"{i}.npy"))
+            mask = _load_mapped(os.path.join(path, f"{i}.mask.npy"))
+            array_type = pd.api.types.pandas_dtype(column["dtype"]).construct_array_type()
+            arrays[i] = array_type(values, mask)
+        elif column["kind"] == "densified":
+            arrays[i] = pd.arrays.SparseArray(np.load(os.path.join(path, f"{i}.npy")), fill_value=column["fill_value"])
+        elif column["kind"] == "sparse":
+            arrays[i] = sparse_block.iloc[:, meta["sparse_columns"].index(i)].array
+        else:
+            arrays[i] = np.load(os.path.join(path, f"{i}.npy"), allow_pickle=True)
+
+    # copy=False keeps one block per column so the memory maps are not consolidated into a new array
+    data = pd.DataFrame(arrays, index=index, copy=False)
+    data.columns = [column["name"] for column in meta["columns"]]
+    return data
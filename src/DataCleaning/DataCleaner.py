@@ -1,12 +1,81 @@
 import pandas as pd
+from typing_extensions import Callable, Iterable, Iterator, Optional, Union
 
+from DataCleaning.CleaningCache import CleaningCache
 from DataCleaning.DataCleaningPipeline import DataCleaningPipeline
+from DataCleaning.MappedDataset import MappedDataset, MappedDatasetWriter
 
 class DataCleaner:
-    def __init__(self):
-        self.data_cleaning_pipeline = DataCleaningPipeline()
+    def __init__(self, data_cleaning_pipeline: Optional[DataCleaningPipeline] = None,
+                 cache: Optional[CleaningCache] = None):
+        self.data_cleaning_pipeline = data_cleaning_pipeline or DataCleaningPipeline()
+        # When set, cleaning an unchanged dataset with an unchanged configuration is served from disk
+        self.cache = cache
+
+    @classmethod
+    def from_fitted_pipeline(cls, file_path: str) -> 'DataCleaner':
+        return cls(DataCleaningPipeline.load(file_path))
 
     def clean_data(self, raw_data: pd.DataFrame) -> pd.DataFrame:
         print('Cleaning data...')
 
-        return self.data_cleaning_pipeline.process(raw_data)
\ No newline at end of file
+        # The key has to be taken before processing since the steps modify raw_data in place
+        key = self.cache.key(raw_data, self.data_cleaning_pipeline.get_config()) if self.cache is not None else None
+        if key is None:
+            # No cache, or contents (e.g. nested JSON values) that cannot be hashed into a key
+            return self.data_cleaning_pipeline.process(raw_data)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            fitted, cleaned_data = cached
+            # Pipelines are cached without their profiler, so the caller's metrics sink is carried over
+            fitted.profiler = self.data_cleaning_pipeline.profiler
+            self.data_cleaning_pipeline = fitted
+            return cleaned_data
+
+        cleaned_data = self.data_cleaning_pipeline.process(raw_data)
+        self.cache.put(key, cleaned_data, self.data_cleaning_pipeline)
+        return cleaned_data
+
+    def fit(self, raw_data: pd.DataFrame) -> 'DataCleaner':
+        self.data_cleaning_pipeline.fit(raw_data)
+        return self
+
+    def transform(self, raw_data: pd.DataFrame) -> pd.DataFrame:
+        print('Cleaning data with fitted pipeline...')
+
+        return self.data_cleaning_pipeline.transform(raw_data)
+
+    def clean_data_stream(self, chunk_source: Callable[[], Iterable[pd.DataFrame]]) -> Iterator[pd.DataFrame]:
+        """Clean a dataset that does not fit in memory.
+
+        `chunk_source` is called twice and must return a fresh iterable of chunks each time, e.g.
+        `lambda: pd.read_csv(path, chunksize=100_000)`. The first pass fits the statistics,
+        the second yields cleaned chunks.
+        """
+        print('Cleaning data in chunks...')
+
+        self.data_cleaning_pipeline.fit_stream(chunk_source())
+        return self.data_cleaning_pipeline.transform_stream(chunk_source())
+
+    def clean_mapped_dataset(self, dataset: Union[MappedDataset, str], output_dir: str,
+                             block_rows: Optional[int] = None) -> MappedDataset:
+        """Clean a dataset stored as memory-mapped column files into new column files under output_dir.
+
+        Statistics are fitted in one pass and the cleaned blocks written in a second, each pass
+        reading `block_rows` rows at a time. The default block holds about one column's worth of
+        values, so memory stays near that plus the cleaned block whatever the dataset size.
+        """
+        print('Cleaning memory-mapped dataset...')
+
+        if not isinstance(dataset, MappedDataset):
+            dataset = MappedDataset(dataset)
+        block_rows = block_rows or dataset.default_block_rows
+
+        self.data_cleaning_pipeline.fit_stream(dataset.iter_blocks(block_rows))
+        writer = MappedDatasetWriter(output_dir, len(dataset))
+        # transform_stream casts every block to the same dtypes, so the column files sized from the first fit them all
+        blocks = self.data_cleaning_pipeline.transform_stream(dataset.iter_blocks(block_rows))
+        for start, block in zip(range(0, len(dataset), block_rows), blocks):
+            writer.write(start, block)
+        return writer.close()
@@ -1,21 +1,306 @@
+import functools
+
+import joblib
+import numpy as np
+import pandas as pd
+from typing_extensions import Callable, Dict, Iterable, Iterator, List, Optional
+
+from DataCleaning import ParallelExecution
+from DataCleaning.PipelineProfiler import PipelineProfiler, StepMetrics
+from DataCleaning.DataProfiler import DataProfile, DataProfiler, RowDeduplicator
 from DataCleaning.Encoder import Encoder
+from DataCleaning.ExecutionPlan import PIPELINE_STEPS, ExecutionPlan, PipelineSpec
+from DataCleaning.IncrementalStatistics import approximate_statistics_options
 from DataCleaning.MissingDataHandler import MissingDataHandler
 from DataCleaning.Normalizer import Normalizer
 
 class DataCleaningPipeline:
-    def __init__(self):
-        self.missing_data_handler = MissingDataHandler()
-        self.encoder = Encoder()
-        self.normalizer = Normalizer()
+    def __init__(self, sparse_encoding: bool = False, encoder_options: Optional[Dict] = None,
+                 downcast_float32: bool = False, n_jobs: int = 1,
+                 metrics_sink: Optional[Callable[[StepMetrics], None]] = None, profile_step: Optional[str] = None,
+                 fused: bool = False, columns: Optional[List[str]] = None, robust_scaling: bool = False,
+                 approximate_statistics: Optional[Dict] = None, deduplicate_rows: bool = False,
+                 steps: Optional[List[str]] = None, profile: bool = False):
+        if fused and n_jobs != 1:
+            raise ValueError("A fused DataCleaningPipeline runs in a single process, use n_jobs=1.")
+        # A subset of PIPELINE_STEPS ('impute', 'scale', 'encode'), e.g. ['impute'] to only fill missing values
+        self.pipeline_steps = list(steps) if steps is not None else list(PIPELINE_STEPS)
+        unknown = [step for step in self.pipeline_steps if step not in PIPELINE_STEPS]
+        if unknown:
+            raise ValueError(f"Unknown pipeline steps: {', '.join(unknown)}. Allowed steps are: {', '.join(PIPELINE_STEPS)}")
+        if set(self.pipeline_steps) != set(PIPELINE_STEPS) and not fused:
+            raise ValueError("Running a subset of the pipeline steps needs fused=True.")
+        self.sparse_encoding = sparse_encoding
+        # Halves the memory of the feature table by emitting float32 for scaled and encoded columns
+        self.downcast_float32 = downcast_float32
+        # Forwarded to Encoder, e.g. {'max_onehot_cardinality': 50, 'high_cardinality_strategy': 'frequency'}
+        self.encoder_options = dict(encoder_options or {})
+        # Median/IQR scaling instead of mean/standard deviation, robust to outliers
+        self.robust_scaling = robust_scaling
+        # Bounded-memory sketches (heavy hitters, HyperLogLog, quantiles) for huge columns instead of exact
+        # hash tables, e.g. {} for the default error bounds or {'heavy_hitters_error': 0.0001}
+        self.approximate_statistics = approximate_statistics
+        self.quantile_error = approximate_statistics_options(approximate_statistics)['quantile_error']
+        # Every step works column by column, so with n_jobs != 1 the columns are split into one shard per
+        # worker and each shard runs through its own pipeline in a process pool (-1 uses every core)
+        self.n_jobs = n_jobs
+        self.shard_pipelines = None
+        # With fused the steps are compiled into an ExecutionPlan that fits in one statistics pass and
+        # cleans every column in one pass; the output is the same as running the steps one after another
+        self.fused = fused
+        self.execution_plan = None
+        # Only these input columns are cleaned, the rest are dropped before any step reads them
+        self.columns = list(columns) if columns is not None else None
+        # The first stage optionally drops repeated rows (e.g. from overlapping API pages). With profile=True a
+        # full DataProfile (ranges, cardinalities, semantic types) is then computed as a profile_data step and
+        # handed to the steps; by default nothing is profiled and each step scans only what it needs itself
+        self.deduplicate_rows = deduplicate_rows
+        self.deduplicator = RowDeduplicator()
+        self.profile_data = profile
+        self.data_profiler = DataProfiler()
+        self.profile: Optional[DataProfile] = None
+        # Per-step timings, shapes and memory go to metrics_sink; profile_step names one step to run under cProfile
+        self.profiler = PipelineProfiler(metrics_sink, profile_step=profile_step) if metrics_sink else None
+        self._build_steps()
+        # Output dtypes every chunk of transform_stream is cast to, fixed by the first chunk after a fit
+        self.output_dtypes: Optional[pd.Series] = None
+        self.is_fitted = False
+
+    def __getstate__(self):
+        # Sinks are often lambdas or hold handles, neither of which belongs in a saved pipeline
+        state = self.__dict__.copy()
+        state['profiler'] = None
+        return state
+
+    def get_config(self) -> Dict:
+        return {
+            'sparse_encoding': self.sparse_encoding,
+            'encoder_options': self.encoder_options,
+            'downcast_float32': self.downcast_float32,
+            'columns': self.columns,
+            'robust_scaling': self.robust_scaling,
+            'approximate_statistics': self.approximate_statistics,
+            'deduplicate_rows': self.deduplicate_rows,
+            'steps': self.pipeline_steps
+        }
+
+    def _select_columns(self, data: pd.DataFrame) -> pd.DataFrame:
+        return data if self.columns is None else data[self.columns]
+
+    def plan(self, data: pd.DataFrame) -> ExecutionPlan:
+        """Compile this pipeline's configuration into an unfitted ExecutionPlan for the schema of `data`."""
+        spec = PipelineSpec(steps=list(self.pipeline_steps), columns=self.columns, sparse_encoding=self.sparse_encoding,
+                            downcast_float32=self.downcast_float32, encoder_options=self.encoder_options,
+                            robust_scaling=self.robust_scaling, approximate_statistics=self.approximate_statistics)
+        return ExecutionPlan.compile(spec, data)
+
+    def explain(self, data: pd.DataFrame) -> str:
+        """Describe how every column of `data` would be cleaned, using the fitted plan when there is one."""
+        if self.execution_plan is not None and self.execution_plan.input_columns == list(data.columns):
+            return self.execution_plan.explain()
+        return self.plan(data).explain()
+
+    def _fit_plan(self, data: pd.DataFrame) -> ExecutionPlan:
+        self.execution_plan = self.plan(data).fit(data)
+        # The plan's fitted steps replace the pipeline's, so save and output_layout keep working
+        self._set_steps(self.execution_plan.missing_data_handler, self.execution_plan.normalizer,
+                        self.execution_plan.encoder)
+        return self.execution_plan
+
+    def _fit_fused(self, data: pd.DataFrame) -> pd.DataFrame:
+        # Fitting a plan needs no transformed data, its statistics pass reads the raw columns
+        self._fit_plan(data)
+        return data
+
+    def _build_steps(self):
+        self._set_steps(MissingDataHandler(approximate_statistics=self.approximate_statistics),
+                        Normalizer(downcast_float32=self.downcast_float32, robust=self.robust_scaling,
+                                   quantile_error=self.quantile_error),
+                        Encoder(sparse_output=self.sparse_encoding, downcast_float32=self.downcast_float32,
+                                approximate_statistics=self.approximate_statistics, **self.encoder_options))
+
+    def _set_steps(self, missing_data_handler: MissingDataHandler, normalizer: Normalizer, encoder: Encoder):
+        self.missing_data_handler = missing_data_handler
+        self.normalizer = normalizer
+        self.encoder = encoder
         self.steps = [
             (self.missing_data_handler, 'handle_missing_data'),
             (self.normalizer, 'normalize'),
             (self.encoder, 'encode')
         ]
 
+    def _deduplicate(self, phase: str, data: pd.DataFrame) -> pd.DataFrame:
+        if not self.deduplicate_rows:
+            return data
+        return self._run_step('deduplicate_rows', phase, self.deduplicator.deduplicate, data)
+
+    def _profile(self, data: pd.DataFrame) -> pd.DataFrame:
+        self.profile = self.data_profiler.profile(data)
+        return data
+
+    def _profile_stage(self, phase: str, verb: str, data: pd.DataFrame) -> pd.DataFrame:
+        if not self.profile_data:
+            self.profile = None
+            return data
+        print(f'{verb} step: profile_data')
+        return self._run_step('profile_data', phase, self._profile, data)
+
+    def _profiled(self, step, method_name: str) -> Callable:
+        method = getattr(step, method_name)
+        # The encoder reads every column it encodes anyway, so only the other steps take the profile
+        if step is self.encoder or self.profile is None:
+            return method
+        return functools.partial(method, profile=self.profile)
+
     def process(self, data):
+        self.output_dtypes = None
+        data = self._deduplicate('process', data)
+        if self.fused:
+            self.shard_pipelines = None
+            data = self._run_step('fused_pipeline', 'process', lambda frame: self._fit_plan(frame).execute(frame), data)
+            self.is_fitted = True
+            return data
+        data = self._select_columns(data)
+        if self.n_jobs != 1:
+            # Steps run inside the workers, so the sharded run is reported as a single step
+            return self._run_step('sharded_pipeline', 'process', self._process_parallel, data)
+        self.shard_pipelines = None
+        data = self._profile_stage('process', 'Processing', data)
         for step, method_name in self.steps:
             print(f'Processing step: {method_name}')
-            method = getattr(step, method_name)
-            data = method(data)
-        return data
\ No newline at end of file
+            data = self._run_step(method_name, 'process', self._profiled(step, method_name), data)
+        self.is_fitted = True
+        return data
+
+    def fit(self, data):
+        self.output_dtypes = None
+        data = self._deduplicate('fit', data)
+        if self.fused:
+            self.shard_pipelines = None
+            self._run_step('fused_pipeline', 'fit', self._fit_fused, data)
+            self.is_fitted = True
+            return self
+        data = self._select_columns(data)
+        if self.n_jobs != 1:
+            self._build_shards(data)
+            fitted = ParallelExecution.run_sharded(ParallelExecution._fit_shard, data, self.shard_pipelines, self.n_jobs)
+            self.shard_pipelines = [(columns, pipeline) for (columns, _), pipeline in zip(self.shard_pipelines, fitted)]
+            self.is_fitted = True
+            return self
+        self.shard_pipelines = None
+        data = self._profile_stage('fit', 'Fitting', data)
+        # Each step is fitted on the output of the previous one, so the data has to flow through the transforms
+        for step, method_name in self.steps:
+            print(f'Fitting step: {method_name}')
+            data = self._run_step(method_name, 'fit', lambda frame: self._profiled(step.fit(frame), 'transform')(frame), data)
+        self.is_fitted = True
+        return self
+
+    def transform(self, data):
+        if not self.is_fitted:
+            raise ValueError("DataCleaningPipeline must be fitted before calling transform.")
+        data = self._deduplicate('transform', data)
+        if self.execution_plan is not None:
+            return self._run_step('fused_pipeline', 'transform', self.execution_plan.execute, data)
+        data = self._select_columns(data)
+        if self.shard_pipelines is not None:
+            return self._run_step('sharded_pipeline', 'transform', self._transform_parallel, data)
+        data = self._profile_stage('transform', 'Transforming', data)
+        for step, method_name in self.steps:
+            print(f'Transforming step: {method_name}')
+            data = self._run_step(method_name, 'transform', self._profiled(step, 'transform'), data)
+        return data
+
+    def _run_step(self, method_name: str, phase: str, function: Callable, data: pd.DataFrame) -> pd.DataFrame:
+        if self.profiler is None:
+            return function(data)
+        return self.profiler.run(method_name, phase, function, data)
+
+    def _build_shards(self, data: pd.DataFrame):
+        self.input_columns = list(data.columns)
+        n_shards = joblib.effective_n_jobs(self.n_jobs)
+        # Columns are already selected and rows deduplicated before sharding
+        shard_config = {**self.get_config(), 'columns': None, 'deduplicate_rows': False}
+        self.shard_pipelines = [(columns, DataCleaningPipeline(**shard_config))
+                                for columns in ParallelExecution.shard_columns(self.input_columns, n_shards)]
+
+    def _process_parallel(self, data: pd.DataFrame) -> pd.DataFrame:
+        self._build_shards(data)
+        results = ParallelExecution.run_sharded(ParallelExecution._process_shard, data, self.shard_pipelines, self.n_jobs)
+        self.shard_pipelines = [(columns, pipeline) for (columns, _), (pipeline, _) in zip(self.shard_pipelines, results)]
+        self.is_fitted = True
+        return self._assemble_shards([output for _, output in results])
+
+    def _transform_parallel(self, data: pd.DataFrame) -> pd.DataFrame:
+        outputs = ParallelExecution.run_sharded(ParallelExecution._transform_shard, data, self.shard_pipelines, self.n_jobs)
+        return self._assemble_shards(outputs)
+
+    def _assemble_shards(self, outputs) -> pd.DataFrame:
+        # Reassemble in exactly the order the serial pipeline produces
+        order = ParallelExecution.serial_column_order(
+            self.input_columns, [pipeline.encoder.output_layout(columns) for columns, pipeline in self.shard_pipelines]
+        )
+        return ParallelExecution.assemble(outputs, order)
+
+    def fit_stream(self, chunks: Iterable[pd.DataFrame]) -> 'DataCleaningPipeline':
+        """Fit every step in a single pass over an iterable of chunks, holding one chunk in memory at a time."""
+        self._build_steps()
+        self.shard_pipelines = None
+        self.output_dtypes = None
+        # Streaming fit already makes a single pass, so it always runs the steps rather than a plan
+        self.execution_plan = None
+        for chunk in chunks:
+            chunk = self._select_columns(chunk)
+            # Imputation keeps dtypes and the set of non-missing values unchanged, so the later steps
+            # can accumulate their statistics on the raw chunk alongside the imputer
+            self.missing_data_handler.partial_fit(chunk)
+            self.normalizer.partial_fit(chunk)
+            self.encoder.partial_fit(chunk)
+
+        if not self.missing_data_handler.is_fitted:
+            raise ValueError("Cannot fit DataCleaningPipeline on an empty stream of chunks.")
+
+        # In the in-memory path the scaler sees the imputed means in place of the missing values
+        self.normalizer.add_filled_values(self.missing_data_handler.numerical_fill_values,
+                                          self.missing_data_handler.numerical_missing_counts)
+        # and the encoder sees the imputed modes, which matters for top_k and frequency encoding
+        self.encoder.add_filled_values(self.missing_data_handler.categorical_fill_values,
+                                       self.missing_data_handler.categorical_missing_counts)
+        self.is_fitted = True
+        return self
+
+    def transform_stream(self, chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """Lazily yield each chunk cleaned with the fitted statistics, every chunk with the same dtypes."""
+        if not self.is_fitted:
+            raise ValueError("DataCleaningPipeline must be fitted before calling transform.")
+        for chunk in chunks:
+            output = self.transform(chunk)
+            if self.output_dtypes is None:
+                self.output_dtypes = self._stream_dtypes(output)
+            changed = {col: dtype for col, dtype in self.output_dtypes.items() if output[col].dtype != dtype}
+            yield output.astype(changed) if changed else output
+
+    def _stream_dtypes(self, output: pd.DataFrame) -> pd.Series:
+        # A temporal feature is an integer only while its chunk holds no NaT, so it is widened to the
+        # float it becomes in any chunk that does
+        encoders = [pipeline.encoder for _, pipeline in self.shard_pipelines] if self.shard_pipelines else [self.encoder]
+        temporal = {name for encoder in encoders if encoder.is_fitted
+                    for block, _, name in encoder.output_layout([]) if block == 4}
+        dtypes = output.dtypes.copy()
+        widened = [col for col in dtypes.index if col in temporal and pd.api.types.is_integer_dtype(dtypes[col])]
+        dtypes[widened] = np.dtype(np.float64)
+        return dtypes
+
+    def save(self, file_path: str):
+        """Persist the fitted state of every step (column layout, imputer statistics, scaler moments, categories)."""
+        if not self.is_fitted:
+            raise ValueError("DataCleaningPipeline must be fitted before it can be saved.")
+        joblib.dump(self, file_path)
+
+    @classmethod
+    def load(cls, file_path: str) -> 'DataCleaningPipeline':
+        """Load a pipeline previously written with save."""
+        pipeline = joblib.load(file_path)
+        if not isinstance(pipeline, cls):
+            raise ValueError(f"File at {file_path} does not contain a {cls.__name__}.")
+        return pipeline
@@ -0,0 +1,182 @@
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+from typing_extensions import Any, Dict, List, Optional
+
+from DataCleaning.Sketches import HyperLogLog
+
+SEMANTIC_TYPES = ['empty', 'constant', 'boolean', 'numeric', 'categorical', 'text', 'identifier',
+                  'datetime', 'timedelta', 'other', 'unprofiled']
+# Object columns whose values average more characters than this are free text rather than categories
+TEXT_MIN_MEAN_LENGTH = 32
+
+@dataclass
+class ColumnProfile:
+    name: str
+    dtype: str
+    null_count: int
+    null_ratio: float
+    cardinality: float
+    min: Any
+    max: Any
+    semantic_type: str
+
+    @property
+    def has_nulls(self) -> bool:
+        return self.null_count > 0
+
+    @property
+    def is_constant(self) -> bool:
+        """Every row holds the same non-missing value."""
+        return self.semantic_type == 'constant'
+
+@dataclass
+class DataProfile:
+    rows: int
+    columns: Dict[str, ColumnProfile]
+
+    def __getitem__(self, column: str) -> ColumnProfile:
+        return self.columns[column]
+
+    def get(self, column: str) -> Optional[ColumnProfile]:
+        return self.columns.get(column)
+
+    def columns_with_nulls(self) -> List[str]:
+        return [name for name, profile in self.columns.items() if profile.has_nulls]
+
+    def constant_columns(self) -> List[str]:
+        return [name for name, profile in self.columns.items() if profile.is_constant]
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([asdict(profile) for profile in self.columns.values()]).set_index('name')
+
+class DataProfiler:
+    """Single pass over every column for null counts, min/max, a distinct-count estimate and a semantic type.
+
+    Cardinalities are HyperLogLog estimates, exact for booleans and for columns with a single value.
+    """
+
+    def __init__(self, cardinality_error: float = 0.02):
+        self.cardinality_error = cardinality_error
+
+    def profile(self, data: pd.DataFrame) -> DataProfile:
+        return DataProfile(rows=len(data), columns={col: self._profile_column(col, data[col]) for col in data.columns})
+
+    def null_and_constant_profile(self, data: pd.DataFrame) -> DataProfile:
+        """Only the null counts of every column and which complete numeric columns are constant.
+
+        That is all the cleaning steps read from a profile, at the cost of one null scan per column
+        plus a min/max for complete numeric ones. Cardinality is left as nan and every column that is
+        neither empty nor constant has the semantic type 'unprofiled'.
+        """
+        rows = len(data)
+        columns = {}
+        for col in data.columns:
+            values = data[col]
+            null_count = int(values.isna().sum())
+            minimum = maximum = None
+            if not null_count and rows and pd.api.types.is_numeric_dtype(values.dtype) \
+                    and not pd.api.types.is_bool_dtype(values.dtype):
+                minimum, maximum = values.min(), values.max()
+            if null_count == rows:
+                semantic_type = 'empty' if rows else 'unprofiled'
+            else:
+                semantic_type = 'constant' if minimum is not None and minimum == maximum else 'unprofiled'
+            columns[col] = ColumnProfile(name=col, dtype=str(values.dtype), null_count=null_count,
+                                         null_ratio=null_count / rows if rows else 0.0,
+                                         cardinality=1.0 if semantic_type == 'constant' else float('nan'),
+                                         min=minimum, max=maximum, semantic_type=semantic_type)
+        return DataProfile(rows=rows, columns=columns)
+
+    def _profile_column(self, name: str, values: pd.Series) -> ColumnProfile:
+        rows = len(values)
+        missing = values.isna().to_numpy()
+        null_count = int(missing.sum())
+        observed = values[~missing] if null_count else values
+        dtype = values.dtype
+
+        minimum = maximum = None
+        orderable = (pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype)
+                     or pd.api.types.is_timedelta64_dtype(dtype))
+        if orderable and len(observed):
+            minimum, maximum = observed.min(), observed.max()
+
+        if len(observed) == 0:
+            cardinality = 0.0
+        elif orderable and minimum == maximum:
+            cardinality = 1.0
+        else:
+            sketch = HyperLogLog(self.cardinality_error)
+            sketch.update(observed)
+            cardinality = float(min(len(observed), round(sketch.estimate())))
+
+        return ColumnProfile(
+            name=name,
+            dtype=str(dtype),
+            null_count=null_count,
+            null_ratio=null_count / rows if rows else 0.0,
+            cardinality=cardinality,
+            min=minimum,
+            max=maximum,
+            semantic_type=self._semantic_type(dtype, observed, cardinality, null_count, minimum, maximum)
+        )
+
+    def _semantic_type(self, dtype, observed: pd.Series, cardinality: float, null_count: int,
+                       minimum, maximum) -> str:
+        if len(observed) == 0:
+            return 'empty'
+        if null_count == 0 and (cardinality == 1 or (minimum is not None and minimum == maximum)):
+            return 'constant'
+        if pd.api.types.is_bool_dtype(dtype):
+            return 'boolean'
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return 'datetime'
+        if pd.api.types.is_timedelta64_dtype(dtype):
+            return 'timedelta'
+        if pd.api.types.is_numeric_dtype(dtype):
+            return 'numeric'
+        if isinstance(dtype, pd.CategoricalDtype):
+            return 'categorical'
+        if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            # Nearly one distinct value per row marks keys, long values free text
+            if cardinality >= 0.95 * len(observed) and len(observed) > 100:
+                lengths = observed.astype(str).str.len()
+                return 'text' if lengths.mean() > TEXT_MIN_MEAN_LENGTH else 'identifier'
+            return 'categorical'
+        return 'other'
+
+class RowDeduplicator:
+    """Drops repeated rows using one vectorized 64-bit hash per row.
+
+    Rows whose hashes match are compared value by value before they are dropped, so a hash
+    collision can never remove a distinct row. The first occurrence of every row is kept.
+    """
+
+    def __init__(self, subset: Optional[List[str]] = None):
+        self.subset = subset
+        self.rows_removed = 0
+
+    def deduplicate(self, data: pd.DataFrame) -> pd.DataFrame:
+        keys = data if self.subset is None else data[self.subset]
+        hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+        codes, uniques = pd.factorize(hashes)
+        if len(uniques) == len(data):
+            self.rows_removed = 0
+            return data
+
+        # factorize numbers hashes in order of appearance, so this is each hash's first row
+        first_position = np.unique(codes, return_index=True)[1]
+        repeated = np.flatnonzero(first_position[codes] != np.arange(len(data)))
+        originals = first_position[codes[repeated]]
+
+        equal = np.ones(len(repeated), dtype=bool)
+        for col in keys.columns:
+            values = keys[col]
+            left, right = values.iloc[repeated].reset_index(drop=True), values.iloc[originals].reset_index(drop=True)
+            equal &= ((left == right) | (left.isna() & right.isna())).to_numpy(dtype=bool, na_value=False)
+
+        keep = np.ones(len(data), dtype=bool)
+        keep[repeated[equal]] = False
+        self.rows_removed = int((~keep).sum())
+        return data.take(np.flatnonzero(keep))
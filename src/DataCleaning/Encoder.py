@@ -1,41 +1,311 @@
+import numpy as np
 import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction import FeatureHasher
 from sklearn.preprocessing import OneHotEncoder
+from typing_extensions import Dict, List, Optional, Tuple, Union
+
+from DataCleaning.IncrementalStatistics import RunningValueCounts, value_counts_for
+
+ENCODING_STRATEGIES = ['onehot', 'top_k', 'hashing', 'frequency']
+# Values outside a top_k column's most frequent categories are encoded into this bucket
+OTHER_CATEGORY = '__other__'
 
 class Encoder:
-    def __init__(self):
-        self.encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=False)
-        self.categorical_column_identifiers = ['object']
+    def __init__(self, sparse_output: bool = False, max_onehot_cardinality: Optional[int] = None,
+                 max_top_k_cardinality: Optional[int] = None, top_k: int = 20,
+                 high_cardinality_strategy: str = 'hashing', n_hash_features: int = 64,
+                 column_strategies: Optional[Dict[str, str]] = None,
+                 date_features: Optional[List[str]] = None, timedelta_features: Optional[List[str]] = None,
+                 downcast_float32: bool = False, approximate_statistics: Optional[Dict] = None):
+        # With sparse_output the one-hot block is kept as pandas SparseDtype columns instead of dense float64
+        self.sparse_output = sparse_output
+        self.output_dtype = np.float32 if downcast_float32 else np.float64
+        # Cardinality thresholds deciding the strategy of each categorical column. Columns with at most
+        # max_onehot_cardinality categories are one-hot encoded, those with at most max_top_k_cardinality
+        # get the top_k categories plus an "other" bucket and the rest use high_cardinality_strategy.
+        # Leaving max_onehot_cardinality unset one-hot encodes every column.
+        self.max_onehot_cardinality = max_onehot_cardinality
+        self.max_top_k_cardinality = max_top_k_cardinality
+        self.top_k = top_k
+        self.high_cardinality_strategy = high_cardinality_strategy
+        self.n_hash_features = n_hash_features
+        self.column_strategies = dict(column_strategies or {})
+        # With approximate_statistics cardinalities are HyperLogLog estimates and only heavy hitters are counted
+        self.approximate_statistics = approximate_statistics
+        for strategy in [high_cardinality_strategy, *self.column_strategies.values()]:
+            if strategy not in ENCODING_STRATEGIES:
+                raise ValueError(f"Unknown encoding strategy '{strategy}'. Allowed strategies are: {', '.join(ENCODING_STRATEGIES)}")
+
+        self.date_features = list(date_features or ['year', 'month', 'day', 'hour', 'day_of_week'])
+        self.timedelta_features = list(timedelta_features or ['days'])
+        for feature in self.date_features:
+            if feature not in DATE_FEATURES:
+                raise ValueError(f"Unknown date feature '{feature}'. Allowed features are: {', '.join(DATE_FEATURES)}")
+        for feature in self.timedelta_features:
+            if feature not in TIMEDELTA_FEATURES:
+                raise ValueError(f"Unknown timedelta feature '{feature}'. Allowed features are: {', '.join(TIMEDELTA_FEATURES)}")
+
+        self.encoder = OneHotEncoder(handle_unknown='ignore', sparse_output=sparse_output, dtype=self.output_dtype)
+        self.hasher = FeatureHasher(n_features=n_hash_features, input_type='string', alternate_sign=False,
+                                    dtype=self.output_dtype)
+        self.categorical_column_identifiers = ['object', 'category', 'string']
         self.boolean_column_identifier = ['bool']
-        self.date_column_identifier = ['datetime64', 'timedelta64']
+        self.date_column_identifier = ['datetime64', 'datetimetz', 'timedelta64']
+        self.categorical_cols = None
+        self.boolean_cols = None
+        self.date_cols = None
+        self.timedelta_cols = None
+        self.category_counts = None
+        self.fitted_strategies = {}
+        self.top_k_categories = {}
+        self.frequency_maps = {}
+        self.is_fitted = False
 
-    def encode(self, data: pd.DataFrame) -> pd.DataFrame:
-        categorical_cols = data.select_dtypes(include=self.categorical_column_identifiers).columns
-        boolean_cols = data.select_dtypes(include=self.boolean_column_identifier).columns
-        date_cols = data.select_dtypes(include=self.date_column_identifier).columns
+    def fit(self, data: pd.DataFrame) -> 'Encoder':
+        self.categorical_cols = None
+        return self.partial_fit(data)
+
+    def partial_fit(self, data: pd.DataFrame) -> 'Encoder':
+        # The column layout is fixed by the first chunk; later chunks only add categories
+        if self.categorical_cols is None:
+            self.categorical_cols = list(data.select_dtypes(include=self.categorical_column_identifiers).columns)
+            self.boolean_cols = list(data.select_dtypes(include=self.boolean_column_identifier).columns)
+            self.date_cols = list(data.select_dtypes(include=self.date_column_identifier).columns)
+            self.timedelta_cols = list(data.select_dtypes(include=['timedelta64']).columns)
+            self.category_counts = value_counts_for(self.categorical_cols, self.approximate_statistics)
+
+        self.category_counts.update(data)
+        self._refresh_categorical_encoding()
+
+        self.is_fitted = True
+        return self
+
+    def fit_from_statistics(self, category_counts: RunningValueCounts, boolean_cols: List[str],
+                            date_cols: List[str], timedelta_cols: List[str]) -> 'Encoder':
+        """Adopt a column layout and category counts computed elsewhere, e.g. by an ExecutionPlan."""
+        self.categorical_cols = list(category_counts.columns)
+        self.boolean_cols = list(boolean_cols)
+        self.date_cols = list(date_cols)
+        self.timedelta_cols = list(timedelta_cols)
+        self.category_counts = category_counts
+        self._refresh_categorical_encoding()
+        self.is_fitted = True
+        return self
+
+    def add_filled_values(self, fill_values: pd.Series, counts: pd.Series) -> 'Encoder':
+        """Account for values an upstream imputer will fill in but which were missing while fitting."""
+        self.category_counts.add_constant(fill_values, counts)
+        self._refresh_categorical_encoding()
+        return self
+
+    def _choose_strategy(self, column: str, cardinality: int) -> str:
+        if column in self.column_strategies:
+            return self.column_strategies[column]
+        if self.max_onehot_cardinality is None or cardinality <= self.max_onehot_cardinality:
+            return 'onehot'
+        if self.max_top_k_cardinality is not None and cardinality <= self.max_top_k_cardinality:
+            return 'top_k'
+        return self.high_cardinality_strategy
+
+    def _refresh_categorical_encoding(self):
+        self.fitted_strategies = {}
+        self.top_k_categories = {}
+        self.frequency_maps = {}
+        onehot_categories = []
+
+        for col in self.categorical_cols:
+            counts = self.category_counts.value_counts[col]
+            strategy = self._choose_strategy(col, self.category_counts.cardinality(col))
+            self.fitted_strategies[col] = strategy
+            if strategy == 'onehot':
+                # A column that has only ever been missing keeps a single missing-value category, as sklearn's auto categories would
+                onehot_categories.append(self.category_counts.categories(col) or [None])
+            elif strategy == 'top_k':
+                top_categories = self.category_counts.most_frequent(col, self.top_k)
+                self.top_k_categories[col] = top_categories
+                onehot_categories.append(top_categories + [OTHER_CATEGORY])
+            elif strategy == 'frequency':
+                total = counts.sum()
+                self.frequency_maps[col] = counts / total if total else counts.astype('float64')
+
+        if self.onehot_cols:
+            self.encoder = OneHotEncoder(categories=onehot_categories, handle_unknown='ignore',
+                                         sparse_output=self.sparse_output, dtype=self.output_dtype)
+            # The categories are given explicitly, so a single representative row is enough to fit
+            self.encoder.fit(pd.DataFrame([[values[0] for values in onehot_categories]], columns=self.onehot_cols))
+
+    @property
+    def onehot_cols(self) -> List[str]:
+        return [col for col, strategy in self.fitted_strategies.items() if strategy in ('onehot', 'top_k')]
+
+    @property
+    def hashed_cols(self) -> List[str]:
+        return [col for col, strategy in self.fitted_strategies.items() if strategy == 'hashing']
+
+    @property
+    def frequency_cols(self) -> List[str]:
+        return [col for col, strategy in self.fitted_strategies.items() if strategy == 'frequency']
+
+    def encoded_blocks(self, data: pd.DataFrame) -> List[Tuple[Union[np.ndarray, sparse.spmatrix], List[str]]]:
+        """(matrix, output column names) of every categorical encoding of the fitted columns of data.
+
+        One block for all one-hot/top-k columns, then one per hashed and per frequency column, each a
+        scipy sparse matrix or a dense array with one row per row of data. transform assembles these
+        into the output frame; they can also be consumed directly, e.g. by ExecutionPlan.
+        """
+        blocks = []
+        if self.onehot_cols:
+            onehot_input = data[self.onehot_cols]
+            if self.top_k_categories:
+                onehot_input = onehot_input.copy()
+                for col, top_categories in self.top_k_categories.items():
+                    values = onehot_input[col].astype(object)
+                    onehot_input[col] = values.where(values.isin(top_categories) | values.isna(), OTHER_CATEGORY)
+            blocks.append((self.encoder.transform(onehot_input),
+                           list(self.encoder.get_feature_names_out(self.onehot_cols))))
 
-        if not categorical_cols.empty:
-            encoded_features = self.encoder.fit_transform(data[categorical_cols])
-            encoded_df = pd.DataFrame(encoded_features, columns=self.encoder.get_feature_names_out(categorical_cols))
-            data = pd.concat([data.drop(columns=categorical_cols), encoded_df], axis=1)
+        for col in self.hashed_cols:
+            hashed = self.hasher.transform(data[col].astype(str).to_numpy()[:, None])
+            blocks.append((hashed if self.sparse_output else hashed.toarray(),
+                           [f'{col}_hash_{i}' for i in range(self.n_hash_features)]))
 
-        if not boolean_cols.empty:
-            data[boolean_cols] = data[boolean_cols].astype(int)
+        for col in self.frequency_cols:
+            frequencies = data[col].astype(object).map(self.frequency_maps[col]).astype(self.output_dtype).fillna(0.0)
+            blocks.append((frequencies.to_numpy()[:, None], [f'{col}_frequency']))
+        return blocks
 
-        if not date_cols.empty:
-            for col in date_cols:
-                data = _encode_date_columns(data, col)
+    def transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        if not self.is_fitted:
+            raise ValueError("Encoder must be fitted before calling transform.")
+
+        if self.categorical_cols:
+            encoded_dfs = []
+            for encoded_features, encoded_columns in self.encoded_blocks(data):
+                if sparse.issparse(encoded_features):
+                    encoded_dfs.append(pd.DataFrame.sparse.from_spmatrix(encoded_features, index=data.index,
+                                                                         columns=encoded_columns))
+                else:
+                    encoded_dfs.append(pd.DataFrame(encoded_features, columns=encoded_columns, index=data.index))
+            data = pd.concat([data.drop(columns=self.categorical_cols), *encoded_dfs], axis=1)
+
+        if self.boolean_cols:
+            data[self.boolean_cols] = data[self.boolean_cols].astype(int)
+
+        if self.date_cols:
+            data = extract_temporal_features(data, self.date_cols, self.date_features, self.timedelta_features)
 
         return data
 
-def _encode_date_columns(data: pd.DataFrame, column: str) -> pd.DataFrame:
-    if data[column].dtype == 'timedelta64[ns]':
-        data[column] = data[column].apply(lambda x: x.days)
-    else:
-        data[f'{column}_year'] = data[column].dt.year
-        data[f'{column}_month'] = data[column].dt.month
-        data[f'{column}_day'] = data[column].dt.day
-        data[f'{column}_hour'] = data[column].dt.hour
-        data[f'{column}_day_of_week'] = data[column].dt.dayofweek
-        data = data.drop(columns=[column])
-    return data
+    def encode(self, data: pd.DataFrame) -> pd.DataFrame:
+        return self.fit(data).transform(data)
+
+    def output_layout(self, columns: List[str]) -> List[Tuple[int, str, str]]:
+        """(block, source column, output column) for every column transform produces from `columns`, in output order.
+
+        Blocks are 0 passthrough, 1 one-hot/top-k, 2 hashing, 3 frequency and 4 temporal features.
+        """
+        if not self.is_fitted:
+            raise ValueError("Encoder must be fitted before calling output_layout.")
+        encoded = set(self.categorical_cols) | set(self.date_cols)
+        layout = [(0, col, col) for col in columns if col not in encoded]
+
+        if self.onehot_cols:
+            names = iter(self.encoder.get_feature_names_out(self.onehot_cols))
+            for col, categories in zip(self.onehot_cols, self.encoder.categories_):
+                layout.extend((1, col, next(names)) for _ in categories)
+        for col in self.hashed_cols:
+            layout.extend((2, col, f'{col}_hash_{i}') for i in range(self.n_hash_features))
+        for col in self.frequency_cols:
+            layout.append((3, col, f'{col}_frequency'))
+        for col in self.date_cols:
+            if col in self.timedelta_cols:
+                layout.extend((4, col, col if feature == 'days' else f'{col}_{feature}')
+                              for feature in self.timedelta_features)
+            else:
+                layout.extend((4, col, f'{col}_{feature}') for feature in self.date_features)
+        return layout
+
+    def memory_report(self, data: pd.DataFrame) -> Dict[str, float]:
+        """Compare the size of the encoded categorical block for `data` in dense and sparse form.
+
+        The dense size is computed from the output shape rather than materialised, so the report
+        is safe to run on inputs whose dense encoding would not fit in memory.
+        """
+        if not self.is_fitted:
+            raise ValueError("Encoder must be fitted before calling memory_report.")
+        if not self.categorical_cols:
+            return {"rows": len(data), "encoded_columns": 0, "dense_bytes": 0, "sparse_bytes": 0, "ratio": 1.0}
+
+        encoded = sparse.hstack([sparse.csr_matrix(block) for block, _ in self.encoded_blocks(data)], format='csr',
+                                dtype=self.output_dtype)
+        dense_bytes = encoded.shape[0] * encoded.shape[1] * np.dtype(self.output_dtype).itemsize
+        sparse_bytes = int(pd.DataFrame.sparse.from_spmatrix(encoded).memory_usage(index=False).sum())
+        return {
+            "rows": encoded.shape[0],
+            "encoded_columns": encoded.shape[1],
+            "dense_bytes": dense_bytes,
+            "sparse_bytes": sparse_bytes,
+            "ratio": dense_bytes / sparse_bytes if sparse_bytes else float('inf')
+        }
+
+def to_csr_matrix(data: pd.DataFrame) -> sparse.csr_matrix:
+    """Convert cleaned output with a mix of dense and SparseDtype columns into one CSR matrix, keeping column order."""
+    is_sparse = [isinstance(dtype, pd.SparseDtype) for dtype in data.dtypes]
+    sparse_cols = [col for col, flag in zip(data.columns, is_sparse) if flag]
+    dense_cols = [col for col, flag in zip(data.columns, is_sparse) if not flag]
+
+    blocks = []
+    if dense_cols:
+        blocks.append(sparse.csr_matrix(data[dense_cols].to_numpy(dtype=np.float64)))
+    if sparse_cols:
+        blocks.append(data[sparse_cols].sparse.to_coo().tocsr())
+    matrix = sparse.hstack(blocks, format='csc')
+
+    position = {col: i for i, col in enumerate(dense_cols + sparse_cols)}
+    return matrix[:, [position[col] for col in data.columns]].tocsr()
+
+def _is_weekend(dt) -> pd.Series:
+    return (dt.dayofweek >= 5).astype('int32')
+
+# Derived features for datetime columns, computed in each column's own timezone
+DATE_FEATURES = {
+    'year': lambda dt: dt.year,
+    'quarter': lambda dt: dt.quarter,
+    'month': lambda dt: dt.month,
+    'day': lambda dt: dt.day,
+    'hour': lambda dt: dt.hour,
+    'minute': lambda dt: dt.minute,
+    'second': lambda dt: dt.second,
+    'day_of_week': lambda dt: dt.dayofweek,
+    'day_of_year': lambda dt: dt.dayofyear,
+    'is_weekend': _is_weekend
+}
+
+TIMEDELTA_FEATURES = {
+    'days': lambda dt: dt.days,
+    'total_seconds': lambda dt: dt.total_seconds(),
+    'total_hours': lambda dt: dt.total_seconds() / 3600
+}
+
+def extract_temporal_features(data: pd.DataFrame, columns: List[str],
+                              date_features: List[str], timedelta_features: List[str]) -> pd.DataFrame:
+    """Replace every datetime/timedelta column with its derived features in a single concat.
+
+    Rows holding NaT come out as NaN, which turns the affected feature into float64 like pandas' own
+    .dt accessors do. The 'days' feature of a timedelta column keeps the source column name.
+    """
+    features = {}
+    for col in columns:
+        values = data[col]
+        if pd.api.types.is_timedelta64_dtype(values.dtype):
+            for feature in timedelta_features:
+                name = col if feature == 'days' else f'{col}_{feature}'
+                features[name] = TIMEDELTA_FEATURES[feature](values.dt)
+        else:
+            missing = values.isna()
+            for feature in date_features:
+                derived = DATE_FEATURES[feature](values.dt)
+                features[f'{col}_{feature}'] = derived.where(~missing) if missing.any() else derived
 
+    return pd.concat([data.drop(columns=columns), pd.DataFrame(features, index=data.index)], axis=1)
@@ -0,0 +1,202 @@
+import copy
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from typing_extensions import Dict, List, Optional
+
+from DataCleaning.Encoder import Encoder, extract_temporal_features
+from DataCleaning.IncrementalStatistics import (RunningMoments, RunningQuantiles, approximate_statistics_options,
+                                                value_counts_for)
+from DataCleaning.MissingDataHandler import MissingDataHandler
+from DataCleaning.Normalizer import Normalizer
+
+PIPELINE_STEPS = ['impute', 'scale', 'encode']
+COLUMN_ROLES = ['numeric', 'categorical', 'boolean', 'temporal', 'passthrough', 'pruned']
+
+@dataclass
+class PipelineSpec:
+    """Declarative description of a cleaning run, compiled into an ExecutionPlan against a schema."""
+    steps: List[str] = field(default_factory=lambda: list(PIPELINE_STEPS))
+    # Only these input columns are read and cleaned; None keeps every column
+    columns: Optional[List[str]] = None
+    sparse_encoding: bool = False
+    downcast_float32: bool = False
+    encoder_options: Dict = field(default_factory=dict)
+    robust_scaling: bool = False
+    approximate_statistics: Optional[Dict] = None
+
+    def __post_init__(self):
+        for step in self.steps:
+            if step not in PIPELINE_STEPS:
+                raise ValueError(f"Unknown pipeline step '{step}'. Allowed steps are: {', '.join(PIPELINE_STEPS)}")
+
+class ExecutionPlan:
+    """Fused execution of imputation, scaling and encoding.
+
+    Every column is classified once from the schema. Fitting makes one statistics pass that all
+    steps share, and executing touches every column once: numeric columns are scaled and imputed
+    in the same pass and the output frame is assembled with a single concat. The result is the
+    same frame the step-by-step pipeline produces.
+    """
+
+    def __init__(self, spec: PipelineSpec, dtypes: pd.Series):
+        self.spec = spec
+        quantile_error = approximate_statistics_options(spec.approximate_statistics)['quantile_error']
+        self.missing_data_handler = MissingDataHandler(approximate_statistics=spec.approximate_statistics)
+        self.normalizer = Normalizer(downcast_float32=spec.downcast_float32, robust=spec.robust_scaling,
+                                     quantile_error=quantile_error)
+        self.encoder = Encoder(sparse_output=spec.sparse_encoding, downcast_float32=spec.downcast_float32,
+                               approximate_statistics=spec.approximate_statistics, **spec.encoder_options)
+        self.dtypes = dtypes
+        self.input_columns = list(dtypes.index)
+        if spec.columns is not None:
+            unknown = [col for col in spec.columns if col not in dtypes.index]
+            if unknown:
+                raise ValueError(f"Columns not found in data: {', '.join(map(str, unknown))}")
+        self.columns = [col for col in self.input_columns if spec.columns is None or col in spec.columns]
+        self.roles = self._classify(dtypes)
+        self.is_fitted = False
+
+    @classmethod
+    def compile(cls, spec: PipelineSpec, data: pd.DataFrame) -> 'ExecutionPlan':
+        return cls(spec, data.dtypes)
+
+    def _classify(self, dtypes: pd.Series) -> Dict[str, str]:
+        # Same dtype selectors as the steps themselves, applied once to an empty frame of the schema
+        schema = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in dtypes.items()})[self.columns]
+        selected = {
+            'numeric': schema.select_dtypes(include=self.normalizer.numerical_column_types,
+                                            exclude=self.normalizer.excluded_column_types).columns,
+            'categorical': schema.select_dtypes(include=self.encoder.categorical_column_identifiers).columns,
+            'boolean': schema.select_dtypes(include=self.encoder.boolean_column_identifier).columns,
+            'temporal': schema.select_dtypes(include=self.encoder.date_column_identifier).columns
+        }
+        roles = {col: 'pruned' for col in self.input_columns}
+        roles.update({col: 'passthrough' for col in self.columns})
+        for role, columns in selected.items():
+            roles.update({col: role for col in columns})
+        return roles
+
+    def columns_with_role(self, role: str) -> List[str]:
+        return [col for col in self.input_columns if self.roles[col] == role]
+
+    def _runs(self, step: str) -> bool:
+        return step in self.spec.steps
+
+    def explain(self) -> str:
+        """Human readable description of what fit and execute will do with every column."""
+        actions = {
+            'numeric': ' + '.join(action for step, action in [('impute', 'impute mean'), ('scale', 'scale')]
+                                  if self._runs(step)) or 'passthrough',
+            'categorical': ' + '.join(action for step, action in [('impute', 'impute mode'), ('encode', 'encode')]
+                                      if self._runs(step)) or 'passthrough',
+            'boolean': 'cast to int' if self._runs('encode') else 'passthrough',
+            'temporal': 'extract features' if self._runs('encode') else 'passthrough',
+            'passthrough': 'passthrough',
+            'pruned': 'never read'
+        }
+        lines = [f"ExecutionPlan: steps={', '.join(self.spec.steps)}; "
+                 f"{len(self.columns)} of {len(self.input_columns)} columns read; 1 statistics pass, 1 output concat"]
+        for col in self.input_columns:
+            role = self.roles[col]
+            action = actions[role]
+            if role == 'categorical' and self.is_fitted and self._runs('encode'):
+                action += f" ({self.encoder.fitted_strategies[col]})"
+            lines.append(f"  {col}: {role} -> {action}")
+        return '\n'.join(lines)
+
+    def fit(self, data: pd.DataFrame) -> 'ExecutionPlan':
+        numeric = self.columns_with_role('numeric')
+        categorical = self.columns_with_role('categorical')
+        moments = RunningMoments(numeric)
+        counts = value_counts_for(categorical, self.spec.approximate_statistics)
+        moments.update(data)
+        counts.update(data)
+        quantiles = None
+        if self._runs('scale') and self.normalizer.robust:
+            quantiles = RunningQuantiles(numeric, self.normalizer.quantile_error)
+            quantiles.update(data)
+
+        handler = self.missing_data_handler.fit_from_statistics(moments, counts, len(data))
+        if self._runs('scale'):
+            self.normalizer.fit_from_statistics(copy.deepcopy(moments), quantiles)
+            if self._runs('impute'):
+                self.normalizer.add_filled_values(handler.numerical_fill_values, handler.numerical_missing_counts)
+        if self._runs('encode'):
+            temporal = self.columns_with_role('temporal')
+            timedelta = [col for col in temporal if pd.api.types.is_timedelta64_dtype(self.dtypes[col])]
+            self.encoder.fit_from_statistics(copy.deepcopy(counts), self.columns_with_role('boolean'), temporal, timedelta)
+            if self._runs('impute'):
+                self.encoder.add_filled_values(handler.categorical_fill_values, handler.categorical_missing_counts)
+        self.is_fitted = True
+        return self
+
+    def execute(self, data: pd.DataFrame) -> pd.DataFrame:
+        if not self.is_fitted:
+            raise ValueError("ExecutionPlan must be fitted before calling execute.")
+
+        encode = self._runs('encode')
+        columns = {}
+        categorical = {}
+        for col in self.columns:
+            role = self.roles[col]
+            if role == 'numeric':
+                columns[col] = self._numeric_column(data[col])
+            elif role == 'categorical':
+                values = data[col]
+                if self._runs('impute') and values.hasnans:
+                    values = values.fillna(self.missing_data_handler.categorical_fill_values[col])
+                if encode:
+                    categorical[col] = values
+                else:
+                    columns[col] = values
+            elif role == 'boolean' and encode:
+                columns[col] = data[col].astype(int)
+            elif role != 'temporal' or not encode:
+                columns[col] = data[col]
+
+        pieces = [pd.DataFrame(columns, index=data.index, copy=False)]
+        if encode and categorical:
+            encoded_input = pd.DataFrame(categorical, index=data.index, copy=False)
+            for block, names in self.encoder.encoded_blocks(encoded_input):
+                if sparse.issparse(block):
+                    pieces.append(pd.DataFrame.sparse.from_spmatrix(block, index=data.index, columns=names))
+                else:
+                    pieces.append(pd.DataFrame(block, columns=names, index=data.index))
+        if encode and self.encoder.date_cols:
+            pieces.append(extract_temporal_features(data[self.encoder.date_cols], self.encoder.date_cols,
+                                                    self.encoder.date_features, self.encoder.timedelta_features))
+        return pd.concat(pieces, axis=1) if len(pieces) > 1 else pieces[0]
+
+    def _numeric_column(self, values: pd.Series) -> pd.Series:
+        impute, scale = self._runs('impute'), self._runs('scale')
+        col = values.name
+        if not scale:
+            if impute and values.hasnans:
+                fill_value = self.missing_data_handler.numerical_fill_values[col]
+                if pd.api.types.is_integer_dtype(values.dtype):
+                    return values.astype('Float64').fillna(fill_value)
+                if isinstance(values.dtype, np.dtype):
+                    # A float64 fill value would upcast a float32 column, MissingDataHandler keeps its width
+                    fill_value = values.dtype.type(fill_value)
+                return values.fillna(fill_value)
+            return values
+
+        output_dtype = self.normalizer.output_dtype_for(values.dtype)
+        # Nullable columns are computed in float64 like Normalizer's extension-array path
+        numpy_dtype = 'float64' if output_dtype in ('Float64', 'Float32') else output_dtype
+        # One pass per column: centre and scale, then write the imputed positions, which all scale
+        # to the same value, directly
+        scaled = values.to_numpy(dtype=numpy_dtype, na_value=np.nan, copy=True)
+        missing = np.isnan(scaled) if impute and values.hasnans else None
+        center = scaled.dtype.type(self.normalizer.center[col])
+        scale = scaled.dtype.type(self.normalizer.scale[col])
+        scaled -= center
+        scaled /= scale
+        if missing is not None:
+            scaled[missing] = (scaled.dtype.type(self.missing_data_handler.numerical_fill_values[col]) - center) / scale
+        if output_dtype != numpy_dtype:
+            return pd.Series(pd.array(scaled, dtype=output_dtype), index=values.index, name=col)
+        return pd.Series(scaled, index=values.index, name=col, copy=False)
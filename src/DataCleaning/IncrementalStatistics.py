@@ -0,0 +1,192 @@
+import numpy as np
+import pandas as pd
+from typing_extensions import Dict, List, Optional
+
+from DataCleaning.Sketches import HeavyHitters, HyperLogLog, QuantileSketch
+
+# Default error bounds of the approximate statistics, overridable per pipeline
+APPROXIMATE_STATISTICS_DEFAULTS = {
+    'heavy_hitters_error': 0.001,
+    'distinct_count_error': 0.01,
+    'quantile_error': 0.001
+}
+
+class RunningMoments:
+    """Per-column count, mean and sum of squared deviations, merged chunk by chunk (Chan et al.)."""
+
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        self.count = np.zeros(len(self.columns))
+        self.mean = np.zeros(len(self.columns))
+        self.m2 = np.zeros(len(self.columns))
+
+    def update(self, data: pd.DataFrame):
+        # Column by column so only one float64 column is ever materialised, whatever the input dtypes
+        count = np.zeros(len(self.columns))
+        mean = np.zeros(len(self.columns))
+        m2 = np.zeros(len(self.columns))
+        for i, col in enumerate(self.columns):
+            values = data[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            observed = values[~np.isnan(values)] if data[col].hasnans else values
+            count[i] = observed.size
+            if observed.size:
+                mean[i] = observed.mean()
+                deviations = observed - mean[i]
+                m2[i] = np.dot(deviations, deviations)
+        self._merge(count, mean, m2)
+
+    def add_constant(self, values: pd.Series, counts: pd.Series):
+        """Merge `counts[col]` extra observations that all equal `values[col]`."""
+        values = values.reindex(self.columns).fillna(0).to_numpy(dtype=float)
+        counts = counts.reindex(self.columns).fillna(0).to_numpy(dtype=float)
+        self._merge(counts, values, np.zeros(len(self.columns)))
+
+    def _merge(self, count: np.ndarray, mean: np.ndarray, m2: np.ndarray):
+        total = self.count + count
+        safe_total = np.where(total > 0, total, 1)
+        delta = mean - self.mean
+        self.mean = np.where(total > 0, self.mean + delta * count / safe_total, 0.0)
+        self.m2 = self.m2 + m2 + delta ** 2 * self.count * count / safe_total
+        self.count = total
+
+    @property
+    def variance(self) -> pd.Series:
+        # Population variance, matching sklearn's StandardScaler
+        return pd.Series(np.where(self.count > 0, self.m2 / np.where(self.count > 0, self.count, 1), 0.0),
+                         index=self.columns)
+
+    @property
+    def means(self) -> pd.Series:
+        return pd.Series(np.where(self.count > 0, self.mean, np.nan), index=self.columns)
+
+    @property
+    def counts(self) -> pd.Series:
+        return pd.Series(self.count, index=self.columns)
+
+class RunningValueCounts:
+    """Per-column value frequencies, accumulated chunk by chunk. Missing values are not counted."""
+
+    def __init__(self, columns: List[str]):
+        self.columns = list(columns)
+        self.value_counts: Dict[str, pd.Series] = {col: pd.Series(dtype='int64') for col in self.columns}
+
+    def update(self, data: pd.DataFrame):
+        for col in self.columns:
+            counts = data[col].value_counts(dropna=True)
+            # Categorical dtypes also report their unobserved categories
+            counts = counts[counts > 0]
+            self.value_counts[col] = self.value_counts[col].add(counts, fill_value=0).astype('int64')
+
+    def add_constant(self, values: pd.Series, counts: pd.Series):
+        """Count `counts[col]` extra occurrences of `values[col]`; missing values are skipped as in update."""
+        for col in self.columns:
+            value, count = values.get(col, np.nan), int(counts.get(col, 0))
+            if count > 0 and not pd.isna(value):
+                self.value_counts[col] = self.value_counts[col].add(pd.Series({value: count}), fill_value=0).astype('int64')
+
+    @property
+    def totals(self) -> pd.Series:
+        return pd.Series({col: int(self.value_counts[col].sum()) for col in self.columns}, dtype='int64')
+
+    def cardinality(self, column: str) -> float:
+        return len(self.value_counts[column])
+
+    def categories(self, column: str) -> list:
+        return _sorted_values(self.value_counts[column].index)
+
+    def mode(self, column: str):
+        counts = self.value_counts[column]
+        if counts.empty:
+            return np.nan
+        # Ties resolve to the smallest value, like sklearn's most_frequent strategy
+        return _sorted_values(counts.index[counts == counts.max()])[0]
+
+    def most_frequent(self, column: str, k: int) -> list:
+        """The k most frequent values (ties broken by value), returned in sorted order."""
+        counts = self.value_counts[column]
+        by_value = counts.reindex(_sorted_values(counts.index))
+        top = by_value.sort_values(ascending=False, kind='stable').index[:k]
+        return _sorted_values(top)
+
+    @property
+    def modes(self) -> pd.Series:
+        return pd.Series({col: self.mode(col) for col in self.columns}, dtype=object)
+
+class ApproximateValueCounts(RunningValueCounts):
+    """Bounded-memory stand-in for RunningValueCounts on columns too large for an exact hash table.
+
+    value_counts only holds a column's heavy hitters, with counts at most heavy_hitters_error * n
+    below the truth, and cardinality is a HyperLogLog estimate. Columns with fewer distinct values
+    than heavy-hitter counters are counted exactly.
+    """
+
+    def __init__(self, columns: List[str], heavy_hitters_error: float = APPROXIMATE_STATISTICS_DEFAULTS['heavy_hitters_error'],
+                 distinct_count_error: float = APPROXIMATE_STATISTICS_DEFAULTS['distinct_count_error']):
+        super().__init__(columns)
+        self.heavy_hitters = {col: HeavyHitters(heavy_hitters_error) for col in self.columns}
+        self.distinct_counts = {col: HyperLogLog(distinct_count_error) for col in self.columns}
+
+    def update(self, data: pd.DataFrame):
+        for col in self.columns:
+            self.heavy_hitters[col].update(data[col])
+            self.distinct_counts[col].update(data[col])
+            self.value_counts[col] = self.heavy_hitters[col].counts
+
+    def add_constant(self, values: pd.Series, counts: pd.Series):
+        for col in self.columns:
+            value, count = values.get(col, np.nan), int(counts.get(col, 0))
+            if count > 0 and not pd.isna(value):
+                self.heavy_hitters[col].add(value, count)
+                self.value_counts[col] = self.heavy_hitters[col].counts
+
+    @property
+    def totals(self) -> pd.Series:
+        return pd.Series({col: self.heavy_hitters[col].n_seen for col in self.columns}, dtype='int64')
+
+    def cardinality(self, column: str) -> float:
+        # The exact count is known as long as no counter was ever evicted
+        if not self.heavy_hitters[column].evicted:
+            return len(self.value_counts[column])
+        return round(self.distinct_counts[column].estimate())
+
+class RunningQuantiles:
+    """Per-column QuantileSketch, accumulated chunk by chunk. Missing values are ignored."""
+
+    def __init__(self, columns: List[str], quantile_error: float = APPROXIMATE_STATISTICS_DEFAULTS['quantile_error']):
+        self.columns = list(columns)
+        self.sketches = {col: QuantileSketch(quantile_error) for col in self.columns}
+
+    def update(self, data: pd.DataFrame):
+        for col in self.columns:
+            self.sketches[col].update(data[col].to_numpy(dtype=np.float64, na_value=np.nan))
+
+    def add_constant(self, values: pd.Series, counts: pd.Series):
+        for col in self.columns:
+            value, count = values.get(col, np.nan), int(counts.get(col, 0))
+            if count > 0 and not pd.isna(value):
+                self.sketches[col].add(value, count)
+
+    def quantiles(self, q: float) -> pd.Series:
+        return pd.Series({col: self.sketches[col].quantile(q) for col in self.columns}, index=self.columns,
+                         dtype='float64')
+
+def approximate_statistics_options(approximate_statistics: Optional[Dict] = None) -> Dict:
+    unknown = set(approximate_statistics or {}) - set(APPROXIMATE_STATISTICS_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown approximate statistics options: {', '.join(sorted(unknown))}. "
+                         f"Allowed options are: {', '.join(APPROXIMATE_STATISTICS_DEFAULTS)}")
+    return {**APPROXIMATE_STATISTICS_DEFAULTS, **(approximate_statistics or {})}
+
+def value_counts_for(columns: List[str], approximate_statistics: Optional[Dict] = None) -> RunningValueCounts:
+    """Exact value counts, or heavy hitters and distinct-count sketches when approximate_statistics is set."""
+    if approximate_statistics is None:
+        return RunningValueCounts(columns)
+    options = approximate_statistics_options(approximate_statistics)
+    return ApproximateValueCounts(columns, heavy_hitters_error=options['heavy_hitters_error'],
+                                  distinct_count_error=options['distinct_count_error'])
+
+def _sorted_values(values) -> list:
+    try:
+        return sorted(values)
+    except TypeError:
+        return sorted(values, key=str)
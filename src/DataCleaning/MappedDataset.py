@@ -0,0 +1,280 @@
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+from typing_extensions import Callable, Dict, Iterator, List, Optional, Union
+
+SCHEMA_FILE = "schema.json"
+COLUMN_FILE_EXTENSIONS = ['.npy', '.arrow']
+
+class MappedDataset:
+    """A dataset stored as one memory-mapped file per column, read a block of rows at a time.
+
+    A directory written by MappedDatasetWriter carries a schema.json describing every column:
+    plain numpy columns (numbers, bools, datetimes) are single .npy files, nullable numbers
+    add a .mask.npy next to their values, timezone-aware datetimes are stored in UTC and
+    categorical/string columns as integer codes plus their categories. A directory without
+    a schema is read as one column per .npy or Arrow IPC (.arrow) file, named after the file.
+    Only the rows of the block being read are ever paged in.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        schema_path = os.path.join(directory, SCHEMA_FILE)
+        if os.path.exists(schema_path):
+            with open(schema_path, 'r') as file:
+                schema = json.load(file)
+        else:
+            schema = _infer_schema(directory)
+        self.schema: List[Dict] = schema["columns"]
+        self.columns = [column["name"] for column in self.schema]
+        self._arrow_tables = {}
+        self.n_rows = schema["n_rows"] if "n_rows" in schema else self._count_rows()
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    @property
+    def dtypes(self) -> pd.Series:
+        return pd.Series({column["name"]: self._dtype(column) for column in self.schema}, dtype=object)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(os.path.getsize(os.path.join(self.directory, name)) for name in os.listdir(self.directory)
+                   if os.path.splitext(name)[1] in COLUMN_FILE_EXTENSIONS)
+
+    @property
+    def default_block_rows(self) -> int:
+        # A block across every column then holds about as many values as a single column
+        return max(1, math.ceil(self.n_rows / max(1, len(self.columns))))
+
+    def read(self, start: int = 0, stop: Optional[int] = None, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({name: self.column(name, start, stop) for name in columns},
+                            index=pd.RangeIndex(start, stop), copy=False)
+
+    def iter_blocks(self, block_rows: Optional[int] = None, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        block_rows = block_rows or self.default_block_rows
+        for start in range(0, self.n_rows, block_rows):
+            yield self.read(start, start + block_rows, columns)
+
+    def take(self, positions: np.ndarray, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """The rows at positions; only the pages holding those rows of the requested columns are read."""
+        columns = self.columns if columns is None else columns
+        positions = np.asarray(positions, dtype=np.intp)
+        return pd.DataFrame({name: self._column(name, positions, pd.Index(positions)) for name in columns},
+                            index=pd.Index(positions), copy=False)
+
+    def where(self, name: str, predicate: Callable[[pd.Series], np.ndarray]) -> np.ndarray:
+        """Boolean row mask of predicate applied to one column.
+
+        For categorical and string columns the predicate only sees the categories, once each, and the
+        mask is looked up from the stored codes; missing values never match.
+        """
+        column = self._schema_column(name)
+        if column["kind"] != "categorical":
+            return np.asarray(predicate(self.column(name)), dtype=bool)
+        matches = np.asarray(predicate(pd.Series(column["categories"], dtype=object)), dtype=bool)
+        # Code -1 marks a missing value and picks the trailing False
+        return np.append(matches, False)[self._mapped(column["file"])]
+
+    def column(self, name: str, start: int = 0, stop: Optional[int] = None) -> pd.Series:
+        """Rows [start, stop) of one column. Plain numpy columns are read-only views of the mapping."""
+        stop = self.n_rows if stop is None else min(stop, self.n_rows)
+        return self._column(name, slice(start, stop), pd.RangeIndex(start, stop))
+
+    def _schema_column(self, name: str) -> Dict:
+        if name not in self.columns:
+            raise ValueError(f"Column '{name}' not found in dataset at {self.directory}.")
+        return self.schema[self.columns.index(name)]
+
+    def _column(self, name: str, rows: Union[slice, np.ndarray], index: pd.Index) -> pd.Series:
+        column = self._schema_column(name)
+        kind = column["kind"]
+
+        if kind == "arrow":
+            table = self._arrow_table(column)
+            table = table.slice(rows.start, rows.stop - rows.start) if isinstance(rows, slice) else table.take(rows)
+            return table.column(0).to_pandas().set_axis(index).rename(name)
+
+        values = self._mapped(column["file"], rows)
+        if kind == "masked":
+            mask = self._mapped(column["mask_file"], rows)
+            values = pd.api.types.pandas_dtype(column["dtype"]).construct_array_type()(values, mask)
+        elif kind == "categorical":
+            values = pd.Categorical.from_codes(values, categories=column["categories"])
+            if column["dtype"] != 'category':
+                values = pd.Series(values).astype(column["dtype"]).array
+        elif kind == "datetimetz":
+            values = pd.DatetimeIndex(values).tz_localize('UTC').tz_convert(column["tz"]).array
+        return pd.Series(values, index=index, name=name, copy=False)
+
+    def _mapped(self, file_name: str, rows: Union[slice, np.ndarray] = slice(None)) -> np.ndarray:
+        # A read-only mapping per block: pages come from the file on demand and are released with the
+        # block, so the resident set never accumulates the pages of blocks already processed.
+        # Taking positions copies just those rows out of the mapping
+        return np.load(os.path.join(self.directory, file_name), mmap_mode='r')[rows].view(np.ndarray)
+
+    def _arrow_table(self, column: Dict):
+        if column["file"] not in self._arrow_tables:
+            try:
+                import pyarrow as pa
+            except ImportError as error:
+                raise ValueError(f"Reading the Arrow IPC column '{column['name']}' requires pyarrow.") from error
+            source = pa.memory_map(os.path.join(self.directory, column["file"]), 'r')
+            self._arrow_tables[column["file"]] = pa.ipc.open_file(source).read_all()
+        return self._arrow_tables[column["file"]]
+
+    def _dtype(self, column: Dict):
+        if column["kind"] == "arrow":
+            return self._arrow_table(column).schema.field(0).type.to_pandas_dtype()
+        if column["kind"] == "datetimetz":
+            return pd.DatetimeTZDtype(tz=column["tz"])
+        if column["kind"] == "categorical" and column["dtype"] == 'category':
+            return pd.CategoricalDtype(column["categories"])
+        return pd.api.types.pandas_dtype(column["dtype"])
+
+    def _count_rows(self) -> int:
+        lengths = set()
+        for column in self.schema:
+            if column["kind"] == "arrow":
+                lengths.add(self._arrow_table(column).num_rows)
+            else:
+                lengths.add(len(self._mapped(column["file"])))
+        if len(lengths) > 1:
+            raise ValueError(f"Columns in {self.directory} have different lengths: {sorted(lengths)}")
+        return lengths.pop() if lengths else 0
+
+class MappedDatasetWriter:
+    """Writes a MappedDataset block by block into preallocated memory-mapped column files.
+
+    The files are created from the dtypes of the first block, and a later block whose values do
+    not cast safely into them (e.g. NaN into an integer column) raises. SparseDtype columns are written
+    dense. Categorical and string columns need `categories` for their codes; without them the
+    categories of the first block are used and later blocks may not introduce new values.
+    """
+
+    def __init__(self, directory: str, n_rows: int, categories: Optional[Dict[str, list]] = None):
+        self.directory = directory
+        self.n_rows = n_rows
+        self.categories = dict(categories or {})
+        self.schema = None
+        self._files = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, start: int, data: pd.DataFrame):
+        if start + len(data) > self.n_rows:
+            raise ValueError(f"Block of {len(data)} rows at {start} does not fit a dataset of {self.n_rows} rows.")
+        if self.schema is None:
+            self.schema = [self._create_column(i, name, values) for i, (name, values) in enumerate(data.items())]
+        elif list(data.columns) != [column["name"] for column in self.schema]:
+            raise ValueError("Every block written to a MappedDatasetWriter must have the same columns.")
+
+        stop = start + len(data)
+        for column, (_, values) in zip(self.schema, data.items()):
+            if isinstance(values.dtype, pd.SparseDtype):
+                values = values.sparse.to_dense()
+            kind = column["kind"]
+            if kind == "masked":
+                self._write_rows(column["file"], start, values.to_numpy(dtype=values.dtype.numpy_dtype, na_value=0))
+                self._write_rows(column["mask_file"], start, values.isna().to_numpy())
+            elif kind == "categorical":
+                codes = pd.Categorical(values.astype(object), categories=column["categories"]).codes
+                unknown = (codes == -1) & values.notna().to_numpy()
+                if unknown.any():
+                    raise ValueError(f"Column '{column['name']}' holds values outside its categories.")
+                self._write_rows(column["file"], start, codes)
+            elif kind == "datetimetz":
+                self._write_rows(column["file"], start, values.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy())
+            else:
+                self._write_rows(column["file"], start, values.to_numpy(), column["name"])
+
+    def _write_rows(self, file_name: str, start: int, values: np.ndarray, name: Optional[str] = None):
+        # Blocks are written through the file rather than a writable mapping, so finished blocks live
+        # in the page cache instead of staying dirty in this process's resident set
+        file, offset, dtype = self._files[file_name]
+        if name is not None and not np.can_cast(values.dtype, dtype, casting='same_kind'):
+            raise ValueError(f"Column '{name}' was created as {dtype} but a block at row {start} holds {values.dtype}.")
+        file.seek(offset + start * dtype.itemsize)
+        np.ascontiguousarray(values, dtype=dtype).tofile(file)
+
+    def close(self) -> MappedDataset:
+        if self.schema is None:
+            raise ValueError("Cannot close a MappedDatasetWriter before any block was written.")
+        for file, _, _ in self._files.values():
+            file.close()
+        self._files = {}
+        # The schema is written last, so a directory with a schema always holds complete columns
+        schema_path = os.path.join(self.directory, SCHEMA_FILE)
+        with open(schema_path + ".tmp", 'w') as file:
+            json.dump({"n_rows": self.n_rows, "columns": self.schema}, file, default=str)
+        os.replace(schema_path + ".tmp", schema_path)
+        return MappedDataset(self.directory)
+
+    def _allocate(self, file_name: str, dtype) -> str:
+        path = os.path.join(self.directory, file_name)
+        # open_memmap writes the .npy header and sizes the file; the data follows the header
+        header_only = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(self.n_rows,))
+        del header_only
+        dtype = np.dtype(dtype)
+        offset = os.path.getsize(path) - self.n_rows * dtype.itemsize
+        self._files[file_name] = (open(path, 'r+b'), offset, dtype)
+        return file_name
+
+    def _create_column(self, i: int, name: str, values: pd.Series) -> Dict:
+        dtype = values.dtype
+        if isinstance(dtype, pd.SparseDtype):
+            dtype = dtype.subtype
+        column = {"name": name, "dtype": str(dtype)}
+
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            column.update(kind="datetimetz", tz=str(dtype.tz), file=self._allocate(f"{i}.npy", 'datetime64[ns]'))
+        elif isinstance(values.array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+            column.update(kind="masked", file=self._allocate(f"{i}.npy", dtype.numpy_dtype),
+                          mask_file=self._allocate(f"{i}.mask.npy", bool))
+        elif isinstance(dtype, np.dtype) and dtype != object:
+            column.update(kind="array", file=self._allocate(f"{i}.npy", dtype))
+        elif isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(dtype) \
+                or pd.api.types.is_string_dtype(dtype):
+            if name in self.categories:
+                categories = list(self.categories[name])
+            elif isinstance(dtype, pd.CategoricalDtype):
+                categories = list(dtype.categories)
+            else:
+                categories = list(pd.unique(values.dropna().astype(object)))
+            column.update(kind="categorical", categories=categories,
+                          file=self._allocate(f"{i}.npy", _code_dtype(len(categories))))
+        else:
+            raise ValueError(f"Column '{name}' has dtype {dtype}, which cannot be stored in a MappedDataset.")
+        return column
+
+def write_mapped_dataset(directory: str, data: pd.DataFrame) -> MappedDataset:
+    """Store an in-memory DataFrame as a MappedDataset."""
+    writer = MappedDatasetWriter(directory, len(data))
+    writer.write(0, data.reset_index(drop=True))
+    return writer.close()
+
+def _code_dtype(n_categories: int) -> np.dtype:
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+def _infer_schema(directory: str) -> Dict:
+    columns = []
+    for file_name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(file_name)
+        if extension == '.npy' and not stem.endswith('.mask'):
+            try:
+                dtype = np.load(os.path.join(directory, file_name), mmap_mode='r').dtype
+            except ValueError as error:
+                raise ValueError(f"{file_name} holds Python objects, which cannot be memory-mapped.") from error
+            columns.append({"name": stem, "kind": "array", "dtype": str(dtype), "file": file_name})
+        elif extension == '.arrow':
+            columns.append({"name": stem, "kind": "arrow", "file": file_name})
+    if not columns:
+        raise ValueError(f"No {SCHEMA_FILE} and no column files found in {directory}.")
+    return {"columns": columns}
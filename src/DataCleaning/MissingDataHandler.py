@@ -1,19 +1,112 @@
+import numpy as np
 import pandas as pd
-from sklearn.impute import SimpleImputer
+from typing_extensions import Dict, Optional
+
+from DataCleaning.DataProfiler import DataProfile
+from DataCleaning.IncrementalStatistics import RunningMoments, RunningValueCounts, value_counts_for
 
 class MissingDataHandler:
-    def __init__(self):
-        self.numerical_imputer = SimpleImputer(strategy='mean')
-        self.categorical_imputer = SimpleImputer(strategy='most_frequent')
-        self.numerical_column_identifiers = ['float64', 'int64']
-        self.categorical_column_identifiers = ['object']
+    """Fills numerical columns with their mean and categorical columns with their most frequent value.
+
+    Columns are filled one at a time and only when they actually hold missing values, so complete
+    columns are never copied. The input frame is left untouched unless transform is called with
+    copy=False, which fills float columns in the frame's own buffers. Float columns keep their width
+    (float32 stays float32), nullable integer columns with missing values become Float64 since a
+    mean is rarely integral.
+    """
+
+    def __init__(self, approximate_statistics: Optional[Dict] = None):
+        # With approximate_statistics the modes come from bounded-memory heavy-hitter summaries
+        self.approximate_statistics = approximate_statistics
+        self.numerical_column_identifiers = ['number']
+        self.excluded_column_identifiers = ['timedelta']
+        self.categorical_column_identifiers = ['object', 'category', 'string']
+        self.numerical_cols = None
+        self.categorical_cols = None
+        self.numerical_moments = None
+        self.categorical_counts = None
+        self.rows_seen = 0
+        self.numerical_fill_values = None
+        self.categorical_fill_values = None
+        self.is_fitted = False
+
+    def fit(self, data: pd.DataFrame) -> 'MissingDataHandler':
+        self.numerical_cols = None
+        return self.partial_fit(data)
+
+    def partial_fit(self, data: pd.DataFrame) -> 'MissingDataHandler':
+        # The column layout is fixed by the first chunk so every later chunk cleans to the same columns
+        if self.numerical_cols is None:
+            self.numerical_cols = list(data.select_dtypes(include=self.numerical_column_identifiers,
+                                                          exclude=self.excluded_column_identifiers).columns)
+            self.categorical_cols = list(data.select_dtypes(include=self.categorical_column_identifiers).columns)
+            self.numerical_moments = RunningMoments(self.numerical_cols)
+            self.categorical_counts = value_counts_for(self.categorical_cols, self.approximate_statistics)
+            self.rows_seen = 0
+
+        self.numerical_moments.update(data)
+        self.categorical_counts.update(data)
+        self.rows_seen += len(data)
+        return self._refresh_fill_values()
+
+    def fit_from_statistics(self, numerical_moments: RunningMoments, categorical_counts: RunningValueCounts,
+                            rows_seen: int) -> 'MissingDataHandler':
+        """Adopt statistics computed elsewhere, e.g. by an ExecutionPlan that shares one pass between steps."""
+        self.numerical_cols = list(numerical_moments.columns)
+        self.categorical_cols = list(categorical_counts.columns)
+        self.numerical_moments = numerical_moments
+        self.categorical_counts = categorical_counts
+        self.rows_seen = rows_seen
+        return self._refresh_fill_values()
+
+    def _refresh_fill_values(self) -> 'MissingDataHandler':
+        self.numerical_fill_values = self.numerical_moments.means
+        self.categorical_fill_values = self.categorical_counts.modes
+        self.is_fitted = True
+        return self
+
+    @property
+    def numerical_missing_counts(self) -> pd.Series:
+        return self.rows_seen - self.numerical_moments.counts
+
+    @property
+    def categorical_missing_counts(self) -> pd.Series:
+        return self.rows_seen - self.categorical_counts.totals
+
+    def transform(self, data: pd.DataFrame, profile: Optional[DataProfile] = None, copy: bool = True) -> pd.DataFrame:
+        """With a profile of `data`, columns it reports as complete are skipped without being scanned."""
+        if not self.is_fitted:
+            raise ValueError("MissingDataHandler must be fitted before calling transform.")
+        if copy:
+            # Filled columns replace the shared ones in a new frame; complete columns are still not copied
+            data = data.copy(deep=False)
+
+        for col in self.numerical_cols:
+            values = data[col]
+            if not _has_nulls(values, profile):
+                continue
+            fill_value = self.numerical_fill_values[col]
+            if values.dtype.kind == 'f' and isinstance(values.dtype, np.dtype):
+                array = values.to_numpy(copy=copy)
+                if not array.flags.writeable:
+                    array = array.copy()
+                np.copyto(array, array.dtype.type(fill_value), where=np.isnan(array))
+                if copy or not np.shares_memory(array, values.to_numpy()):
+                    data[col] = array
+            elif pd.api.types.is_integer_dtype(values.dtype):
+                data[col] = values.astype('Float64').fillna(fill_value)
+            else:
+                data[col] = values.fillna(fill_value)
 
-    def handle_missing_data(self, data: pd.DataFrame) -> pd.DataFrame:
-        numerical_cols = data.select_dtypes(include=self.numerical_column_identifiers).columns
-        categorical_cols = data.select_dtypes(include=self.categorical_column_identifiers).columns
+        for col in self.categorical_cols:
+            if _has_nulls(data[col], profile):
+                data[col] = data[col].fillna(self.categorical_fill_values[col])
 
-        data[numerical_cols] = self.numerical_imputer.fit_transform(data[numerical_cols])
+        return data
 
-        data[categorical_cols] = self.categorical_imputer.fit_transform(data[categorical_cols])
+    def handle_missing_data(self, data: pd.DataFrame, profile: Optional[DataProfile] = None) -> pd.DataFrame:
+        return self.fit(data).transform(data, profile)
 
-        return data
\ No newline at end of file
+def _has_nulls(values: pd.Series, profile: Optional[DataProfile]) -> bool:
+    column_profile = profile.get(values.name) if profile is not None else None
+    return column_profile.has_nulls if column_profile is not None else values.hasnans
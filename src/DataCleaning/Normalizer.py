@@ -1,12 +1,120 @@
+import numpy as np
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
+
+from typing_extensions import Optional
+
+from DataCleaning.DataProfiler import DataProfile
+from DataCleaning.IncrementalStatistics import APPROXIMATE_STATISTICS_DEFAULTS, RunningMoments, RunningQuantiles
 
 class Normalizer:
-    def __init__(self):
-        self.scaler = StandardScaler()
-        self.numerical_column_types = ['float64', 'int64']
-
-    def normalize(self, data: pd.DataFrame) -> pd.DataFrame:
-        numerical_features = data.select_dtypes(include=self.numerical_column_types).columns
-        data[numerical_features] = self.scaler.fit_transform(data[numerical_features])
-        return data
\ No newline at end of file
+    """Standard scaling (zero mean, unit population variance) of numerical columns.
+
+    Statistics are always accumulated in float64. Scaled float32 columns stay float32 and every
+    other numerical column becomes float64, or float32 for all of them with downcast_float32.
+    With robust=True columns are centred on their median and divided by their interquartile range,
+    like sklearn's RobustScaler, with quantiles from bounded-memory sketches that are exact until a
+    column outgrows the sketch capacity (about 2 / quantile_error values). The input frame is left
+    untouched unless transform is called with copy=False, which scales float columns that already
+    have the output dtype in the frame's own buffers.
+    """
+
+    def __init__(self, downcast_float32: bool = False, robust: bool = False,
+                 quantile_error: float = APPROXIMATE_STATISTICS_DEFAULTS['quantile_error']):
+        self.numerical_column_types = ['number']
+        self.excluded_column_types = ['timedelta']
+        self.downcast_float32 = downcast_float32
+        self.robust = robust
+        self.quantile_error = quantile_error
+        self.numerical_features = None
+        self.moments = None
+        self.quantiles = None
+        self.mean = None
+        # Subtracted by transform: the mean, or the median when robust
+        self.center = None
+        self.scale = None
+        self.is_fitted = False
+
+    def fit(self, data: pd.DataFrame) -> 'Normalizer':
+        self.numerical_features = None
+        return self.partial_fit(data)
+
+    def partial_fit(self, data: pd.DataFrame) -> 'Normalizer':
+        # Missing values are ignored, as sklearn's StandardScaler does
+        if self.numerical_features is None:
+            self.numerical_features = list(data.select_dtypes(include=self.numerical_column_types,
+                                                              exclude=self.excluded_column_types).columns)
+            self.moments = RunningMoments(self.numerical_features)
+            self.quantiles = RunningQuantiles(self.numerical_features, self.quantile_error) if self.robust else None
+
+        self.moments.update(data)
+        if self.robust:
+            self.quantiles.update(data)
+        self._refresh_scale()
+        return self
+
+    def fit_from_statistics(self, moments: RunningMoments, quantiles: Optional[RunningQuantiles] = None) -> 'Normalizer':
+        """Adopt moments computed elsewhere, e.g. by an ExecutionPlan that shares one pass between steps."""
+        if self.robust and quantiles is None:
+            raise ValueError("A robust Normalizer needs quantiles to be fitted from statistics.")
+        self.numerical_features = list(moments.columns)
+        self.moments = moments
+        self.quantiles = quantiles if self.robust else None
+        self._refresh_scale()
+        return self
+
+    def add_filled_values(self, fill_values: pd.Series, counts: pd.Series) -> 'Normalizer':
+        """Account for values an upstream imputer will fill in but which were missing while fitting."""
+        self.moments.add_constant(fill_values, counts)
+        if self.robust:
+            self.quantiles.add_constant(fill_values, counts)
+        self._refresh_scale()
+        return self
+
+    def _refresh_scale(self):
+        self.mean = self.moments.means
+        if self.robust:
+            self.center = self.quantiles.quantiles(0.5)
+            spread = self.quantiles.quantiles(0.75) - self.quantiles.quantiles(0.25)
+        else:
+            self.center = self.mean
+            spread = np.sqrt(self.moments.variance)
+        # Constant columns are only centred, never divided by zero
+        self.scale = spread.where(spread > np.finfo(np.float64).eps, 1.0)
+        self.is_fitted = True
+
+    def output_dtype_for(self, dtype) -> str:
+        """The dtype transform writes a numerical column of the given dtype as."""
+        if self.downcast_float32 or dtype in (np.float32, pd.Float32Dtype()):
+            return 'Float32' if pd.api.types.is_extension_array_dtype(dtype) else 'float32'
+        return 'Float64' if pd.api.types.is_extension_array_dtype(dtype) else 'float64'
+
+    def transform(self, data: pd.DataFrame, profile: Optional[DataProfile] = None, copy: bool = True) -> pd.DataFrame:
+        """With a profile of `data`, columns it reports as constant are written without being read."""
+        if not self.is_fitted:
+            raise ValueError("Normalizer must be fitted before calling transform.")
+        if copy:
+            data = data.copy(deep=False)
+        for col in self.numerical_features:
+            values = data[col]
+            output_dtype = self.output_dtype_for(values.dtype)
+            column_profile = profile.get(col) if profile is not None else None
+            if column_profile is not None and column_profile.is_constant and output_dtype in ('float32', 'float64'):
+                # Same scalar arithmetic, in the output dtype, as the vectorised path below
+                dtype = np.dtype(output_dtype)
+                value = (dtype.type(column_profile.min) - dtype.type(self.center[col])) / dtype.type(self.scale[col])
+                data[col] = np.full(len(data), value, dtype=dtype)
+            elif output_dtype in ('float32', 'float64'):
+                array = values.to_numpy()
+                # Without copy, columns that already have the output dtype are scaled in the frame's own buffer
+                in_place = not copy and values.dtype == output_dtype and array.flags.writeable
+                scaled = array if in_place else values.to_numpy(dtype=output_dtype, copy=True)
+                scaled -= scaled.dtype.type(self.center[col])
+                scaled /= scaled.dtype.type(self.scale[col])
+                if not in_place:
+                    data[col] = scaled
+            else:
+                data[col] = ((values.astype('Float64') - self.center[col]) / self.scale[col]).astype(output_dtype)
+        return data
+
+    def normalize(self, data: pd.DataFrame, profile: Optional[DataProfile] = None) -> pd.DataFrame:
+        return self.fit(data).transform(data, profile)
@@ -0,0 +1,46 @@
+import joblib
+import numpy as np
+import pandas as pd
+from typing_extensions import Callable, List, Tuple
+
+# Arrays above this size are handed to the workers as read-only memory maps in shared memory
+# (joblib dumps them once to /dev/shm) instead of being pickled into every task
+SHARED_MEMORY_THRESHOLD = '1M'
+
+def shard_columns(columns: List[str], n_shards: int) -> List[List[str]]:
+    """Split columns into at most n_shards contiguous, non-empty groups of near-equal size."""
+    n_shards = max(1, min(n_shards, len(columns)))
+    return [list(shard) for shard in np.array_split(np.array(columns, dtype=object), n_shards)]
+
+def run_sharded(function: Callable, data: pd.DataFrame, shards: List[Tuple[List[str], object]], n_jobs: int) -> list:
+    """Call function(state, data[columns]) for every (columns, state) shard in a process pool."""
+    return joblib.Parallel(n_jobs=n_jobs, max_nbytes=SHARED_MEMORY_THRESHOLD, mmap_mode='r')(
+        joblib.delayed(function)(state, data[columns]) for columns, state in shards
+    )
+
+def serial_column_order(input_columns: List[str], shard_layouts: List[List[Tuple[int, str, str]]]) -> List[str]:
+    """Recover the column order a single pipeline over all input columns would have produced.
+
+    Each shard layout is an Encoder.output_layout: within a shard the outputs are already in serial
+    order, so sorting by (block, source column position, position in shard) interleaves the shards.
+    """
+    position = {col: i for i, col in enumerate(input_columns)}
+    keyed = []
+    for layout in shard_layouts:
+        for i, (block, source, name) in enumerate(layout):
+            keyed.append(((block, position[source], i), name))
+    return [name for _, name in sorted(keyed, key=lambda item: item[0])]
+
+def assemble(outputs: List[pd.DataFrame], order: List[str]) -> pd.DataFrame:
+    columns = {name: output[name] for output in outputs for name in output.columns}
+    return pd.concat([columns[name] for name in order], axis=1)
+
+def _process_shard(pipeline, shard: pd.DataFrame):
+    output = pipeline.process(shard)
+    return pipeline, output
+
+def _fit_shard(pipeline, shard: pd.DataFrame):
+    return pipeline.fit(shard)
+
+def _transform_shard(pipeline, shard: pd.DataFrame) -> pd.DataFrame:
+    return pipeline.transform(shard)
@@ -0,0 +1,127 @@
+import cProfile
+import io
+import logging
+import pstats
+import time
+import tracemalloc
+from dataclasses import dataclass, asdict
+
+import pandas as pd
+from typing_extensions import Callable, List, Optional
+
+@dataclass
+class StepMetrics:
+    # Method name of the step, e.g. 'normalize'
+    step: str
+    # 'process', 'fit' or 'transform'
+    phase: str
+    wall_seconds: float
+    cpu_seconds: float
+    rows_in: int
+    columns_in: int
+    rows_out: int
+    columns_out: int
+    # Shallow size of the frames going in and out of the step
+    bytes_in: int
+    bytes_out: int
+    # Highest traced memory during the step above what was traced when it started (None without memory tracking)
+    peak_memory_delta: Optional[int] = None
+    # Traced memory still held after the step minus what was held before it (None without memory tracking)
+    bytes_allocated: Optional[int] = None
+    # cProfile and tracemalloc reports, only filled in for the profiled step
+    profile_report: Optional[str] = None
+    allocation_report: Optional[str] = None
+
+class InMemoryMetricsSink:
+    """Keeps every StepMetrics it receives, e.g. to find the bottleneck step on a dataset."""
+
+    def __init__(self):
+        self.metrics: List[StepMetrics] = []
+
+    def __call__(self, metrics: StepMetrics):
+        self.metrics.append(metrics)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame([asdict(metrics) for metrics in self.metrics])
+
+    def bottleneck(self) -> Optional[StepMetrics]:
+        return max(self.metrics, key=lambda metrics: metrics.wall_seconds, default=None)
+
+class LoggingMetricsSink:
+    """Logs one line per step through the standard logging module."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger(__name__)
+        self.level = level
+
+    def __call__(self, metrics: StepMetrics):
+        self.logger.log(self.level, "%s %s: wall=%.4fs cpu=%.4fs shape=%dx%d->%dx%d peak_delta=%s",
+                        metrics.phase, metrics.step, metrics.wall_seconds, metrics.cpu_seconds,
+                        metrics.rows_in, metrics.columns_in, metrics.rows_out, metrics.columns_out,
+                        metrics.peak_memory_delta)
+
+class PipelineProfiler:
+    """Runs pipeline steps and reports a StepMetrics for each of them to a sink."""
+
+    def __init__(self, sink: Callable[[StepMetrics], None], profile_step: Optional[str] = None,
+                 track_memory: bool = True):
+        self.sink = sink
+        # Method name of a single step to run under cProfile and tracemalloc snapshots
+        self.profile_step = profile_step
+        # tracemalloc slows allocation-heavy code down noticeably, so it can be switched off
+        self.track_memory = track_memory
+
+    def run(self, step: str, phase: str, function: Callable[[pd.DataFrame], pd.DataFrame],
+            data: pd.DataFrame) -> pd.DataFrame:
+        rows_in, columns_in = data.shape
+        bytes_in = int(data.memory_usage(deep=False).sum())
+        profiled = step == self.profile_step
+
+        started_tracing = (self.track_memory or profiled) and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        try:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+                memory_before = tracemalloc.get_traced_memory()[0]
+                snapshot_before = tracemalloc.take_snapshot() if profiled else None
+
+            profiler = cProfile.Profile() if profiled else None
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            try:
+                if profiler is not None:
+                    profiler.enable()
+                result = function(data)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+            wall_seconds, cpu_seconds = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+            metrics = StepMetrics(step=step, phase=phase, wall_seconds=wall_seconds, cpu_seconds=cpu_seconds,
+                                  rows_in=rows_in, columns_in=columns_in, rows_out=result.shape[0],
+                                  columns_out=result.shape[1], bytes_in=bytes_in,
+                                  bytes_out=int(result.memory_usage(deep=False).sum()))
+
+            if tracemalloc.is_tracing():
+                memory_after, peak = tracemalloc.get_traced_memory()
+                metrics.peak_memory_delta = peak - memory_before
+                metrics.bytes_allocated = memory_after - memory_before
+                if profiled:
+                    metrics.allocation_report = _allocation_report(tracemalloc.take_snapshot(), snapshot_before)
+        finally:
+            # Also when the step raises, so a failed step never leaves tracing switched on
+            if started_tracing:
+                tracemalloc.stop()
+        if profiler is not None:
+            metrics.profile_report = _profile_report(profiler)
+
+        self.sink(metrics)
+        return result
+
+def _profile_report(profiler: cProfile.Profile, limit: int = 25) -> str:
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
+
+def _allocation_report(snapshot: tracemalloc.Snapshot, baseline: tracemalloc.Snapshot, limit: int = 10) -> str:
+    return "\n".join(str(stat) for stat in snapshot.compare_to(baseline, 'lineno')[:limit])
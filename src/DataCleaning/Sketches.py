@@ -0,0 +1,159 @@
+import math
+
+import numpy as np
+import pandas as pd
+from typing_extensions import List, Optional, Union
+
+class HeavyHitters:
+    """Misra-Gries summary of the most frequent values of one column.
+
+    At most ceil(1 / error) counters are kept. Every retained count underestimates the true count
+    by at most error * n_seen and any value occurring more often than that is retained, so the
+    mode is correct whenever it leads by more than the error. Until a counter is evicted (evicted
+    stays False) the counts are exact.
+    """
+
+    def __init__(self, error: float = 0.001):
+        if not 0 < error < 1:
+            raise ValueError(f"HeavyHitters error must be between 0 and 1, got {error}.")
+        self.error = error
+        self.capacity = math.ceil(1 / error)
+        self.counts = pd.Series(dtype='int64')
+        self.n_seen = 0
+        # Evictions can leave fewer counters than capacity, so the count of counters alone cannot tell
+        self.evicted = False
+
+    def update(self, values: pd.Series):
+        counts = values.value_counts(dropna=True)
+        self.n_seen += int(counts.sum())
+        self._merge(counts[counts > 0])
+
+    def add(self, value, count: int):
+        self.n_seen += count
+        self._merge(pd.Series({value: count}))
+
+    def _merge(self, counts: pd.Series):
+        combined = self.counts.add(counts, fill_value=0).astype('int64')
+        if len(combined) > self.capacity:
+            # Mergeable Misra-Gries: subtract the (capacity + 1)-th largest count from every counter
+            threshold = combined.nlargest(self.capacity + 1).iloc[-1]
+            combined = combined[combined > threshold] - threshold
+            self.evicted = True
+        self.counts = combined
+
+class HyperLogLog:
+    """Distinct-value estimate in 2**precision one-byte registers.
+
+    The precision is chosen from the requested relative standard error (1.04 / sqrt(registers)),
+    e.g. 0.01 gives 16384 registers. Values are hashed with pandas' own value hashing, so
+    categorical and object columns holding the same values hash alike.
+    """
+
+    def __init__(self, error: float = 0.01):
+        if not 0 < error < 1:
+            raise ValueError(f"HyperLogLog error must be between 0 and 1, got {error}.")
+        self.error = error
+        self.precision = min(18, max(4, math.ceil(math.log2((1.04 / error) ** 2))))
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+
+    def update(self, values: pd.Series):
+        values = values.dropna()
+        if values.empty:
+            return
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        index_bits = np.uint64(64 - self.precision)
+        index = (hashes >> index_bits).astype(np.intp)
+        remainder = hashes & np.uint64((1 << (64 - self.precision)) - 1)
+        # Position of the first set bit in the hash bits left over after the register index
+        rank = (64 - self.precision) - _bit_length(remainder) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        if other.precision != self.precision:
+            raise ValueError("Only HyperLogLog sketches with the same precision can be merged.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are still empty
+            estimate = m * math.log(m / zeros)
+        return float(estimate)
+
+class QuantileSketch:
+    """KLL-style quantile sketch with a rank error of roughly `error` times the number of values.
+
+    Values are buffered in levels of at most `capacity` items, an item on level h standing for
+    2**h values. A full level is sorted and every other item, from a random offset, is promoted to
+    the next level. Until the first compaction the sketch holds every value and quantiles are exact,
+    interpolated the way numpy.quantile does.
+    """
+
+    def __init__(self, error: float = 0.001, seed: Optional[int] = 0):
+        if not 0 < error < 1:
+            raise ValueError(f"QuantileSketch error must be between 0 and 1, got {error}.")
+        self.error = error
+        self.capacity = max(16, math.ceil(2 / error))
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self.count = 0
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += values.size
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compact()
+
+    def add(self, value: float, count: int):
+        """Add `count` copies of `value` in O(log count) items, one per set bit of count."""
+        self.count += count
+        level = 0
+        while count:
+            if count & 1:
+                self._append(level, np.array([value], dtype=np.float64))
+            count >>= 1
+            level += 1
+        self._compact()
+
+    def _append(self, level: int, items: np.ndarray):
+        while len(self.levels) <= level:
+            self.levels.append(np.empty(0))
+        self.levels[level] = np.concatenate([self.levels[level], items])
+
+    def _compact(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if items.size > self.capacity:
+                items = np.sort(items)
+                paired = items.size - items.size % 2
+                self._append(level + 1, items[self._rng.integers(2):paired:2])
+                self.levels[level] = items[paired:]
+            level += 1
+
+    @property
+    def is_exact(self) -> bool:
+        return len(self.levels) == 1
+
+    def quantile(self, q: Union[float, List[float]]) -> Union[float, np.ndarray]:
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        if self.is_exact:
+            return np.quantile(self.levels[0], q)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level.size, 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side='left')
+        return items[order][np.minimum(positions, items.size - 1)]
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    # Exact for uint64: each 32-bit half fits a float64 mantissa
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
@@ -1,7 +1,22 @@
-from typing_extensions import Dict
+import pandas as pd
+from typing_extensions import Dict, Iterable, Tuple
 
 class DataValidator:
     def validate_data(self, collected_data: Dict):
         if "raw_data" in collected_data:
             return True, "Validation passed."
-        return False, "Validation failed."
\ No newline at end of file
+        return False, "Validation failed."
+
+    def validate_stream(self, chunks: Iterable[pd.DataFrame]) -> Tuple[bool, str]:
+        """Validate a dataset chunk by chunk, e.g. from DatasetMetadata.iter_raw_data, holding one chunk at a time."""
+        columns = None
+        rows = 0
+        for chunk in chunks:
+            if columns is None:
+                columns = list(chunk.columns)
+            elif list(chunk.columns) != columns:
+                return False, f"Validation failed: chunk at row {rows} has columns {list(chunk.columns)}, expected {columns}."
+            rows += len(chunk)
+        if not rows:
+            return False, "Validation failed: no rows."
+        return True, f"Validation passed: {rows} rows, {len(columns)} columns."
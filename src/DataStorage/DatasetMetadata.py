@@ -1,8 +1,20 @@
 import json
 import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
-from sentence_transformers import SentenceTransformer, util
-from typing_extensions import Optional, List, Dict, Literal, TypedDict
+import numpy as np
+import pandas as pd
+from typing_extensions import Callable, Iterator, Optional, List, Dict, Literal, Tuple, TypedDict
+
+from DataStorage.EmbeddingIndex import EmbeddingIndex
+from DataStorage.LexicalIndex import LexicalIndex
+from DataStorage.MetadataStore import MetadataStore, open_metadata_store
+from DataStorage.RawDataStore import DEFAULT_CHUNK_ROWS, RawDataStore
+from DataStorage.SimilarityModel import SimilarityModel
+from DataStorage.VectorIndex import BruteForceIndex, VectorIndex
+from DataStorage.VersionStore import VersionStore
+from common.DataRequirements import DataRequirements
 
 class Dataset(TypedDict):
     id: str
@@ -15,79 +27,261 @@ class Dataset(TypedDict):
 class DatasetMetadata:
     """Static-like class to access dataset metadata and raw data."""
     
-    METADATA_FILE = "./metadata.json"  # Default path to the metadata file
-    similarity_model = SentenceTransformer('all-MiniLM-L6-v2')  # Preload similarity model
+    METADATA_FILE = "./metadata.json"  # Default path to the metadata file; a .db/.sqlite path selects SQLite
+    SIMILARITY_MODEL_NAME = 'all-MiniLM-L6-v2'
+    similarity_model = SimilarityModel(SIMILARITY_MODEL_NAME)  # Loaded on first encode, or early via warm_up()
+    MATCH_THRESHOLD = 0.8  # Minimum cosine similarity for search_by_description to report a match
+    EMBEDDING_BATCH_SIZE = 64
+    HYBRID_CANDIDATES = 50  # Best BM25 matches reranked by embedding in search_hybrid
+    QUERY_CACHE_SIZE = 1024  # Query embeddings kept for repeated searches
+    vector_index_factory: Callable[[], VectorIndex] = BruteForceIndex  # Exact search unless swapped for e.g. IVFIndex
+    _embedding_index: Optional[EmbeddingIndex] = None
+    _lexical_index: Optional[LexicalIndex] = None
+    _lexical_index_file: Optional[str] = None
+    _synced_state: Optional[tuple] = None  # (embedding index, lexical index, store change token) at the last sync
+    _query_embeddings: 'OrderedDict[str, np.ndarray]' = OrderedDict()
+    _query_embeddings_model = None
+    _query_embeddings_lock = threading.Lock()
+    _store: Optional[MetadataStore] = None
+    raw_data_store = RawDataStore()
 
     @classmethod
     def set_metadata_file(cls, file_path: str):
         """Set the metadata file path for unit testing."""
         cls.METADATA_FILE = file_path
 
+    @classmethod
+    def set_vector_index(cls, factory: Callable[[], VectorIndex]):
+        """Choose the nearest-neighbour index behind search_top_k, e.g. lambda: IVFIndex(n_probe=16)."""
+        cls.vector_index_factory = factory
+        cls._embedding_index = None
+
+    @classmethod
+    def store(cls) -> MetadataStore:
+        """The storage backend of the current metadata file, opened once."""
+        if cls._store is None or cls._store.path != cls.METADATA_FILE:
+            cls._store = open_metadata_store(cls.METADATA_FILE)
+        return cls._store
+
+    @classmethod
+    def cache_info(cls) -> Dict[str, int]:
+        """Metadata lookups served from the in-memory copy (hits) and ones that reread the file (misses)."""
+        store = cls.store()
+        return {"hits": store.hits, "misses": store.misses}
+
     @classmethod
     def load_metadata(cls) -> List[Dataset]:
-        """Load metadata from the JSON file."""
-        try:
-            with open(cls.METADATA_FILE, 'r') as file:
-                metadata = json.load(file).get("datasets", [])
-                return metadata
-        except FileNotFoundError:
-            print(f"Metadata file not found at {cls.METADATA_FILE}.")
-            return []
+        """Load every dataset from the metadata store."""
+        return cls.store().load_all()
 
     @classmethod
     def save_metadata(cls, metadata: List[Dataset]):
-        """Save metadata to the JSON file."""
-        with open(cls.METADATA_FILE, 'w') as file:
-            json.dump({"datasets": metadata}, file, indent=4)
+        """Replace the stored metadata with the given datasets."""
+        cls.store().save_all(metadata)
+
+    @classmethod
+    def embedding_index_path(cls) -> str:
+        """Path prefix of the description embeddings stored next to the metadata file."""
+        return os.path.splitext(cls.METADATA_FILE)[0] + ".embeddings"
+
+    @classmethod
+    def encode_descriptions(cls, descriptions: List[str]) -> np.ndarray:
+        """Embed descriptions in batches as unit-length float32 rows, so a dot product is the cosine similarity."""
+        return cls.similarity_model.encode(descriptions, batch_size=cls.EMBEDDING_BATCH_SIZE, convert_to_numpy=True,
+                                           normalize_embeddings=True).astype(np.float32)
+
+    @classmethod
+    def load_embedding_index(cls) -> EmbeddingIndex:
+        """The embedding index of the current metadata file, loaded once and kept in memory."""
+        path = cls.embedding_index_path()
+        if cls._embedding_index is None or cls._embedding_index.path != path:
+            cls._embedding_index = EmbeddingIndex.load(path, cls.SIMILARITY_MODEL_NAME, cls.vector_index_factory())
+        return cls._embedding_index
+
+    @classmethod
+    def encode_queries(cls, queries: List[str]) -> np.ndarray:
+        """Embed queries like encode_descriptions, reusing the embeddings of the QUERY_CACHE_SIZE most recent queries."""
+        with cls._query_embeddings_lock:
+            if cls._query_embeddings_model is not cls.similarity_model:
+                cls._query_embeddings = OrderedDict()
+                cls._query_embeddings_model = cls.similarity_model
+            cache = cls._query_embeddings
+            found = {}
+            for query in queries:
+                if query in cache:
+                    cache.move_to_end(query)
+                    found[query] = cache[query]
+        missing = [query for query in dict.fromkeys(queries) if query not in found]
+        if missing:
+            # Encoded outside the lock so one slow batch does not hold up cached lookups
+            found.update(zip(missing, cls.encode_descriptions(missing)))
+            with cls._query_embeddings_lock:
+                cache.update((query, found[query]) for query in missing)
+                while len(cache) > cls.QUERY_CACHE_SIZE:
+                    cache.popitem(last=False)
+        return np.stack([found[query] for query in queries])
+
+    @classmethod
+    def load_lexical_index(cls) -> LexicalIndex:
+        """The BM25 index over the ids and descriptions of the current metadata file, kept in memory."""
+        if cls._lexical_index is None or cls._lexical_index_file != cls.METADATA_FILE:
+            cls._lexical_index = LexicalIndex()
+            cls._lexical_index_file = cls.METADATA_FILE
+        return cls._lexical_index
+
+    @staticmethod
+    def _lexical_text(dataset: Dataset) -> str:
+        return f"{dataset['id']} {dataset['description']}"
+
+    @classmethod
+    def index_datasets(cls, datasets: List[Dataset]):
+        """Embed the new or changed descriptions of datasets in one batch and persist the index.
+
+        Writes do not load the embedding model for this: until something else has loaded it, the next
+        search embeds every new or changed description in one batch when it resyncs the index.
+        """
+        if getattr(cls.similarity_model, 'is_loaded', True):
+            index = cls.load_embedding_index()
+            if index.upsert([dataset["id"] for dataset in datasets], [dataset["description"] for dataset in datasets],
+                            cls.encode_descriptions):
+                index.save()
+        cls.load_lexical_index().upsert([dataset["id"] for dataset in datasets],
+                                        [cls._lexical_text(dataset) for dataset in datasets])
+
+    @classmethod
+    def _sync_indexes(cls) -> Tuple[EmbeddingIndex, LexicalIndex]:
+        """Both search indexes, resynced with the whole catalog only when the store reports a change."""
+        embedding_index, lexical_index = cls.load_embedding_index(), cls.load_lexical_index()
+        token = cls.store().change_token()
+        state = (embedding_index, lexical_index, token)
+        if token is None or state != cls._synced_state:
+            metadata = cls.load_metadata()
+            ids = [dataset["id"] for dataset in metadata]
+            # Picks up datasets written before the indexes existed or edited outside this class
+            if embedding_index.sync(ids, [dataset["description"] for dataset in metadata], cls.encode_descriptions):
+                embedding_index.save()
+            lexical_index.sync(ids, [cls._lexical_text(dataset) for dataset in metadata])
+            cls._synced_state = state
+        return embedding_index, lexical_index
 
     @classmethod
     def add_dataset(cls, dataset: Dataset):
         """Add a new dataset to the metadata."""
-        metadata = cls.load_metadata()
-        dataset["date_created"] = datetime.now().isoformat()
-        dataset["date_modified"] = dataset["date_created"]
-        metadata.append(dataset)
-        cls.save_metadata(metadata)
+        cls.add_datasets([dataset])
+
+    @classmethod
+    def add_datasets(cls, datasets: List[Dataset]):
+        """Add many datasets with one metadata write and one batched embedding call."""
+        if not datasets:
+            return
+        now = datetime.now().isoformat()
+        for dataset in datasets:
+            dataset["date_created"] = now
+            dataset["date_modified"] = now
+        cls.store().insert_many(datasets)
+        cls.index_datasets(datasets)
 
     @classmethod
     def update_dataset(cls, dataset_id: str, updates: Dict):
         """Update an existing dataset and save the changes."""
-        metadata = cls.load_metadata()
-        for dataset in metadata:
-            if dataset["id"] == dataset_id:
-                dataset.update(updates)
-                dataset["date_modified"] = datetime.now().isoformat()
-                cls.save_metadata(metadata)
-                return dataset
-        return None
+        return cls.update_datasets({dataset_id: updates})[0]
+
+    @classmethod
+    def update_datasets(cls, updates: Dict[str, Dict]) -> List[Optional[Dataset]]:
+        """Apply updates keyed by dataset id with one metadata write. Unknown ids give None."""
+        ids = list(updates)
+        datasets = cls.search_by_ids(ids)
+        now = datetime.now().isoformat()
+        updated = []
+        for dataset_id, dataset in zip(ids, datasets):
+            if dataset is not None:
+                dataset.update(updates[dataset_id])
+                dataset["date_modified"] = now
+                updated.append(dataset)
+        if updated:
+            cls.store().update_many(updated)
+            described = [dataset for dataset in updated if "description" in updates[dataset["id"]]]
+            if described:
+                cls.index_datasets(described)
+        return datasets
 
     @classmethod
     def search_by_id(cls, dataset_id: str) -> Optional[Dataset]:
         """Find a dataset by its unique ID."""
-        metadata = cls.load_metadata()
-        for dataset in metadata:
-            if dataset["id"] == dataset_id:
-                return dataset
-        return None
+        return cls.store().get(dataset_id)
 
     @classmethod
-    def search_by_description(cls, query: str) -> Optional[Dataset]:
-        """Perform a semantic search to find datasets by their description."""
-        metadata = cls.load_metadata()
-        best_match = None
-        best_score = -1
+    def search_by_ids(cls, dataset_ids: List[str]) -> List[Optional[Dataset]]:
+        """Find many datasets with one lookup, None for unknown ids."""
+        return cls.store().get_many(dataset_ids)
 
-        query_embedding = cls.similarity_model.encode(query, convert_to_tensor=True)
+    @classmethod
+    def find_datasets(cls, data_source: Optional[str] = None, modified_after: Optional[str] = None) -> List[Dataset]:
+        """Datasets from a data source and/or modified after an ISO timestamp."""
+        return cls.store().find(data_source, modified_after)
 
-        for dataset in metadata:
-            description_embedding = cls.similarity_model.encode(dataset["description"], convert_to_tensor=True)
-            similarity_score = util.pytorch_cos_sim(query_embedding, description_embedding).item()
+    @classmethod
+    def search_top_k(cls, query: str, top_k: int = 5, min_score: Optional[float] = None) -> List[Tuple[Dataset, float]]:
+        """Return up to top_k (dataset, cosine similarity) pairs for the query, best first.
+
+        Stored descriptions are embedded once and kept in the index, so a query costs one forward
+        pass for the query and one matrix-vector product over the catalog.
+        """
+        return cls._search([query], top_k, min_score)[0]
+
+    @classmethod
+    def _search(cls, queries: List[str], top_k: int, min_score: Optional[float]) -> List[List[Tuple[Dataset, float]]]:
+        if not queries:
+            return []
+        index, _ = cls._sync_indexes()
+        return cls._with_datasets([[(dataset_id, score) for dataset_id, score in index.search(query_embedding, top_k)
+                                    if min_score is None or score > min_score]
+                                   for query_embedding in cls.encode_queries(queries)])
+
+    @classmethod
+    def search_hybrid(cls, query: str, top_k: int = 5, min_score: Optional[float] = None) -> List[Tuple[Dataset, float]]:
+        """Like search_top_k, but only the HYBRID_CANDIDATES best BM25 matches of the query's words
+        against dataset ids and descriptions are scored by embedding.
+
+        Scores are cosine similarities, as in search_top_k. A query that shares no word with any
+        dataset, or whose candidates all score below min_score, falls back to a full embedding search.
+        """
+        return cls._search_hybrid([query], top_k, min_score)[0]
 
-            if similarity_score > best_score and similarity_score > 0.8:  # Set a threshold for matching
-                best_score = similarity_score
-                best_match = dataset
+    @classmethod
+    def _search_hybrid(cls, queries: List[str], top_k: int,
+                       min_score: Optional[float]) -> List[List[Tuple[Dataset, float]]]:
+        if not queries:
+            return []
+        embedding_index, lexical_index = cls._sync_indexes()
+        results = []
+        for query, query_embedding in zip(queries, cls.encode_queries(queries)):
+            candidates = [dataset_id for dataset_id, _ in lexical_index.search(query, cls.HYBRID_CANDIDATES)]
+            matches = [(dataset_id, score) for dataset_id, score in embedding_index.rerank(query_embedding, candidates, top_k)
+                       if min_score is None or score > min_score]
+            if not matches:
+                matches = [(dataset_id, score) for dataset_id, score in embedding_index.search(query_embedding, top_k)
+                           if min_score is None or score > min_score]
+            results.append(matches)
+        return cls._with_datasets(results)
+
+    @classmethod
+    def _with_datasets(cls, results: List[List[Tuple[str, float]]]) -> List[List[Tuple[Dataset, float]]]:
+        ids = list(dict.fromkeys(dataset_id for matches in results for dataset_id, _ in matches))
+        datasets = dict(zip(ids, cls.search_by_ids(ids)))
+        return [[(datasets[dataset_id], score) for dataset_id, score in matches if datasets[dataset_id] is not None]
+                for matches in results]
+
+    @classmethod
+    def search_by_description(cls, query: str) -> Optional[Dataset]:
+        """Perform a semantic search to find datasets by their description."""
+        return cls.search_by_descriptions([query])[0]
 
-        return best_match
+    @classmethod
+    def search_by_descriptions(cls, queries: List[str]) -> List[Optional[Dataset]]:
+        """The best match above MATCH_THRESHOLD for each query, from search_hybrid, embedding all new queries in one batch."""
+        return [matches[0][0] if matches else None
+                for matches in cls._search_hybrid(queries, top_k=1, min_score=cls.MATCH_THRESHOLD)]
 
     @classmethod
     def get_raw_data(cls, dataset_id: str) -> Optional[Dict]:
@@ -105,6 +299,61 @@ class DatasetMetadata:
                 return {"data": f"Fetched data from API: {api_url}"}
         return None
 
+    @classmethod
+    def local_data_path(cls, dataset_id: str) -> Optional[str]:
+        """Path of a locally stored dataset, None for unknown, remote or missing ones."""
+        dataset = cls.search_by_id(dataset_id)
+        if not dataset or dataset["data_source"] != "local" or not dataset["data_link"] \
+                or not os.path.exists(dataset["data_link"]):
+            return None
+        return dataset["data_link"]
+
+    @classmethod
+    def read_raw_data(cls, dataset_id: str, columns: Optional[List[str]] = None,
+                      requirements: Optional[DataRequirements] = None) -> Optional[pd.DataFrame]:
+        """Read a local dataset as a DataFrame from its columnar copy, made on first access.
+
+        Only the requested columns are read, and only the rows matching the requirements' filters and
+        timeframe. Returns None for datasets that are not stored locally.
+        """
+        path = cls.local_data_path(dataset_id)
+        if path is None:
+            return None
+        return cls.raw_data_store.read(path, columns, filters=requirements.filters if requirements else None,
+                                       timeframe=requirements.timeframe if requirements else None)
+
+    @classmethod
+    def iter_raw_data(cls, dataset_id: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, columns: Optional[List[str]] = None,
+                      requirements: Optional[DataRequirements] = None) -> Iterator[pd.DataFrame]:
+        """Yield a local dataset as DataFrame chunks of at most chunk_rows rows, read from disk as they are needed.
+
+        The chunks can be passed straight to DataCleaningPipeline.fit_stream/transform_stream or
+        DataValidator.validate_stream. Yields nothing for datasets that are not stored locally.
+        """
+        path = cls.local_data_path(dataset_id)
+        if path is None:
+            return
+        yield from cls.raw_data_store.iter_chunks(path, chunk_rows, columns,
+                                                  filters=requirements.filters if requirements else None,
+                                                  timeframe=requirements.timeframe if requirements else None)
+
+    @classmethod
+    def version_store(cls) -> VersionStore:
+        """Versioned raw data of every dataset, kept in <metadata stem>.versions next to the metadata file."""
+        return VersionStore(os.path.splitext(cls.METADATA_FILE)[0] + ".versions")
+
+    @classmethod
+    def commit_raw_data(cls, dataset_id: str, data: pd.DataFrame) -> int:
+        """Store data as a new version of the dataset's raw data and record it as the dataset's current version."""
+        version = cls.version_store().commit(dataset_id, data)
+        cls.update_dataset(dataset_id, {"version": version})
+        return version
+
+    @classmethod
+    def diff_raw_data(cls, dataset_id: str, old_version: int, new_version: Optional[int] = None) -> Dict:
+        """Change statistics between two stored versions (the latest by default) of a dataset."""
+        return cls.version_store().diff(dataset_id, old_version, new_version)
+
     @classmethod
     def list_datasets(cls) -> List[Dataset]:
         """List all datasets currently stored in the metadata."""
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+from typing_extensions import Callable, Dict, List, Optional, Tuple
+
+from DataStorage.VectorIndex import BruteForceIndex, VectorIndex
+
+# Turns a batch of texts into an (n, dim) matrix of unit-length embeddings
+EncodeFunction = Callable[[List[str]], np.ndarray]
+
+class EmbeddingIndex:
+    """Unit-length description embeddings, one per dataset, persisted next to the metadata file.
+
+    The matrix is stored as <path>.npy and the row order (dataset ids and a hash of each embedded
+    description) as <path>.json, so a description is only embedded again after it changes. In memory
+    the vectors live in a VectorIndex, exact brute force unless another index is passed in.
+    """
+
+    def __init__(self, path: str, model_name: str, vector_index: Optional[VectorIndex] = None):
+        self.path = path
+        self.model_name = model_name
+        self.vector_index = vector_index if vector_index is not None else BruteForceIndex()
+        self.description_hashes: Dict[str, str] = {}
+
+    @classmethod
+    def load(cls, path: str, model_name: str, vector_index: Optional[VectorIndex] = None) -> 'EmbeddingIndex':
+        """Load a persisted index, or return an empty one if none exists or it was built with another model."""
+        index = cls(path, model_name, vector_index)
+        if not (os.path.exists(path + ".json") and os.path.exists(path + ".npy")):
+            return index
+        with open(path + ".json", 'r') as file:
+            layout = json.load(file)
+        if layout.get("model") != model_name:
+            return index
+        vectors = np.load(path + ".npy")
+        if len(vectors) != len(layout["ids"]):
+            return index
+        if len(vectors):
+            index.vector_index.add(layout["ids"], vectors)
+        index.description_hashes = dict(zip(layout["ids"], layout["description_hashes"]))
+        return index
+
+    @property
+    def ids(self) -> List[str]:
+        return self.vector_index.keys()
+
+    def save(self):
+        ids = self.ids
+        if not ids:
+            return
+        # Written to temporary files first so a crash never leaves a matrix that disagrees with its ids
+        np.save(self.path + ".tmp.npy", self.vector_index.vectors())
+        with open(self.path + ".json.tmp", 'w') as file:
+            json.dump({"model": self.model_name, "ids": ids,
+                       "description_hashes": [self.description_hashes[dataset_id] for dataset_id in ids]}, file)
+        os.replace(self.path + ".tmp.npy", self.path + ".npy")
+        os.replace(self.path + ".json.tmp", self.path + ".json")
+
+    def __len__(self) -> int:
+        return len(self.description_hashes)
+
+    def __contains__(self, dataset_id: str) -> bool:
+        return dataset_id in self.description_hashes
+
+    def is_current(self, dataset_id: str, description: str) -> bool:
+        return self.description_hashes.get(dataset_id) == description_hash(description)
+
+    def upsert(self, ids: List[str], descriptions: List[str], encode: EncodeFunction) -> int:
+        """Embed, in one batch, the descriptions that are new or changed. Returns how many were embedded."""
+        stale = {dataset_id: description for dataset_id, description in zip(ids, descriptions)
+                 if not self.is_current(dataset_id, description)}
+        if not stale:
+            return 0
+        vectors = np.asarray(encode(list(stale.values())), dtype=np.float32)
+        self.vector_index.add(list(stale), vectors)
+        self.description_hashes.update((dataset_id, description_hash(description))
+                                       for dataset_id, description in stale.items())
+        return len(stale)
+
+    def remove(self, ids: List[str]):
+        ids = [dataset_id for dataset_id in ids if dataset_id in self.description_hashes]
+        self.vector_index.remove(ids)
+        for dataset_id in ids:
+            del self.description_hashes[dataset_id]
+
+    def sync(self, ids: List[str], descriptions: List[str], encode: EncodeFunction) -> bool:
+        """Bring the index in line with the metadata: drop unknown ids and embed new or changed descriptions."""
+        known = set(ids)
+        removed = [dataset_id for dataset_id in self.description_hashes if dataset_id not in known]
+        self.remove(removed)
+        return self.upsert(ids, descriptions, encode) > 0 or bool(removed)
+
+    def search(self, query_vector: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
+        """(dataset id, cosine similarity) of the top_k closest descriptions, best first."""
+        if not len(self) or top_k <= 0:
+            return []
+        return self.vector_index.search(np.asarray(query_vector, dtype=np.float32), top_k)
+
+    def rerank(self, query_vector: np.ndarray, ids: List[str], top_k: int) -> List[Tuple[str, float]]:
+        """(dataset id, cosine similarity) of the top_k of ids, scoring only their embeddings."""
+        if not ids or top_k <= 0:
+            return []
+        return self.vector_index.score(np.asarray(query_vector, dtype=np.float32), ids)[:top_k]
+
+def description_hash(description: str) -> str:
+    return hashlib.blake2b(description.encode(), digest_size=16).hexdigest()
@@ -0,0 +1,116 @@
+import math
+import re
+
+import numpy as np
+from typing_extensions import Dict, List, Optional, Tuple
+
+# Ids such as "nba_player_stats_2023" split into the same words as their descriptions
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+class LexicalIndex:
+    """BM25 inverted index over short documents, kept up to date one document at a time.
+
+    Each document gets a row, reused after it is removed, and each term maps to the rows containing
+    it and the term's frequency in each. Adding, changing or removing a document only edits the
+    postings of its own terms; a term's postings are turned into arrays the first time a query
+    needs them after a change, so a query scores every document containing a term at once.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.texts: Dict[str, str] = {}
+        self.rows: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = []
+        self.lengths = np.zeros(16, dtype=np.float32)
+        self.total_length = 0
+        self._free: List[int] = []
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self.rows
+
+    def upsert(self, ids: List[str], texts: List[str]) -> int:
+        """Index the documents that are new or whose text changed. Returns how many were indexed."""
+        changed = [(doc_id, text) for doc_id, text in zip(ids, texts) if self.texts.get(doc_id) != text]
+        self.remove([doc_id for doc_id, _ in changed])
+        for doc_id, text in changed:
+            if self._free:
+                row = self._free.pop()
+                self.ids[row] = doc_id
+            else:
+                row = len(self.ids)
+                self.ids.append(doc_id)
+                if row >= len(self.lengths):
+                    self.lengths = np.concatenate([self.lengths, np.zeros(len(self.lengths), dtype=np.float32)])
+            tokens = tokenize(text)
+            for term in set(tokens):
+                self.postings.setdefault(term, {})[row] = tokens.count(term)
+                self._arrays.pop(term, None)
+            self.rows[doc_id] = row
+            self.texts[doc_id] = text
+            self.lengths[row] = len(tokens)
+            self.total_length += len(tokens)
+        return len(changed)
+
+    def remove(self, ids: List[str]):
+        for doc_id in ids:
+            row = self.rows.pop(doc_id, None)
+            if row is None:
+                continue
+            for term in set(tokenize(self.texts.pop(doc_id))):
+                documents = self.postings[term]
+                del documents[row]
+                self._arrays.pop(term, None)
+                if not documents:
+                    del self.postings[term]
+            self.total_length -= int(self.lengths[row])
+            self.lengths[row] = 0
+            self.ids[row] = None
+            self._free.append(row)
+
+    def sync(self, ids: List[str], texts: List[str]) -> bool:
+        """Bring the index in line with the given documents: drop unknown ids and index new or changed texts."""
+        known = set(ids)
+        removed = [doc_id for doc_id in self.texts if doc_id not in known]
+        self.remove(removed)
+        return self.upsert(ids, texts) > 0 or bool(removed)
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            documents = self.postings[term]
+            arrays = (np.fromiter(documents.keys(), dtype=np.intp, count=len(documents)),
+                      np.fromiter(documents.values(), dtype=np.float32, count=len(documents)))
+            self._arrays[term] = arrays
+        return arrays
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """(document id, BM25 score) of the top_k documents sharing a term with the query, best first."""
+        terms = [term for term in set(tokenize(query)) if term in self.postings]
+        if not terms or top_k <= 0:
+            return []
+        count = len(self.rows)
+        average_length = self.total_length / count or 1.0
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term in terms:
+            rows, frequencies = self._term_arrays(term)
+            idf = math.log(1 + (count - len(rows) + 0.5) / (len(rows) + 0.5))
+            norms = self.k1 * (1 - self.b + self.b * self.lengths[rows] / average_length)
+            scores[rows] += idf * frequencies * (self.k1 + 1) / (frequencies + norms)
+        matched = np.flatnonzero(scores)
+        top_k = min(top_k, len(matched))
+        if not top_k:
+            return []
+        best = matched[np.argpartition(-scores[matched], top_k - 1)[:top_k]]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(self.ids[row], float(scores[row])) for row in best]
@@ -0,0 +1,485 @@
+import copy
+import json
+import os
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+
+from typing_extensions import Container, Dict, List, Optional
+
+try:
+    # POSIX only; just the .jsonl operation log needs it, so JSON and SQLite catalogs still work without it
+    import fcntl
+except ImportError:
+    fcntl = None
+
+SQLITE_EXTENSIONS = ['.db', '.sqlite', '.sqlite3']
+LOG_EXTENSIONS = ['.jsonl']
+SQLITE_MAX_PARAMETERS = 500
+# A log is folded into its snapshot once it outgrows both this and the snapshot itself
+COMPACT_BYTES = 1 << 20
+
+class MetadataStore(ABC):
+    """Where DatasetMetadata keeps its datasets. Datasets are plain dicts keyed by their "id"."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Lookups answered from memory and lookups that had to read the storage, for backends that cache
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    def load_all(self) -> List[Dict]:
+        """Every dataset, in the order they were added."""
+
+    @abstractmethod
+    def save_all(self, datasets: List[Dict]):
+        """Replace the whole catalog."""
+
+    @abstractmethod
+    def get_many(self, dataset_ids: List[str]) -> List[Optional[Dict]]:
+        """The dataset of each id, None for unknown ids, in the order asked for."""
+
+    @abstractmethod
+    def insert_many(self, datasets: List[Dict]):
+        """Add datasets in a single write.
+
+        Raises ValueError and writes nothing if an id is already stored or repeated among datasets;
+        update_many changes stored datasets.
+        """
+
+    @abstractmethod
+    def update_many(self, datasets: List[Dict]):
+        """Overwrite the stored datasets with the same ids in a single write."""
+
+    def get(self, dataset_id: str) -> Optional[Dict]:
+        return self.get_many([dataset_id])[0]
+
+    def insert(self, dataset: Dict):
+        self.insert_many([dataset])
+
+    def update(self, dataset: Dict):
+        self.update_many([dataset])
+
+    def change_token(self) -> Optional[object]:
+        """A value that differs whenever the catalog may have changed since it was last taken, e.g. so
+        indexes built from the catalog know when to resync. None if the backend cannot tell."""
+        return None
+
+    def find(self, data_source: Optional[str] = None, modified_after: Optional[str] = None) -> List[Dict]:
+        """Datasets from data_source and/or modified after the given ISO timestamp."""
+        return [dataset for dataset in self.load_all()
+                if (data_source is None or dataset.get("data_source") == data_source)
+                and (modified_after is None or dataset.get("date_modified", "") > modified_after)]
+
+class JsonMetadataStore(MetadataStore):
+    """The whole catalog in one JSON file, rewritten for every change.
+
+    The parsed catalog and an id -> dataset dict are kept in memory and reused for as long as the
+    file's modification time and size stay the same, so repeated lookups skip the reread. Another
+    process rewriting the file changes its mtime/size and the next call reloads it. Callers get
+    deep copies, so editing a returned dataset, nested values included, never touches the cached one.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        # Bumped whenever the cached catalog is replaced, by a reload or by a write through this store
+        self.version = 0
+        self._signature = None
+        self._datasets: List[Dict] = []
+        self._by_id: Dict[str, Dict] = {}
+
+    def _cache(self, datasets: List[Dict], signature: Optional[tuple]):
+        self._datasets = datasets
+        self._by_id = {dataset["id"]: dataset for dataset in datasets}
+        # A missing signature never matches, so a file we could not stat is always reread
+        self._signature = signature
+        self.version += 1
+
+    def _cached(self) -> List[Dict]:
+        signature = _stat_signature(self.path)
+        if signature is not None and signature == self._signature:
+            self.hits += 1
+            return self._datasets
+        self.misses += 1
+        try:
+            with open(self.path, 'r') as file:
+                datasets = json.load(file).get("datasets", [])
+        except FileNotFoundError:
+            print(f"Metadata file not found at {self.path}.")
+            datasets = []
+        self._cache(datasets, signature)
+        return datasets
+
+    def invalidate(self):
+        self._signature = None
+
+    def change_token(self) -> Optional[object]:
+        self._cached()
+        return self.version
+
+    def load_all(self) -> List[Dict]:
+        return copy.deepcopy(self._cached())
+
+    def save_all(self, datasets: List[Dict]):
+        with open(self.path, 'w') as file:
+            json.dump({"datasets": datasets}, file, indent=4)
+        self._cache(copy.deepcopy(datasets), _stat_signature(self.path))
+
+    def get_many(self, dataset_ids: List[str]) -> List[Optional[Dict]]:
+        self._cached()
+        return copy.deepcopy([self._by_id.get(dataset_id) for dataset_id in dataset_ids])
+
+    def insert_many(self, datasets: List[Dict]):
+        stored = self._cached()
+        _check_new_ids(datasets, self._by_id, self.path)
+        self.save_all(stored + list(datasets))
+
+    def update_many(self, datasets: List[Dict]):
+        updates = {dataset["id"]: dataset for dataset in datasets}
+        stored = self._cached()
+        if any(dataset["id"] in updates for dataset in stored):
+            self.save_all([updates.get(dataset["id"], dataset) for dataset in stored])
+
+class SqliteMetadataStore(MetadataStore):
+    """One row per dataset in a SQLite database in WAL mode.
+
+    The indexed fields (id, data_source, date_created, date_modified) get their own columns and the
+    full dataset is kept as a JSON document, so datasets may carry extra keys. Lookups by id go
+    through the primary key and writes touch a single row. Every statement is a fixed SQL string,
+    so sqlite3 prepares it once per connection and reuses it from its statement cache.
+    """
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS datasets (
+               id TEXT PRIMARY KEY,
+               data_source TEXT,
+               date_created TEXT,
+               date_modified TEXT,
+               document TEXT NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS datasets_data_source ON datasets (data_source)",
+        "CREATE INDEX IF NOT EXISTS datasets_date_created ON datasets (date_created)",
+        "CREATE INDEX IF NOT EXISTS datasets_date_modified ON datasets (date_modified)",
+    ]
+    INSERT = "INSERT INTO datasets (id, data_source, date_created, date_modified, document) VALUES (?, ?, ?, ?, ?)"
+    UPSERT = INSERT.replace("INSERT", "INSERT OR REPLACE", 1)
+    UPDATE = "UPDATE datasets SET data_source = ?, date_created = ?, date_modified = ?, document = ? WHERE id = ?"
+    SELECT_ALL = "SELECT document FROM datasets ORDER BY rowid"
+    SELECT_BY_ID = "SELECT document FROM datasets WHERE id = ?"
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        # sqlite3 connections may not be shared between threads, so each thread opens its own
+        self._local = threading.local()
+        # Writes through this store; writes by other connections show up in PRAGMA data_version
+        self.version = 0
+        with self.connection() as connection:
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+
+    def connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # With WAL a commit only needs to reach the log, not the database file
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def close(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    @staticmethod
+    def _row(dataset: Dict) -> tuple:
+        return (dataset["id"], dataset.get("data_source"), dataset.get("date_created"), dataset.get("date_modified"),
+                json.dumps(dataset))
+
+    def load_all(self) -> List[Dict]:
+        return [json.loads(document) for document, in self.connection().execute(self.SELECT_ALL)]
+
+    def save_all(self, datasets: List[Dict]):
+        with self.connection() as connection:
+            connection.execute("DELETE FROM datasets")
+            connection.executemany(self.UPSERT, [self._row(dataset) for dataset in datasets])
+        self.version += 1
+
+    def get(self, dataset_id: str) -> Optional[Dict]:
+        row = self.connection().execute(self.SELECT_BY_ID, (dataset_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, dataset_ids: List[str]) -> List[Optional[Dict]]:
+        found = {}
+        connection = self.connection()
+        # Stays under SQLite's limit on bound parameters per statement
+        for start in range(0, len(dataset_ids), SQLITE_MAX_PARAMETERS):
+            chunk = dataset_ids[start:start + SQLITE_MAX_PARAMETERS]
+            query = f"SELECT id, document FROM datasets WHERE id IN ({', '.join('?' * len(chunk))})"
+            found.update((dataset_id, document) for dataset_id, document in connection.execute(query, chunk))
+        return [json.loads(found[dataset_id]) if dataset_id in found else None for dataset_id in dataset_ids]
+
+    def insert_many(self, datasets: List[Dict]):
+        try:
+            with self.connection() as connection:
+                connection.executemany(self.INSERT, [self._row(dataset) for dataset in datasets])
+            self.version += 1
+        except sqlite3.IntegrityError:
+            stored = self.get_many([dataset["id"] for dataset in datasets])
+            _check_new_ids(datasets, {dataset["id"] for dataset in stored if dataset is not None}, self.path)
+            raise
+
+    def update_many(self, datasets: List[Dict]):
+        with self.connection() as connection:
+            connection.executemany(self.UPDATE, [(*values, dataset_id) for dataset_id, *values
+                                                 in map(self._row, datasets)])
+        self.version += 1
+
+    def change_token(self) -> Optional[object]:
+        return self.connection().execute("PRAGMA data_version").fetchone()[0], self.version
+
+    def find(self, data_source: Optional[str] = None, modified_after: Optional[str] = None) -> List[Dict]:
+        conditions, parameters = [], []
+        if data_source is not None:
+            conditions.append("data_source = ?")
+            parameters.append(data_source)
+        if modified_after is not None:
+            conditions.append("date_modified > ?")
+            parameters.append(modified_after)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.connection().execute(f"SELECT document FROM datasets{where} ORDER BY rowid", parameters)
+        return [json.loads(document) for document, in rows]
+
+class LogMetadataStore(MetadataStore):
+    """Append-only operation log (one JSON line per write) folded into a snapshot file from time to time.
+
+    Writers append a single line under an exclusive flock on <path>.lock, so any number of processes
+    can add or update datasets concurrently without rewriting the catalog. Readers take the lock
+    shared, load <stem>.snapshot.json and replay the log; afterwards they only replay lines appended
+    since their last read. Once the log outgrows the snapshot a background thread compacts it: the
+    new snapshot is written without holding the lock, then, under the lock, it is renamed into place
+    and the log is replaced by the lines appended in the meantime. Replaying a log on top of a
+    snapshot that already contains it gives the same catalog, so a crash between the two renames
+    loses nothing.
+    """
+
+    def __init__(self, path: str, compact_bytes: int = COMPACT_BYTES, background_compaction: bool = True):
+        if fcntl is None:
+            raise ValueError(f"The metadata log at {path} needs fcntl file locks, which this platform lacks; "
+                             "use a .json or .db metadata file instead.")
+        super().__init__(path)
+        self.snapshot_path = os.path.splitext(path)[0] + ".snapshot.json"
+        self.lock_path = path + ".lock"
+        self.compact_bytes = compact_bytes
+        self.background_compaction = background_compaction
+        self.version = 0
+        self._datasets: Dict[str, Dict] = {}
+        self._snapshot_signature = None
+        self._log_inode = None
+        self._offset = 0
+        self._state_lock = threading.Lock()
+        self._compaction: Optional[threading.Thread] = None
+
+    @contextmanager
+    def _locked(self, exclusive: bool):
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_snapshot(self) -> Dict[str, Dict]:
+        try:
+            with open(self.snapshot_path, 'r') as file:
+                return {dataset["id"]: dataset for dataset in json.load(file).get("datasets", [])}
+        except FileNotFoundError:
+            return {}
+
+    def _replay(self, datasets: Dict[str, Dict], offset: int) -> int:
+        """Apply the complete log lines after offset and return the offset just past the last one."""
+        try:
+            with open(self.path, 'rb') as file:
+                file.seek(offset)
+                data = file.read()
+        except FileNotFoundError:
+            return offset
+        # A line without its newline is still being written, or was torn by a crash
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            if not line.strip():
+                continue
+            try:
+                operation = json.loads(line)
+            except ValueError:
+                # The remains of a torn line, closed off by the next writer
+                continue
+            _apply(datasets, operation)
+        return offset + len(complete)
+
+    def _refresh(self) -> Dict[str, Dict]:
+        with self._state_lock, self._locked(exclusive=False):
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> Dict[str, Dict]:
+        # Callers hold _state_lock and the file lock, shared or exclusive
+        snapshot_signature = _stat_signature(self.snapshot_path)
+        log_signature = _stat_signature(self.path)
+        log_inode = log_signature[0] if log_signature else None
+        if snapshot_signature != self._snapshot_signature or log_inode != self._log_inode:
+            self.misses += 1
+            self._datasets = self._read_snapshot()
+            self._offset = self._replay(self._datasets, 0)
+            self._snapshot_signature, self._log_inode = snapshot_signature, log_inode
+            self.version += 1
+        else:
+            offset = self._replay(self._datasets, self._offset)
+            if offset == self._offset:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self._offset = offset
+                self.version += 1
+        return self._datasets
+
+    def _append(self, operations: List[Dict], new_datasets: Optional[List[Dict]] = None):
+        """Append operations under the exclusive lock, after checking that new_datasets are not stored yet."""
+        line = "".join(json.dumps(operation) + "\n" for operation in operations).encode()
+        # _state_lock is taken before the file lock, in the same order as _refresh
+        with self._state_lock, self._locked(exclusive=True):
+            if new_datasets is not None:
+                _check_new_ids(new_datasets, self._refresh_locked(), self.path)
+            descriptor = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                # Writers hold the lock, so a last line without its newline was torn by a crash; end it
+                # first so this write does not get joined onto it
+                size = os.fstat(descriptor).st_size
+                if size and os.pread(descriptor, 1, size - 1) != b"\n":
+                    line = b"\n" + line
+                written = 0
+                while written < len(line):
+                    written += os.write(descriptor, line[written:])
+                log_size = os.fstat(descriptor).st_size
+            finally:
+                os.close(descriptor)
+        snapshot_signature = _stat_signature(self.snapshot_path)
+        if log_size > max(self.compact_bytes, snapshot_signature[2] if snapshot_signature else 0):
+            self._schedule_compaction()
+
+    def _schedule_compaction(self):
+        if not self.background_compaction:
+            self.compact()
+        elif self._compaction is None or not self._compaction.is_alive():
+            self._compaction = threading.Thread(target=self.compact, name="metadata-compaction", daemon=True)
+            self._compaction.start()
+
+    def wait_for_compaction(self):
+        if self._compaction is not None:
+            self._compaction.join()
+
+    def compact(self) -> bool:
+        """Fold the log into a new snapshot. Returns False if another process compacted first."""
+        with self._locked(exclusive=False):
+            snapshot_signature = _stat_signature(self.snapshot_path)
+            log_signature = _stat_signature(self.path)
+            if log_signature is None:
+                return False
+            datasets = self._read_snapshot()
+            offset = self._replay(datasets, 0)
+
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(self.snapshot_path + suffix, 'w') as file:
+            json.dump({"datasets": list(datasets.values())}, file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        with self._locked(exclusive=True):
+            current_log = _stat_signature(self.path)
+            if (_stat_signature(self.snapshot_path) != snapshot_signature or current_log is None
+                    or current_log[0] != log_signature[0]):
+                os.remove(self.snapshot_path + suffix)
+                return False
+            with open(self.path, 'rb') as file:
+                file.seek(offset)
+                tail = file.read()
+            with open(self.path + suffix, 'wb') as file:
+                file.write(tail)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(self.snapshot_path + suffix, self.snapshot_path)
+            os.replace(self.path + suffix, self.path)
+        return True
+
+    def load_all(self) -> List[Dict]:
+        return copy.deepcopy(list(self._refresh().values()))
+
+    def change_token(self) -> Optional[object]:
+        self._refresh()
+        return self.version
+
+    def save_all(self, datasets: List[Dict]):
+        self._append([{"op": "reset", "datasets": datasets}])
+
+    def get_many(self, dataset_ids: List[str]) -> List[Optional[Dict]]:
+        datasets = self._refresh()
+        return copy.deepcopy([datasets.get(dataset_id) for dataset_id in dataset_ids])
+
+    def insert_many(self, datasets: List[Dict]):
+        self._append([{"op": "put", "dataset": dataset} for dataset in datasets], new_datasets=datasets)
+
+    def update_many(self, datasets: List[Dict]):
+        self._append([{"op": "put", "dataset": dataset} for dataset in datasets])
+
+def open_metadata_store(path: str) -> MetadataStore:
+    """SQLite for .db/.sqlite/.sqlite3 paths, an operation log for .jsonl, the JSON file otherwise."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in SQLITE_EXTENSIONS:
+        return SqliteMetadataStore(path)
+    if extension in LOG_EXTENSIONS:
+        return LogMetadataStore(path)
+    return JsonMetadataStore(path)
+
+def _stat_signature(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+def _check_new_ids(datasets: List[Dict], stored: Container[str], path: str):
+    ids = [dataset["id"] for dataset in datasets]
+    clashes = ({dataset_id for dataset_id, count in Counter(ids).items() if count > 1}
+               | {dataset_id for dataset_id in ids if dataset_id in stored})
+    if clashes:
+        raise ValueError(f"Datasets with ids {sorted(clashes)} already exist in {path}.")
+
+def _apply(datasets: Dict[str, Dict], operation: Dict):
+    if operation["op"] == "put":
+        datasets[operation["dataset"]["id"]] = operation["dataset"]
+    elif operation["op"] == "reset":
+        datasets.clear()
+        datasets.update((dataset["id"], dataset) for dataset in operation["datasets"])
+    else:
+        raise ValueError(f"Unknown metadata log operation '{operation['op']}'.")
+
+def migrate_json_to_sqlite(json_path: str, sqlite_path: str) -> int:
+    """Copy every dataset of a JSON metadata file into a SQLite store. Returns how many were copied.
+
+    Rerunning the migration overwrites the datasets it copied before instead of duplicating them.
+    """
+    datasets = JsonMetadataStore(json_path).load_all()
+    store = SqliteMetadataStore(sqlite_path)
+    with store.connection() as connection:
+        connection.executemany(store.UPSERT, [store._row(dataset) for dataset in datasets])
+    store.close()
+    return len(datasets)
+
+if __name__ == "__main__":
+    # python -m DataStorage.MetadataStore metadata.json metadata.db
+    print(f"Migrated {migrate_json_to_sqlite(sys.argv[1], sys.argv[2])} datasets to {sys.argv[2]}.")
@@ -0,0 +1,251 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from typing_extensions import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from DataCleaning.MappedDataset import SCHEMA_FILE, MappedDataset, write_mapped_dataset
+
+COLUMNAR_SUFFIX = ".columns"
+# Written after the columns, recording which version of the source file they were converted from
+SOURCE_FILE = "source.json"
+ARROW_FILE_EXTENSIONS = ['.parquet', '.feather', '.arrow']
+# Read chunk by chunk straight from the file rather than through a columnar copy
+STREAMED_EXTENSIONS = ['.csv', '.jsonl'] + ARROW_FILE_EXTENSIONS
+DEFAULT_CHUNK_ROWS = 100_000
+# A text column only takes the timeframe if its name says it holds the record's time and its values
+# mostly parse as dates; "day" or "month" alone name parts of a date, as in weekday or birthday
+TIME_COLUMN_HINTS = ['date', 'time', 'timestamp', 'year', 'season']
+TIME_COLUMN_MIN_PARSED = 0.9
+SAMPLE_ROWS = 1000
+
+class RawDataStore:
+    """Columnar, memory-mapped access to local raw data files.
+
+    A JSON file is converted once, on first access, into a MappedDataset directory next to it
+    (<file>.columns) and converted again only after the JSON file changes. Reads then map the column
+    files instead of parsing JSON: filters are evaluated on their own columns first (once per
+    category for text columns) and only the matching rows of the projected columns are read.
+    CSV and JSON Lines files, and Parquet, Feather and Arrow IPC files through pyarrow when it is
+    installed, are streamed chunk by chunk instead.
+    """
+
+    def columnar_path(self, source_path: str) -> str:
+        return source_path + COLUMNAR_SUFFIX
+
+    def open(self, source_path: str) -> MappedDataset:
+        """The columnar copy of source_path, converting it first if it is missing or stale."""
+        if os.path.isdir(source_path):
+            return MappedDataset(source_path)
+        directory = self.columnar_path(source_path)
+        if self._source_signature(source_path) != self._converted_from(directory):
+            self.convert(source_path)
+        return MappedDataset(directory)
+
+    def convert(self, source_path: str) -> MappedDataset:
+        with open(source_path, 'r') as file:
+            data = json_to_frame(json.load(file))
+        directory = self.columnar_path(source_path)
+        dataset = write_mapped_dataset(directory, data)
+        with open(os.path.join(directory, SOURCE_FILE + ".tmp"), 'w') as file:
+            json.dump(self._source_signature(source_path), file)
+        os.replace(os.path.join(directory, SOURCE_FILE + ".tmp"), os.path.join(directory, SOURCE_FILE))
+        return dataset
+
+    def read(self, source_path: str, columns: Optional[List[str]] = None, filters: Optional[Dict[str, str]] = None,
+             timeframe: Optional[str] = None, time_column: Optional[str] = None) -> pd.DataFrame:
+        """Rows of source_path matching filters and timeframe, restricted to columns.
+
+        Filter keys that name a column (case-insensitively) keep rows equal to the value; other keys
+        are ignored, since requirement filters are not always column names. The timeframe applies to
+        time_column, or else to the first datetime column or date-named column whose values parse as
+        dates; without one it is not applied.
+        """
+        if os.path.splitext(source_path)[1].lower() in STREAMED_EXTENSIONS:
+            chunks = list(self.iter_chunks(source_path, DEFAULT_CHUNK_ROWS, columns, filters, timeframe, time_column))
+            return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
+
+        dataset = self.open(source_path)
+        mask = np.ones(len(dataset), dtype=bool)
+        for name, value in _matching_filters(dataset.columns, filters).items():
+            mask &= dataset.where(name, lambda values: _equals(values, value))
+        bounds = parse_timeframe(timeframe)
+        if bounds is not None:
+            time_column = time_column or _time_column(dataset.columns, dataset.dtypes,
+                                                      lambda name: dataset.column(name, 0, SAMPLE_ROWS))
+        if bounds is not None and time_column is not None:
+            mask &= dataset.where(time_column, lambda values: _within(values, bounds))
+
+        columns = dataset.columns if columns is None else columns
+        if mask.all():
+            return dataset.read(columns=columns)
+        return dataset.take(np.flatnonzero(mask), columns).reset_index(drop=True)
+
+    def iter_chunks(self, source_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, columns: Optional[List[str]] = None,
+                    filters: Optional[Dict[str, str]] = None, timeframe: Optional[str] = None,
+                    time_column: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """Yield the rows of source_path that match filters and timeframe, at most chunk_rows at a time.
+
+        Only one chunk of the needed columns is in memory at once. Chunks keep the row positions of
+        the source as their index; chunks left empty by the filters are skipped.
+        """
+        extension = os.path.splitext(source_path)[1].lower()
+        if extension == '.csv':
+            names, sample, blocks = _csv_source(source_path, chunk_rows)
+        elif extension == '.jsonl':
+            names, sample, blocks = _json_lines_source(source_path, chunk_rows)
+        elif extension in ARROW_FILE_EXTENSIONS:
+            names, sample, blocks = _arrow_source(source_path, chunk_rows)
+        else:
+            dataset = self.open(source_path)
+            names, sample = dataset.columns, dataset.read(0, SAMPLE_ROWS)
+            blocks = lambda needed: dataset.iter_blocks(chunk_rows, needed)
+
+        matching = _matching_filters(names, filters)
+        bounds = parse_timeframe(timeframe)
+        if bounds is not None:
+            time_column = time_column or _time_column(names, sample.dtypes, lambda name: sample[name])
+        else:
+            time_column = None
+        columns = names if columns is None else columns
+        needed = list(dict.fromkeys(list(columns) + list(matching) + ([time_column] if time_column else [])))
+
+        for chunk in blocks(needed):
+            mask = np.ones(len(chunk), dtype=bool)
+            for name, value in matching.items():
+                mask &= _equals(chunk[name], value)
+            if time_column is not None:
+                mask &= _within(chunk[time_column], bounds)
+            if mask.any():
+                yield chunk.loc[mask, columns] if not mask.all() else chunk[columns]
+
+    @staticmethod
+    def _source_signature(source_path: str) -> List[int]:
+        stat = os.stat(source_path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    @staticmethod
+    def _converted_from(directory: str) -> Optional[List[int]]:
+        if not os.path.exists(os.path.join(directory, SCHEMA_FILE)):
+            return None
+        try:
+            with open(os.path.join(directory, SOURCE_FILE), 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+def json_to_frame(payload: Any) -> pd.DataFrame:
+    """A list of records, a dict of equal-length columns, or either under a "data" key."""
+    if isinstance(payload, dict) and isinstance(payload.get("data"), (list, dict)):
+        payload = payload["data"]
+    if isinstance(payload, list):
+        data = pd.DataFrame.from_records(payload)
+    elif isinstance(payload, dict) and all(isinstance(values, list) for values in payload.values()):
+        data = pd.DataFrame(payload)
+    else:
+        raise ValueError("Raw data must be a list of records or a dict of columns to be stored as columns.")
+    for col in data.columns[data.dtypes == object]:
+        # Nested values have no columnar form; they are kept as their JSON text
+        nested = data[col].map(lambda value: isinstance(value, (dict, list)))
+        if nested.any():
+            data[col] = data[col].map(lambda value: json.dumps(value) if isinstance(value, (dict, list)) else value)
+    return data
+
+def parse_timeframe(timeframe: Optional[str]) -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+    """Inclusive (start, end) of timeframes such as "2023", "2019-2023", "2023-05" or "2023-01-01 to 2023-03-31".
+
+    Returns None for anything else, e.g. "last season", so no rows are dropped on a guess.
+    """
+    if not timeframe:
+        return None
+    dates = re.findall(r"\b\d{4}(?:-\d{1,2}(?:-\d{1,2})?)?\b", timeframe)
+    if not 1 <= len(dates) <= 2:
+        return None
+    try:
+        periods = [pd.Period(date, freq={0: 'Y', 1: 'M', 2: 'D'}[date.count('-')]) for date in dates]
+    except ValueError:
+        return None
+    return periods[0].start_time, periods[-1].end_time
+
+def _matching_filters(columns: List[str], filters: Optional[Dict[str, str]]) -> Dict[str, str]:
+    by_name = {col.lower(): col for col in columns}
+    return {by_name[key.lower()]: value for key, value in (filters or {}).items() if key.lower() in by_name}
+
+def _equals(values: pd.Series, value: str) -> np.ndarray:
+    if pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype):
+        number = pd.to_numeric(value, errors='coerce')
+        return (values == number).to_numpy(dtype=bool, na_value=False)
+    return (values.astype(str).str.casefold() == str(value).casefold()).to_numpy(dtype=bool, na_value=False)
+
+def _within(values: pd.Series, bounds: Tuple[pd.Timestamp, pd.Timestamp]) -> np.ndarray:
+    start, end = bounds
+    if pd.api.types.is_integer_dtype(values.dtype):
+        # Integer time columns are taken to be years, e.g. a season column
+        return ((values >= start.year) & (values <= end.year)).to_numpy(dtype=bool, na_value=False)
+    times = pd.to_datetime(values, errors='coerce', format='mixed') if not pd.api.types.is_datetime64_any_dtype(
+        values.dtype) else values
+    if getattr(times.dtype, 'tz', None) is not None:
+        times = times.dt.tz_convert(None)
+    return ((times >= start) & (times <= end)).to_numpy(dtype=bool, na_value=False)
+
+def _time_column(columns: List[str], dtypes: pd.Series, sample: Callable[[str], pd.Series]) -> Optional[str]:
+    """The column a timeframe is pushed down to, judged from the values of a sample, or None."""
+    for col in columns:
+        if pd.api.types.is_datetime64_any_dtype(dtypes[col]):
+            return col
+    for col in columns:
+        name, dtype = col.lower(), dtypes[col]
+        if not any(hint in name for hint in TIME_COLUMN_HINTS) or pd.api.types.is_bool_dtype(dtype):
+            continue
+        values = sample(col).dropna()
+        if values.empty:
+            continue
+        if pd.api.types.is_integer_dtype(dtype):
+            # Integer columns named for years, e.g. a season column, are years if every value could be one
+            if ('year' in name or 'season' in name) and values.between(1000, 2999).all():
+                return col
+        elif not pd.api.types.is_numeric_dtype(dtype):
+            # Strict ISO parsing: "2022-23" is a season, not the 23rd of January, and is left alone
+            parsed = pd.to_datetime(values.astype(str), errors='coerce', format='ISO8601')
+            if parsed.notna().mean() >= TIME_COLUMN_MIN_PARSED:
+                return col
+    return None
+
+def _csv_source(path: str,
+                chunk_rows: int) -> Tuple[List[str], pd.DataFrame, Callable[[List[str]], Iterator[pd.DataFrame]]]:
+    # read_csv infers types per chunk, so the types inferred from a sample are passed to every chunk.
+    # Integers and booleans become their nullable types, as a later chunk may have missing values
+    sample = pd.read_csv(path, nrows=SAMPLE_ROWS)
+    dtypes = {col: 'Int64' if pd.api.types.is_integer_dtype(dtype) else 'boolean' if pd.api.types.is_bool_dtype(dtype)
+              else dtype for col, dtype in sample.dtypes.items()}
+    sample = sample.astype(dtypes)
+
+    def blocks(needed: List[str]) -> Iterator[pd.DataFrame]:
+        return pd.read_csv(path, chunksize=chunk_rows, usecols=needed, dtype={col: dtypes[col] for col in needed})
+    return list(sample.columns), sample, blocks
+
+def _json_lines_source(path: str, chunk_rows: int):
+    with pd.read_json(path, lines=True, nrows=SAMPLE_ROWS, chunksize=SAMPLE_ROWS) as reader:
+        first = next(iter(reader), pd.DataFrame())
+
+    def blocks(needed: List[str]) -> Iterator[pd.DataFrame]:
+        with pd.read_json(path, lines=True, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                yield chunk.reindex(columns=needed)
+    return list(first.columns), first, blocks
+
+def _arrow_source(path: str, chunk_rows: int):
+    try:
+        import pyarrow.dataset as arrow_dataset
+    except ImportError as error:
+        raise ValueError(f"Reading {path} requires pyarrow.") from error
+    file_format = 'parquet' if os.path.splitext(path)[1].lower() == '.parquet' else 'ipc'
+    dataset = arrow_dataset.dataset(path, format=file_format)
+    sample = dataset.head(SAMPLE_ROWS).to_pandas()
+
+    def blocks(needed: List[str]) -> Iterator[pd.DataFrame]:
+        for batch in dataset.to_batches(columns=needed, batch_size=chunk_rows):
+            yield batch.to_pandas()
+    return dataset.schema.names, sample, blocks
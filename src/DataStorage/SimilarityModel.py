@@ -0,0 +1,122 @@
+import os
+import threading
+from multiprocessing import AuthenticationError, get_context
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+from typing_extensions import Any, Callable, List, Optional, Tuple
+
+# Builds the model object (anything with a SentenceTransformer-style encode) from its name
+ModelLoader = Callable[[str], Any]
+
+def load_sentence_transformer(model_name: str):
+    # Imported here: sentence_transformers pulls in torch, which dominates the import time of every entry point
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+class SimilarityModel:
+    """Loads the embedding model on first use, once, even when several threads ask for it at the same time.
+
+    warm_up() starts the load on a background thread so it overlaps with other start-up work. To share one
+    loaded model between worker processes either load it before forking (fork_pool) or serve it from one
+    EmbeddingWorker process and give the workers an EmbeddingClient.
+    """
+
+    def __init__(self, model_name: str, loader: ModelLoader = load_sentence_transformer):
+        self.model_name = model_name
+        self.loader = loader
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def get(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self.loader(self.model_name)
+        return self._model
+
+    def warm_up(self) -> threading.Thread:
+        thread = threading.Thread(target=self.get, name=f"load-{self.model_name}", daemon=True)
+        thread.start()
+        return thread
+
+    def encode(self, sentences: List[str], **kwargs) -> np.ndarray:
+        return self.get().encode(sentences, **kwargs)
+
+    def fork_pool(self, processes: Optional[int] = None):
+        """A fork-started multiprocessing pool whose workers inherit the already loaded model."""
+        self.get()
+        return get_context('fork').Pool(processes)
+
+class EmbeddingWorker:
+    """One process holding the model and answering encode requests from other local processes.
+
+    Requests are (sentences, encode keyword arguments) sent over a multiprocessing connection at
+    address, authenticated with authkey; the reply is the embedding matrix or the raised exception.
+    The connection unpickles what it receives, so the key must stay secret: by default a random one
+    is generated per worker and handed out only through client().
+    """
+
+    def __init__(self, model_name: str, address: Tuple[str, int] = ('localhost', 0), authkey: Optional[bytes] = None,
+                 loader: ModelLoader = load_sentence_transformer):
+        self.model_name = model_name
+        self.address = address
+        self.authkey = authkey if authkey is not None else os.urandom(32)
+        self.loader = loader
+        self.process = None
+
+    def start(self) -> Tuple[str, int]:
+        """Start the worker and return the address it listens on, once the model is loaded."""
+        context = get_context()
+        parent, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(self.model_name, self.address, self.authkey, self.loader, child),
+                                       daemon=True)
+        self.process.start()
+        self.address = parent.recv()
+        return self.address
+
+    def client(self) -> 'EmbeddingClient':
+        return EmbeddingClient(self.address, self.authkey)
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+            self.process = None
+
+class EmbeddingClient:
+    """Stand-in for the model that forwards encode calls to an EmbeddingWorker."""
+
+    def __init__(self, address: Tuple[str, int], authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+
+    def encode(self, sentences: List[str], **kwargs) -> np.ndarray:
+        with Client(self.address, authkey=self.authkey) as connection:
+            connection.send((list(sentences), kwargs))
+            result = connection.recv()
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+def _serve(model_name: str, address, authkey: bytes, loader: ModelLoader, ready):
+    model = loader(model_name)
+    with Listener(address, authkey=authkey) as listener:
+        ready.send(listener.address)
+        ready.close()
+        while True:
+            try:
+                connection = listener.accept()
+            except AuthenticationError:
+                # A client without the key is turned away without ending the worker
+                continue
+            with connection:
+                sentences, kwargs = connection.recv()
+                try:
+                    connection.send(model.encode(sentences, **kwargs))
+                except Exception as error:
+                    connection.send(error)
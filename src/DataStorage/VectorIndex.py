@@ -0,0 +1,310 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+from typing_extensions import Dict, List, Optional, Tuple
+
+QUANTIZATIONS = ['float32', 'float16', 'int8']
+SCORE_BLOCK_ROWS = 4096
+KMEANS_SAMPLE_PER_LIST = 64
+
+class VectorStore:
+    """Growable matrix of (optionally quantized) vectors addressed by key, with O(1) swap-remove deletes.
+
+    float16 halves and int8 quarters the memory of float32. int8 codes are scaled per vector so its
+    largest component maps to 127 and scores are rescaled after the dot product.
+    """
+
+    def __init__(self, quantization: str = 'float32'):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{quantization}'. Allowed quantizations are: {', '.join(QUANTIZATIONS)}")
+        self.quantization = quantization
+        self.keys: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.codes: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def nbytes(self) -> int:
+        if self.codes is None:
+            return 0
+        return self.size * (self.codes.shape[1] * self.codes.itemsize + (4 if self.scales is not None else 0))
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        if self.quantization == 'int8':
+            scales = np.abs(vectors).max(axis=1) / 127
+            scales[scales == 0] = 1.0
+            return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return vectors.astype(self.quantization), None
+
+    def _reserve(self, rows: int, dimension: int):
+        if self.codes is None:
+            self.codes = np.empty((max(rows, 16), dimension), dtype=np.int8 if self.quantization == 'int8' else self.quantization)
+            self.scales = np.empty(len(self.codes), dtype=np.float32) if self.quantization == 'int8' else None
+        elif rows > len(self.codes):
+            # Capacity doubles so a run of single inserts stays amortised O(1)
+            capacity = max(rows, 2 * len(self.codes))
+            codes = np.empty((capacity, self.codes.shape[1]), dtype=self.codes.dtype)
+            codes[:self.size] = self.codes[:self.size]
+            self.codes = codes
+            if self.scales is not None:
+                scales = np.empty(capacity, dtype=np.float32)
+                scales[:self.size] = self.scales[:self.size]
+                self.scales = scales
+
+    def add(self, keys: List[str], vectors: np.ndarray):
+        """Insert vectors, replacing the vector of any key already present."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        codes, scales = self._encode(vectors)
+        new = [i for i, key in enumerate(keys) if key not in self.rows]
+        self._reserve(self.size + len(new), vectors.shape[1])
+        for i, key in enumerate(keys):
+            row = self.rows.get(key)
+            if row is None:
+                row = self.size
+                self.rows[key] = row
+                self.keys.append(key)
+                self.size += 1
+            self.codes[row] = codes[i]
+            if scales is not None:
+                self.scales[row] = scales[i]
+
+    def remove(self, keys: List[str]):
+        for key in keys:
+            row = self.rows.pop(key, None)
+            if row is None:
+                continue
+            last = self.size - 1
+            if row != last:
+                # Move the last vector into the freed row
+                self.codes[row] = self.codes[last]
+                if self.scales is not None:
+                    self.scales[row] = self.scales[last]
+                self.keys[row] = self.keys[last]
+                self.rows[self.keys[row]] = row
+            self.keys.pop()
+            self.size -= 1
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        if self.size == 0:
+            return np.empty(0, dtype=np.float32)
+        codes = self.codes[:self.size]
+        if self.quantization == 'float32':
+            return codes @ query
+        # Dequantize a block at a time so the float32 copy stays in cache
+        scores = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, SCORE_BLOCK_ROWS):
+            scores[start:start + SCORE_BLOCK_ROWS] = codes[start:start + SCORE_BLOCK_ROWS].astype(np.float32) @ query
+        return scores * self.scales[:self.size] if self.scales is not None else scores
+
+    def key_scores(self, query: np.ndarray, keys: List[str]) -> np.ndarray:
+        """Scores of the given stored keys only, in their order."""
+        rows = np.fromiter((self.rows[key] for key in keys), dtype=np.intp, count=len(keys))
+        scores = self.codes[rows].astype(np.float32) @ query if len(rows) else np.empty(0, dtype=np.float32)
+        return scores * self.scales[rows] if self.scales is not None else scores
+
+    def vectors(self) -> np.ndarray:
+        """Stored vectors as float32 (dequantized), in the order of self.keys."""
+        if self.size == 0:
+            return np.empty((0, 0), dtype=np.float32)
+        vectors = self.codes[:self.size].astype(np.float32)
+        return vectors * self.scales[:self.size, None] if self.scales is not None else vectors
+
+class VectorIndex(ABC):
+    """Interface of the nearest-neighbour indexes behind dataset search. Scores are dot products."""
+
+    @abstractmethod
+    def add(self, keys: List[str], vectors: np.ndarray):
+        """Store vectors under keys, replacing the vectors of keys already stored."""
+
+    @abstractmethod
+    def remove(self, keys: List[str]):
+        """Drop the given keys; unknown keys are ignored."""
+
+    @abstractmethod
+    def search(self, query: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
+        """(key, score) of the top_k stored vectors with the highest scores, best first."""
+
+    @abstractmethod
+    def score(self, query: np.ndarray, keys: List[str]) -> List[Tuple[str, float]]:
+        """(key, score) of the given keys that are stored, best first, e.g. to rerank candidates found elsewhere."""
+
+    @abstractmethod
+    def keys(self) -> List[str]:
+        """Stored keys, in the order of vectors()."""
+
+    @abstractmethod
+    def vectors(self) -> np.ndarray:
+        """Stored vectors as one float32 matrix, in the order of keys()."""
+
+    def __len__(self) -> int:
+        return len(self.keys())
+
+    @abstractmethod
+    def __contains__(self, key: str) -> bool:
+        """Whether a vector is stored under key."""
+
+class BruteForceIndex(VectorIndex):
+    """Exact search: one matrix-vector product over every stored vector."""
+
+    def __init__(self, quantization: str = 'float32'):
+        self.store = VectorStore(quantization)
+
+    def add(self, keys: List[str], vectors: np.ndarray):
+        self.store.add(keys, vectors)
+
+    def remove(self, keys: List[str]):
+        self.store.remove(keys)
+
+    def search(self, query: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
+        return _top_k(self.store.scores(np.asarray(query, dtype=np.float32)), self.store.keys, top_k)
+
+    def score(self, query: np.ndarray, keys: List[str]) -> List[Tuple[str, float]]:
+        keys = [key for key in keys if key in self.store.rows]
+        return _top_k(self.store.key_scores(np.asarray(query, dtype=np.float32), keys), keys, len(keys))
+
+    def keys(self) -> List[str]:
+        return list(self.store.keys)
+
+    def vectors(self) -> np.ndarray:
+        return self.store.vectors()
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.store.rows
+
+    @property
+    def nbytes(self) -> int:
+        return self.store.nbytes
+
+class IVFIndex(VectorIndex):
+    """Inverted-file index: vectors are bucketed by their nearest k-means centroid and a query only
+    scans the n_probe buckets whose centroids score highest.
+
+    Until train_size vectors have been added everything sits in one bucket, i.e. exact search.
+    The centroids are retrained, and the buckets rebuilt, every time the index has grown by
+    retrain_growth since the last training. Inserts and deletes in between are O(1) per vector.
+    """
+
+    def __init__(self, n_lists: Optional[int] = None, n_probe: int = 8, quantization: str = 'float32',
+                 train_size: int = 2048, retrain_growth: float = 4.0, kmeans_iterations: int = 10,
+                 seed: Optional[int] = 0):
+        # n_lists defaults to about sqrt(size) at training time
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.quantization = quantization
+        self.train_size = train_size
+        self.retrain_growth = retrain_growth
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: List[VectorStore] = [VectorStore(quantization)]
+        self.assignments: Dict[str, int] = {}
+        self.trained_size = 0
+
+    def add(self, keys: List[str], vectors: np.ndarray):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        replaced = [key for key in keys if key in self.assignments]
+        if replaced:
+            self.remove(replaced)
+        lists = self._assign(vectors)
+        for bucket in np.unique(lists):
+            members = np.flatnonzero(lists == bucket)
+            bucket_keys = [keys[i] for i in members]
+            self.lists[bucket].add(bucket_keys, vectors[members])
+            self.assignments.update((key, int(bucket)) for key in bucket_keys)
+
+        size = len(self.assignments)
+        if size >= self.train_size and size >= self.retrain_growth * max(self.trained_size, 1):
+            self.train()
+
+    def remove(self, keys: List[str]):
+        for key in keys:
+            bucket = self.assignments.pop(key, None)
+            if bucket is not None:
+                self.lists[bucket].remove([key])
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if self.centroids is None:
+            return np.zeros(len(vectors), dtype=np.intp)
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def train(self):
+        """Cluster the stored vectors with spherical k-means and rebuild the buckets."""
+        keys, vectors = self.keys(), self.vectors()
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(keys))))
+        n_lists = min(n_lists, len(keys))
+        rng = np.random.default_rng(self.seed)
+        # The centroids are fitted on a sample of a few dozen vectors per list, then every vector is assigned
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), KMEANS_SAMPLE_PER_LIST * n_lists), replace=False)]
+        centroids = sample[:n_lists]
+        for _ in range(self.kmeans_iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            # An empty cluster keeps a zero sum, and with it its previous centroid
+            np.add.at(sums, assignments, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = np.where(norms > 0, sums / np.where(norms > 0, norms, 1), centroids)
+
+        self.centroids = centroids.astype(np.float32)
+        self.lists = [VectorStore(self.quantization) for _ in range(n_lists)]
+        self.assignments = {}
+        self.trained_size = len(keys)
+        self.add(keys, vectors)
+
+    def search(self, query: np.ndarray, top_k: int) -> List[Tuple[str, float]]:
+        query = np.asarray(query, dtype=np.float32)
+        if self.centroids is None:
+            probed = [self.lists[0]]
+        else:
+            n_probe = min(self.n_probe, len(self.lists))
+            probed = [self.lists[i] for i in np.argpartition(-(self.centroids @ query), n_probe - 1)[:n_probe]]
+        probed = [bucket for bucket in probed if len(bucket)]
+        if not probed:
+            return []
+        scores = np.concatenate([bucket.scores(query) for bucket in probed])
+        keys = [key for bucket in probed for key in bucket.keys]
+        return _top_k(scores, keys, top_k)
+
+    def score(self, query: np.ndarray, keys: List[str]) -> List[Tuple[str, float]]:
+        query = np.asarray(query, dtype=np.float32)
+        by_bucket: Dict[int, List[str]] = {}
+        for key in keys:
+            if key in self.assignments:
+                by_bucket.setdefault(self.assignments[key], []).append(key)
+        if not by_bucket:
+            return []
+        scores = np.concatenate([self.lists[bucket].key_scores(query, members) for bucket, members in by_bucket.items()])
+        keys = [key for members in by_bucket.values() for key in members]
+        return _top_k(scores, keys, len(keys))
+
+    def keys(self) -> List[str]:
+        return [key for bucket in self.lists for key in bucket.keys]
+
+    def vectors(self) -> np.ndarray:
+        filled = [bucket.vectors() for bucket in self.lists if len(bucket)]
+        return np.vstack(filled) if filled else np.empty((0, 0), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self.assignments)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.assignments
+
+    @property
+    def nbytes(self) -> int:
+        centroids = self.centroids.nbytes if self.centroids is not None else 0
+        return centroids + sum(bucket.nbytes for bucket in self.lists)
+
+def _top_k(scores: np.ndarray, keys: List[str], top_k: int) -> List[Tuple[str, float]]:
+    if top_k <= 0 or not len(scores):
+        return []
+    top_k = min(top_k, len(scores))
+    candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    best = candidates[np.argsort(-scores[candidates], kind='stable')]
+    return [(keys[i], float(scores[i])) for i in best]
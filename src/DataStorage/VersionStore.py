@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import joblib
+import numpy as np
+import pandas as pd
+from typing_extensions import Dict, List, Optional
+
+# Rows per chunk on average: a row whose hash has these low bits all zero ends a chunk. Chunks are
+# kept between an eighth and eight times that size
+AVERAGE_CHUNK_ROWS = 4096
+# Chunks younger than this are never collected, as a writer may not have committed their manifest yet
+GC_GRACE_SECONDS = 3600
+
+class VersionStore:
+    """Versions of each dataset's raw data, stored as content-addressed chunks shared between versions.
+
+    A DataFrame is split into chunks of rows at content-defined boundaries: a row ends a chunk when
+    its 64-bit value hash has its low bits zero, so inserting or deleting rows only changes the
+    chunks around the edit and every other chunk keeps its hash. Each chunk is stored once under
+    <root>/chunks, keyed by a hash of its column layout and row hashes; a version is a manifest
+    listing its chunks. Diff statistics between versions come from the manifests alone.
+    """
+
+    def __init__(self, root: str, average_chunk_rows: int = AVERAGE_CHUNK_ROWS):
+        if average_chunk_rows & (average_chunk_rows - 1):
+            raise ValueError(f"average_chunk_rows must be a power of two, got {average_chunk_rows}.")
+        self.root = root
+        self.average_chunk_rows = average_chunk_rows
+
+    def _manifest_dir(self, dataset_id: str) -> str:
+        # The id names a directory under <root>/versions, so it must not be able to point anywhere else
+        if dataset_id in ("", ".", "..") or any(sep in dataset_id for sep in ("/", "\\", "\0")):
+            raise ValueError(f"Dataset id '{dataset_id}' cannot be used as a directory name for its versions.")
+        return os.path.join(self.root, "versions", dataset_id)
+
+    def _manifest_path(self, dataset_id: str, version: int) -> str:
+        return os.path.join(self._manifest_dir(dataset_id), f"{version}.json")
+
+    def _chunk_path(self, chunk_hash: str) -> str:
+        return os.path.join(self.root, "chunks", chunk_hash[:2], chunk_hash + ".joblib")
+
+    def versions(self, dataset_id: str) -> List[int]:
+        directory = self._manifest_dir(dataset_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(name[:-5]) for name in os.listdir(directory) if name.endswith(".json"))
+
+    def manifest(self, dataset_id: str, version: Optional[int] = None) -> Dict:
+        versions = self.versions(dataset_id)
+        version = versions[-1] if version is None and versions else version
+        if version not in versions:
+            raise ValueError(f"Version {version} of dataset '{dataset_id}' not found in {self.root}.")
+        with open(self._manifest_path(dataset_id, version), 'r') as file:
+            return json.load(file)
+
+    def commit(self, dataset_id: str, data: pd.DataFrame) -> int:
+        """Store data as the next version of dataset_id, writing only chunks no earlier version has. Returns the version."""
+        # Checked before any chunk is written
+        manifest_dir = self._manifest_dir(dataset_id)
+        data = data.reset_index(drop=True)
+        row_hashes = _row_hashes(data)
+        layout = json.dumps([[str(col), str(dtype)] for col, dtype in data.dtypes.items()]).encode()
+
+        chunks, bytes_written = [], 0
+        for start, stop in self._boundaries(row_hashes):
+            digest = hashlib.blake2b(layout, digest_size=20)
+            digest.update(row_hashes[start:stop].tobytes())
+            chunk_hash = digest.hexdigest()
+            path = self._chunk_path(chunk_hash)
+            if os.path.exists(path):
+                # Refreshed so collect_garbage leaves it alone until this version's manifest exists
+                os.utime(path)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Content-addressed, so concurrent writers of the same chunk write the same thing
+                joblib.dump(data.iloc[start:stop], path + f".{os.getpid()}.tmp", compress=3)
+                os.replace(path + f".{os.getpid()}.tmp", path)
+                bytes_written += os.path.getsize(path)
+            chunks.append({"hash": chunk_hash, "rows": stop - start, "bytes": os.path.getsize(path)})
+
+        os.makedirs(manifest_dir, exist_ok=True)
+        staging = os.path.join(manifest_dir, f".{os.getpid()}.tmp")
+        while True:
+            versions = self.versions(dataset_id)
+            version = versions[-1] + 1 if versions else 1
+            manifest = {"dataset_id": dataset_id, "version": version, "created": datetime.now().isoformat(),
+                        "rows": len(data), "columns": [str(col) for col in data.columns],
+                        "bytes_written": bytes_written, "chunks": chunks}
+            with open(staging, 'w') as file:
+                json.dump(manifest, file)
+            try:
+                # link fails if another writer claimed this version number first; then take the next one
+                os.link(staging, self._manifest_path(dataset_id, version))
+                return version
+            except FileExistsError:
+                continue
+            finally:
+                os.remove(staging)
+
+    def _boundaries(self, row_hashes: np.ndarray):
+        min_rows, max_rows = max(1, self.average_chunk_rows // 8), self.average_chunk_rows * 8
+        mask = np.uint64(self.average_chunk_rows - 1)
+        candidates = (np.flatnonzero((row_hashes & mask) == 0) + 1).tolist()
+        start = 0
+        for end in candidates:
+            while end - start > max_rows:
+                yield start, start + max_rows
+                start += max_rows
+            if end - start >= min_rows:
+                yield start, end
+                start = end
+        while start < len(row_hashes):
+            stop = min(start + max_rows, len(row_hashes))
+            yield start, stop
+            start = stop
+
+    def read(self, dataset_id: str, version: Optional[int] = None) -> pd.DataFrame:
+        manifest = self.manifest(dataset_id, version)
+        if not manifest["chunks"]:
+            return pd.DataFrame(columns=manifest["columns"])
+        return pd.concat([joblib.load(self._chunk_path(chunk["hash"])) for chunk in manifest["chunks"]],
+                         ignore_index=True)
+
+    def diff(self, dataset_id: str, old_version: int, new_version: Optional[int] = None) -> Dict:
+        """How much changed between two versions, from their chunk hashes without reading any data.
+
+        Changed rows are counted at chunk granularity, so rows_added and rows_removed bound the
+        number of edited rows from above.
+        """
+        old, new = self.manifest(dataset_id, old_version), self.manifest(dataset_id, new_version)
+        old_chunks = {chunk["hash"]: chunk for chunk in old["chunks"]}
+        new_chunks = {chunk["hash"]: chunk for chunk in new["chunks"]}
+        added = [chunk for chunk_hash, chunk in new_chunks.items() if chunk_hash not in old_chunks]
+        removed = [chunk for chunk_hash, chunk in old_chunks.items() if chunk_hash not in new_chunks]
+        rows_added = sum(chunk["rows"] for chunk in added)
+        return {
+            "old_version": old["version"],
+            "new_version": new["version"],
+            "old_rows": old["rows"],
+            "new_rows": new["rows"],
+            "chunks_shared": len(new_chunks) - len(added),
+            "chunks_added": len(added),
+            "chunks_removed": len(removed),
+            "rows_added": rows_added,
+            "rows_removed": sum(chunk["rows"] for chunk in removed),
+            "bytes_added": sum(chunk["bytes"] for chunk in added),
+            "columns_added": [col for col in new["columns"] if col not in old["columns"]],
+            "columns_removed": [col for col in old["columns"] if col not in new["columns"]],
+            "changed_fraction": rows_added / new["rows"] if new["rows"] else 0.0,
+        }
+
+    def apply_retention(self, dataset_id: str, keep_last: Optional[int] = None,
+                        keep_within: Optional[timedelta] = None) -> List[int]:
+        """Delete the manifests of versions outside the policy and return their numbers.
+
+        A version is kept if it is among the keep_last newest or younger than keep_within; the
+        newest version is always kept. Chunk files are only freed by collect_garbage.
+        """
+        versions = self.versions(dataset_id)
+        if not versions or (keep_last is None and keep_within is None):
+            return []
+        kept = {versions[-1]}
+        if keep_last is not None and keep_last > 0:
+            kept.update(versions[-keep_last:])
+        if keep_within is not None:
+            cutoff = datetime.now() - keep_within
+            kept |= {version for version in versions
+                     if datetime.fromisoformat(self.manifest(dataset_id, version)["created"]) >= cutoff}
+        deleted = [version for version in versions if version not in kept]
+        for version in deleted:
+            os.remove(self._manifest_path(dataset_id, version))
+        return deleted
+
+    def collect_garbage(self, grace_seconds: float = GC_GRACE_SECONDS) -> int:
+        """Delete chunk files no manifest references any more. Returns the bytes freed."""
+        referenced = set()
+        versions_root = os.path.join(self.root, "versions")
+        for dataset_id in os.listdir(versions_root) if os.path.isdir(versions_root) else []:
+            for version in self.versions(dataset_id):
+                referenced.update(chunk["hash"] for chunk in self.manifest(dataset_id, version)["chunks"])
+
+        freed = 0
+        chunks_root = os.path.join(self.root, "chunks")
+        now = time.time()
+        for directory, _, files in os.walk(chunks_root):
+            for name in files:
+                path = os.path.join(directory, name)
+                if name.split(".")[0] in referenced or now - os.path.getmtime(path) < grace_seconds:
+                    continue
+                freed += os.path.getsize(path)
+                os.remove(path)
+        return freed
+
+    @property
+    def nbytes(self) -> int:
+        return sum(os.path.getsize(os.path.join(directory, name))
+                   for directory, _, files in os.walk(os.path.join(self.root, "chunks")) for name in files)
+
+def _row_hashes(data: pd.DataFrame) -> np.ndarray:
+    if not len(data):
+        return np.empty(0, np.uint64)
+    hashable = data
+    for col in data.columns[data.dtypes == object]:
+        nested = data[col].map(lambda value: isinstance(value, (dict, list)))
+        if nested.any():
+            # pandas cannot hash dicts or lists, so their JSON text is hashed; the chunk keeps the values
+            if hashable is data:
+                hashable = data.copy(deep=False)
+            hashable[col] = data[col].map(
+                lambda value: json.dumps(value, sort_keys=True, default=str) if isinstance(value, (dict, list)) else value)
+    return pd.util.hash_pandas_object(hashable, index=False).to_numpy()
@@ -0,0 +1,85 @@
+import os
+import time
+import pandas as pd
+import numpy as np
+from DataCleaning.CleaningCache import CleaningCache
+from DataCleaning.DataCleaner import DataCleaner
+from DataCleaning.DataCleaningPipeline import DataCleaningPipeline
+from DataCleaning.PipelineProfiler import InMemoryMetricsSink
+
+def _raw_data():
+    return pd.DataFrame({
+        'numerical_field': [1.0, 2.0, np.nan, 4.0],
+        'categorical_field': ['a', 'b', 'a', None]
+    })
+
+def test_repeat_cleaning_is_served_from_cache(tmp_path):
+    cache = CleaningCache(str(tmp_path))
+    first = DataCleaner(cache=cache).clean_data(_raw_data())
+
+    cleaner = DataCleaner(cache=cache)
+    second = cleaner.clean_data(_raw_data())
+
+    pd.testing.assert_frame_equal(second, first)
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+    # The fitted state comes back with the cached output
+    assert cleaner.data_cleaning_pipeline.is_fitted
+
+def test_cache_hit_keeps_the_metrics_sink(tmp_path):
+    cache = CleaningCache(str(tmp_path))
+    DataCleaner(cache=cache).clean_data(_raw_data())
+
+    sink = InMemoryMetricsSink()
+    cleaner = DataCleaner(DataCleaningPipeline(metrics_sink=sink), cache=cache)
+    cleaner.clean_data(_raw_data())
+    assert cache.stats()['hits'] == 1
+    cleaner.transform(_raw_data())
+    assert [metrics.step for metrics in sink.metrics] == ['handle_missing_data', 'normalize', 'encode']
+
+def test_key_depends_on_content_and_config():
+    data = _raw_data()
+    key = CleaningCache.key(data, DataCleaningPipeline().get_config())
+
+    changed = data.copy()
+    changed.loc[0, 'numerical_field'] = 1.5
+
+    assert CleaningCache.key(data.copy(), DataCleaningPipeline().get_config()) == key
+    assert CleaningCache.key(changed, DataCleaningPipeline().get_config()) != key
+    assert CleaningCache.key(data, DataCleaningPipeline(downcast_float32=True).get_config()) != key
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = CleaningCache(str(tmp_path), max_bytes=None)
+    frame = pd.DataFrame({'values': np.arange(1000, dtype='float64')})
+    for key in ['old', 'recent']:
+        cache.put(key, frame, DataCleaningPipeline())
+    past = time.time() - 60
+    os.utime(tmp_path / 'old' / 'meta.json', (past, past))
+
+    entry_size = sum(entry.stat().st_size for entry in os.scandir(tmp_path / 'recent'))
+    cache.max_bytes = entry_size
+    cache.evict()
+
+    assert cache.get('old') is None
+    assert cache.get('recent') is not None
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = CleaningCache(str(tmp_path), max_age_seconds=30)
+    cache.put('entry', pd.DataFrame({'values': [1.0]}), DataCleaningPipeline())
+    past = time.time() - 60
+    os.utime(tmp_path / 'entry' / 'meta.json', (past, past))
+
+    assert cache.get('entry') is None
+    assert cache.stats()['misses'] == 1
+
+def test_unhashable_cells_are_cleaned_without_the_cache(tmp_path):
+    data = _raw_data()
+    data['payload'] = [{'a': 1}, {'b': [2]}, {'a': 1}, None]
+    assert CleaningCache.key(data, DataCleaningPipeline().get_config()) is None
+
+    cache = CleaningCache(str(tmp_path))
+    cleaned = DataCleaner(DataCleaningPipeline(columns=['numerical_field', 'categorical_field']),
+                          cache=cache).clean_data(data)
+
+    assert cleaned['numerical_field'].notna().all()
+    assert cache.stats()['hits'] == 0 and cache.stats()['misses'] == 0
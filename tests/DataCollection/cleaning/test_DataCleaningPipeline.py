@@ -0,0 +1,195 @@
+import tracemalloc
+import pandas as pd
+import numpy as np
+import pytest
+from DataCleaning.DataCleaningPipeline import DataCleaningPipeline
+from DataCleaning.MissingDataHandler import MissingDataHandler
+from DataCleaning.PipelineProfiler import InMemoryMetricsSink, PipelineProfiler
+
+def _training_data():
+    return pd.DataFrame({
+        'numerical_field': [1.0, 2.0, 3.0, np.nan, 5.0],
+        'categorical_field': ['a', 'b', 'a', np.nan, 'c']
+    })
+
+def test_transform_reuses_fitted_statistics():
+    pipeline = DataCleaningPipeline().fit(_training_data())
+
+    batch = pd.DataFrame({
+        'numerical_field': [np.nan, 2.75],
+        'categorical_field': ['b', 'unseen']
+    })
+    transformed = pipeline.transform(batch)
+
+    # The missing value is imputed with the training mean, which is also the scaler mean
+    assert transformed['numerical_field'].tolist() == pytest.approx([0.0, 0.0])
+    assert list(transformed.columns) == ['numerical_field', 'categorical_field_a',
+                                         'categorical_field_b', 'categorical_field_c']
+    assert transformed[['categorical_field_a', 'categorical_field_b', 'categorical_field_c']].values.tolist() == [
+        [0, 1, 0],
+        [0, 0, 0]
+    ]
+
+def test_transform_before_fit_raises():
+    with pytest.raises(ValueError, match="must be fitted"):
+        DataCleaningPipeline().transform(_training_data())
+
+def test_save_and_load_round_trip(tmp_path):
+    pipeline = DataCleaningPipeline().fit(_training_data())
+    file_path = tmp_path / "pipeline.joblib"
+    pipeline.save(str(file_path))
+
+    loaded = DataCleaningPipeline.load(str(file_path))
+
+    batch = pd.DataFrame({
+        'numerical_field': [4.0, np.nan],
+        'categorical_field': ['c', 'a']
+    })
+    pd.testing.assert_frame_equal(loaded.transform(batch.copy()), pipeline.transform(batch.copy()))
+
+def test_streaming_fit_matches_in_memory_fit():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'numerical_field': rng.normal(10, 3, 1000),
+        'integer_field': rng.integers(0, 100, 1000),
+        'categorical_field': rng.choice(['a', 'b', 'c'], 1000).astype(object)
+    })
+    data.loc[rng.choice(1000, 100, replace=False), 'numerical_field'] = np.nan
+    data.loc[rng.choice(1000, 50, replace=False), 'categorical_field'] = np.nan
+    # 'c' only shows up in the last chunk, so categories have to be discovered incrementally
+    data.loc[:899, 'categorical_field'] = data.loc[:899, 'categorical_field'].replace('c', 'a')
+
+    expected = DataCleaningPipeline().fit(data.copy()).transform(data.copy())
+
+    chunks = lambda: (data.iloc[start:start + 300].copy() for start in range(0, len(data), 300))
+    pipeline = DataCleaningPipeline().fit_stream(chunks())
+    streamed = pd.concat(list(pipeline.transform_stream(chunks())))
+
+    pd.testing.assert_frame_equal(streamed, expected)
+
+def test_stream_chunks_share_dtypes_when_only_a_later_chunk_has_nat():
+    data = pd.DataFrame({
+        'value': np.arange(6, dtype=float),
+        'date': pd.to_datetime(['2023-01-01', '2023-02-01', '2023-03-01', '2023-04-01', None, '2023-06-01'])
+    })
+    chunks = lambda: (data.iloc[start:start + 3].copy() for start in range(0, len(data), 3))
+    pipeline = DataCleaningPipeline().fit_stream(chunks())
+    first, second = pipeline.transform_stream(chunks())
+
+    pd.testing.assert_series_equal(first.dtypes, second.dtypes)
+    assert first['date_year'].dtype == np.float64
+    assert np.isnan(second['date_year'].iloc[1])
+
+def test_parallel_execution_matches_serial():
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame({f'numerical_{i}': rng.normal(size=200) for i in range(6)})
+    data['categorical_a'] = rng.choice(['x', 'y', 'z'], 200).astype(object)
+    data.insert(2, 'categorical_b', rng.choice(['p', 'q'], 200).astype(object))
+    data['date_field'] = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 1000, 200), unit='h')
+    data['boolean_field'] = rng.random(200) > 0.5
+    data.loc[::7, 'numerical_1'] = np.nan
+    options = {'encoder_options': {'column_strategies': {'categorical_b': 'frequency'}}}
+
+    expected = DataCleaningPipeline(**options).process(data.copy())
+    pipeline = DataCleaningPipeline(n_jobs=3, **options)
+    parallel = pipeline.process(data.copy())
+
+    pd.testing.assert_frame_equal(parallel, expected, check_exact=True)
+    pd.testing.assert_frame_equal(pipeline.transform(data.copy()), expected, check_exact=True)
+
+def test_metrics_sink_receives_every_step():
+    sink = InMemoryMetricsSink()
+    pipeline = DataCleaningPipeline(metrics_sink=sink, profile_step='encode')
+
+    pipeline.process(_training_data())
+
+    assert [metrics.step for metrics in sink.metrics] == ['handle_missing_data', 'normalize', 'encode']
+    encode_metrics = sink.metrics[-1]
+    assert (encode_metrics.rows_in, encode_metrics.columns_in) == (5, 2)
+    assert (encode_metrics.rows_out, encode_metrics.columns_out) == (5, 4)
+    assert encode_metrics.wall_seconds >= 0 and encode_metrics.peak_memory_delta >= 0
+    assert 'transform' in encode_metrics.profile_report
+    assert sink.metrics[0].profile_report is None
+    assert sink.bottleneck() in sink.metrics
+
+    # The full data profile is opt-in and then reported as its own step
+    sink = InMemoryMetricsSink()
+    DataCleaningPipeline(metrics_sink=sink, profile=True).process(_training_data())
+    assert [metrics.step for metrics in sink.metrics] == ['profile_data', 'handle_missing_data', 'normalize', 'encode']
+
+def test_failing_step_stops_the_tracing_the_profiler_started():
+    def failing_step(data):
+        raise ValueError("step failed")
+
+    profiler = PipelineProfiler(InMemoryMetricsSink(), profile_step='failing_step')
+    with pytest.raises(ValueError, match="step failed"):
+        profiler.run('failing_step', 'process', failing_step, _training_data())
+    assert not tracemalloc.is_tracing()
+
+def _mixed_data():
+    rng = np.random.default_rng(1)
+    n = 500
+    data = pd.DataFrame({
+        'float64_field': rng.normal(5, 2, n),
+        'float32_field': rng.normal(0, 1, n).astype(np.float32),
+        'nullable_int_field': pd.array(rng.integers(0, 50, n), dtype='Int64'),
+        'int_field': rng.integers(0, 10, n),
+        'flag': rng.random(n) > 0.5,
+        'categorical_field': rng.choice(['a', 'b', 'c', 'd'], n).astype(object),
+        'high_cardinality_field': rng.choice([f'v{i}' for i in range(40)], n).astype(object),
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='h'),
+        'unused_field': rng.normal(0, 1, n)
+    })
+    data.loc[rng.choice(n, 40, replace=False), 'float64_field'] = np.nan
+    data.loc[rng.choice(n, 40, replace=False), 'float32_field'] = np.nan
+    data.loc[rng.choice(n, 40, replace=False), 'nullable_int_field'] = pd.NA
+    data.loc[rng.choice(n, 40, replace=False), 'categorical_field'] = np.nan
+    data.loc[rng.choice(n, 200, replace=False), 'high_cardinality_field'] = np.nan
+    return data
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'sparse_encoding': True, 'downcast_float32': True},
+    {'encoder_options': {'max_onehot_cardinality': 5, 'max_top_k_cardinality': 10, 'top_k': 3,
+                         'high_cardinality_strategy': 'frequency'}}
+])
+def test_fused_pipeline_matches_step_pipeline(options):
+    data = _mixed_data()
+
+    expected = DataCleaningPipeline(**options).process(data.copy())
+    fused = DataCleaningPipeline(fused=True, **options)
+    pd.testing.assert_frame_equal(fused.process(data.copy()), expected)
+
+    # The fitted plan also serves transform, including unseen values and missing entries
+    batch = data.iloc[:50].copy()
+    step_pipeline = DataCleaningPipeline(**options).fit(data.copy())
+    pd.testing.assert_frame_equal(fused.transform(batch.copy()), step_pipeline.transform(batch.copy()))
+
+def test_fused_pipeline_prunes_columns_and_explains_plan():
+    data = _mixed_data()
+    columns = ['float64_field', 'categorical_field', 'timestamp']
+    pipeline = DataCleaningPipeline(fused=True, columns=columns)
+
+    cleaned = pipeline.process(data)
+    expected = DataCleaningPipeline().process(data[columns].copy())
+    pd.testing.assert_frame_equal(cleaned, expected)
+
+    explanation = pipeline.explain(data)
+    assert 'float64_field: numeric -> impute mean + scale' in explanation
+    assert 'categorical_field: categorical -> impute mode + encode (onehot)' in explanation
+    assert 'unused_field: pruned -> never read' in explanation
+
+def test_fused_pipeline_runs_only_the_selected_steps():
+    data = _mixed_data()
+    pipeline = DataCleaningPipeline(fused=True, steps=['impute'])
+
+    cleaned = pipeline.process(data.copy())
+    expected = MissingDataHandler().handle_missing_data(data.copy())
+    pd.testing.assert_frame_equal(cleaned, expected[cleaned.columns])
+    assert list(cleaned.columns) == list(data.columns)
+    assert 'categorical_field: categorical -> impute mode' in pipeline.explain(data)
+
+    with pytest.raises(ValueError):
+        DataCleaningPipeline(steps=['impute'])
+    with pytest.raises(ValueError):
+        DataCleaningPipeline(fused=True, steps=['dedupe'])
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from DataCleaning.DataCleaningPipeline import DataCleaningPipeline
+from DataCleaning.DataProfiler import DataProfiler, RowDeduplicator
+from DataCleaning.Normalizer import Normalizer
+
+def test_deduplicator_keeps_first_occurrence_and_treats_missing_values_as_equal():
+    data = pd.DataFrame({
+        'id': [1, 2, 1, 3, 2, 1],
+        'value': [0.5, np.nan, 0.5, 1.5, np.nan, 0.6],
+        'label': ['a', 'b', 'a', 'c', 'b', 'a']
+    })
+    deduplicator = RowDeduplicator()
+
+    deduplicated = deduplicator.deduplicate(data)
+
+    pd.testing.assert_frame_equal(deduplicated, data.drop_duplicates())
+    assert list(deduplicated.index) == [0, 1, 3, 5]
+    assert deduplicator.rows_removed == 2
+
+def test_deduplicator_on_subset_matches_pandas():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({'page': rng.integers(0, 50, 1000), 'item': rng.integers(0, 20, 1000),
+                         'fetched_at': np.arange(1000)})
+
+    deduplicated = RowDeduplicator(subset=['page', 'item']).deduplicate(data)
+
+    pd.testing.assert_frame_equal(deduplicated, data.drop_duplicates(subset=['page', 'item']))
+
+def test_profile_reports_nulls_ranges_cardinality_and_semantic_types():
+    n = 1000
+    data = pd.DataFrame({
+        'amount': np.where(np.arange(n) % 10 == 0, np.nan, np.arange(n, dtype=float)),
+        'constant': np.full(n, 7),
+        'flag': np.arange(n) % 2 == 0,
+        'category': pd.Series(['x', 'y', 'z', None] * (n // 4), dtype=object),
+        'order_id': [f'order-{i}' for i in range(n)],
+        'created': pd.date_range('2024-01-01', periods=n, freq='D'),
+        'missing': np.full(n, np.nan)
+    })
+
+    profile = DataProfiler().profile(data)
+
+    assert profile.rows == n
+    assert profile['amount'].null_ratio == 0.1
+    assert (profile['amount'].min, profile['amount'].max) == (1.0, 999.0)
+    assert profile['category'].cardinality == 3
+    assert abs(profile['order_id'].cardinality - n) <= 0.05 * n
+    assert {col: column.semantic_type for col, column in profile.columns.items()} == {
+        'amount': 'numeric', 'constant': 'constant', 'flag': 'boolean', 'category': 'categorical',
+        'order_id': 'identifier', 'created': 'datetime', 'missing': 'empty'
+    }
+    assert profile.columns_with_nulls() == ['amount', 'category', 'missing']
+    assert profile.constant_columns() == ['constant']
+    assert list(profile.to_frame().index) == list(data.columns)
+
+def test_normalizer_writes_profiled_constant_columns_like_the_scaled_ones():
+    train = pd.DataFrame({'value': np.arange(10, dtype=np.float32), 'count': np.arange(10)})
+    batch = pd.DataFrame({'value': np.full(4, 3.0, dtype=np.float32), 'count': np.full(4, 5)})
+    normalizer = Normalizer().fit(train)
+
+    expected = normalizer.transform(batch.copy())
+    profiled = normalizer.transform(batch.copy(), DataProfiler().profile(batch))
+
+    pd.testing.assert_frame_equal(profiled, expected, check_exact=True)
+    flagged = normalizer.transform(batch.copy(), DataProfiler().null_and_constant_profile(batch))
+    pd.testing.assert_frame_equal(flagged, expected, check_exact=True)
+
+def test_null_and_constant_profile_agrees_with_the_full_profile():
+    data = pd.DataFrame({
+        'amount': [1.0, np.nan, 3.0, 4.0],
+        'constant': [7, 7, 7, 7],
+        'label': ['a', None, 'b', 'a'],
+        'flag': [True, True, True, True],
+        'missing': [np.nan] * 4
+    })
+    full = DataProfiler().profile(data)
+    light = DataProfiler().null_and_constant_profile(data)
+
+    assert light.columns_with_nulls() == full.columns_with_nulls() == ['amount', 'label', 'missing']
+    assert light.constant_columns() == ['constant']
+    assert light['missing'].semantic_type == 'empty'
+
+def test_pipeline_profiles_input_and_optionally_deduplicates_rows():
+    data = pd.DataFrame({
+        'numerical_field': [1.0, 2.0, 2.0, np.nan, 5.0],
+        'complete_field': [1, 2, 2, 4, 5],
+        'categorical_field': ['a', 'b', 'b', np.nan, 'c']
+    })
+
+    kept = DataCleaningPipeline()
+    assert len(kept.process(data.copy())) == 5
+    # Profiling is opt-in, so the default path makes no extra pass over the data
+    assert kept.profile is None
+
+    profiled = DataCleaningPipeline(profile=True)
+    profiled.process(data.copy())
+    assert profiled.profile['complete_field'].cardinality == 4
+    assert profiled.profile['categorical_field'].semantic_type == 'categorical'
+
+    deduplicating = DataCleaningPipeline(deduplicate_rows=True)
+    cleaned = deduplicating.process(data.copy())
+    assert list(cleaned.index) == [0, 1, 3, 4]
+    assert deduplicating.deduplicator.rows_removed == 1
+    pd.testing.assert_frame_equal(cleaned, DataCleaningPipeline().process(data.drop_duplicates().copy()))
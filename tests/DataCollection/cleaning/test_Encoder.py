@@ -1,5 +1,5 @@
 import pandas as pd
-from DataCollection.cleaning.Encoder import Encoder
+from DataCleaning.Encoder import Encoder, to_csr_matrix
 
 def test_encode():
     data = pd.DataFrame({
@@ -57,4 +57,80 @@ def test_encode_timedelta():
     encoded_data = encoder.encode(data)
 
     expected_values = [1, 2, 3, 4]
-    assert encoded_data['timedelta_feature'].tolist() == expected_values
\ No newline at end of file
+    assert encoded_data['timedelta_feature'].tolist() == expected_values
+
+def test_encode_sparse_matches_dense():
+    data = pd.DataFrame({
+        'numeric_feature': [0.5, 1.5, 2.5, 3.5],
+        'feature_name': ['a', 'b', 'a', 'c']
+    })
+
+    dense = Encoder().encode(data.copy())
+    encoded_data = Encoder(sparse_output=True).encode(data.copy())
+
+    assert all(isinstance(encoded_data[col].dtype, pd.SparseDtype)
+               for col in ['feature_name_a', 'feature_name_b', 'feature_name_c'])
+    assert list(encoded_data.columns) == list(dense.columns)
+    assert to_csr_matrix(encoded_data).toarray().tolist() == dense.to_numpy().tolist()
+
+def test_memory_report():
+    data = pd.DataFrame({
+        'id_feature': [f'id_{i}' for i in range(1000)]
+    })
+
+    encoder = Encoder(sparse_output=True).fit(data)
+    report = encoder.memory_report(data)
+
+    assert report['encoded_columns'] == 1000
+    assert report['dense_bytes'] == 1000 * 1000 * 8
+    assert report['sparse_bytes'] < report['dense_bytes'] / 100
+
+def test_encode_bounded_width_strategies():
+    data = pd.DataFrame({
+        'low_cardinality': ['a', 'b', 'a', 'b', 'a', 'b'],
+        'mid_cardinality': ['x', 'x', 'x', 'y', 'y', 'z'],
+        'high_cardinality': [f'id_{i}' for i in range(6)]
+    })
+
+    encoder = Encoder(max_onehot_cardinality=2, max_top_k_cardinality=3, top_k=2, n_hash_features=4)
+    encoded_data = encoder.encode(data)
+
+    assert encoder.fitted_strategies == {
+        'low_cardinality': 'onehot',
+        'mid_cardinality': 'top_k',
+        'high_cardinality': 'hashing'
+    }
+    assert encoded_data[['mid_cardinality_x', 'mid_cardinality_y', 'mid_cardinality___other__']].values.tolist() == [
+        [1, 0, 0], [1, 0, 0], [1, 0, 0], [0, 1, 0], [0, 1, 0], [0, 0, 1]
+    ]
+    hashed_columns = [f'high_cardinality_hash_{i}' for i in range(4)]
+    assert encoded_data[hashed_columns].sum(axis=1).tolist() == [1] * 6
+    assert encoded_data.shape[1] == 2 + 3 + 4
+
+def test_encode_frequency():
+    data = pd.DataFrame({
+        'feature_name': ['a', 'b', 'a', 'a']
+    })
+
+    encoder = Encoder(column_strategies={'feature_name': 'frequency'})
+    encoder.fit(data)
+    encoded_data = encoder.transform(pd.DataFrame({'feature_name': ['a', 'b', 'unseen']}))
+
+    assert encoded_data['feature_name_frequency'].tolist() == [0.75, 0.25, 0.0]
+
+def test_encode_datetime_timezone_and_missing():
+    data = pd.DataFrame({
+        'date_feature': pd.to_datetime(['2023-01-01 23:00', None, '2023-01-07 12:00']).tz_localize('US/Eastern'),
+        'timedelta_feature': pd.to_timedelta(['1 days 12:00:00', None, '3 days'])
+    })
+
+    encoder = Encoder(date_features=['day', 'hour', 'is_weekend'], timedelta_features=['days', 'total_hours'])
+    encoded_data = encoder.encode(data)
+
+    assert list(encoded_data.columns) == ['date_feature_day', 'date_feature_hour', 'date_feature_is_weekend',
+                                          'timedelta_feature', 'timedelta_feature_total_hours']
+    # Fields are taken in the column's own timezone and NaT stays missing
+    assert encoded_data['date_feature_hour'].tolist()[::2] == [23, 12]
+    assert encoded_data['date_feature_is_weekend'].tolist()[::2] == [1, 1]
+    assert encoded_data.iloc[1].isna().all()
+    assert encoded_data['timedelta_feature_total_hours'].tolist()[::2] == [36, 72]
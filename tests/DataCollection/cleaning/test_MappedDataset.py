@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from DataCleaning.DataCleaner import DataCleaner
+from DataCleaning.DataCleaningPipeline import DataCleaningPipeline
+from DataCleaning.MappedDataset import MappedDataset, MappedDatasetWriter, write_mapped_dataset
+
+def _raw_data(n=1000):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'float_field': rng.normal(10, 3, n),
+        'nullable_int_field': pd.array(rng.integers(0, 100, n), dtype='Int64'),
+        'flag': rng.random(n) > 0.5,
+        'categorical_field': rng.choice(['a', 'b', 'c'], n).astype(object),
+        'timestamp': pd.date_range('2024-01-01', periods=n, freq='h', tz='Europe/Berlin')
+    })
+    data.loc[rng.choice(n, 100, replace=False), 'float_field'] = np.nan
+    data.loc[rng.choice(n, 100, replace=False), 'nullable_int_field'] = pd.NA
+    data.loc[rng.choice(n, 50, replace=False), 'categorical_field'] = np.nan
+    return data
+
+def test_round_trip_reads_blocks_of_every_column_kind(tmp_path):
+    data = _raw_data()
+    dataset = write_mapped_dataset(str(tmp_path / "raw"), data)
+
+    assert len(dataset) == len(data)
+    pd.testing.assert_frame_equal(dataset.read(), data)
+    pd.testing.assert_frame_equal(pd.concat(dataset.iter_blocks(300)), data)
+    pd.testing.assert_frame_equal(dataset.read(100, 200, columns=['float_field', 'flag']),
+                                  data.loc[100:199, ['float_field', 'flag']])
+
+def test_plain_npy_directory_is_read_without_schema(tmp_path):
+    np.save(tmp_path / "x.npy", np.arange(10, dtype=np.float32))
+    np.save(tmp_path / "y.npy", np.arange(10) % 2 == 0)
+
+    dataset = MappedDataset(str(tmp_path))
+
+    assert dataset.columns == ['x', 'y']
+    assert len(dataset) == 10
+    assert dataset.read(2, 4)['x'].tolist() == [2.0, 3.0]
+    # Column blocks are views of the read-only mapping, never copies
+    assert not dataset.column('x').to_numpy().flags.writeable
+
+def test_mismatched_column_lengths_raise(tmp_path):
+    np.save(tmp_path / "x.npy", np.arange(10))
+    np.save(tmp_path / "y.npy", np.arange(5))
+
+    with pytest.raises(ValueError, match="different lengths"):
+        MappedDataset(str(tmp_path))
+
+def test_clean_mapped_dataset_matches_in_memory_cleaning(tmp_path):
+    data = _raw_data()
+    dataset = write_mapped_dataset(str(tmp_path / "raw"), data)
+
+    cleaned = DataCleaner(DataCleaningPipeline()).clean_mapped_dataset(dataset, str(tmp_path / "clean"), block_rows=128)
+
+    expected = DataCleaningPipeline().process(data.copy())
+    # Temporal features are stored as floats, so a later block holding NaT fits the same file
+    temporal = [col for col in expected.columns if col.startswith('timestamp_')]
+    expected[temporal] = expected[temporal].astype(np.float64)
+    assert os.path.exists(tmp_path / "clean" / "schema.json")
+    pd.testing.assert_frame_equal(cleaned.read(), expected)
+
+def test_clean_mapped_dataset_keeps_nat_in_a_later_block(tmp_path):
+    data = pd.DataFrame({'value': np.arange(256, dtype=float),
+                         'date': pd.date_range('2024-01-01', periods=256, freq='D')})
+    data.loc[200, 'date'] = pd.NaT
+    dataset = write_mapped_dataset(str(tmp_path / "raw"), data)
+
+    cleaned = DataCleaner(DataCleaningPipeline()).clean_mapped_dataset(dataset, str(tmp_path / "clean"), block_rows=128)
+
+    years = cleaned.column('date_year')
+    assert years.dtype == np.float64
+    assert np.isnan(years[200]) and (years.drop(200) == 2024).all()
+
+def test_writer_refuses_values_that_do_not_fit_the_column(tmp_path):
+    writer = MappedDatasetWriter(str(tmp_path), 4)
+    writer.write(0, pd.DataFrame({'year': np.array([2023, 2024], dtype=np.int32)}))
+    with pytest.raises(ValueError, match="'year'"):
+        writer.write(2, pd.DataFrame({'year': [2024.0, np.nan]}))
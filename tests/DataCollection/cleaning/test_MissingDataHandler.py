@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-from DataCollection.cleaning.MissingDataHandler import MissingDataHandler
+import pytest
+from DataCleaning.MissingDataHandler import MissingDataHandler
 
 def test_it_fills_missing_fields():
     data = pd.DataFrame({
@@ -12,4 +13,38 @@ def test_it_fills_missing_fields():
 
     processed_data = missing_data_handler.handle_missing_data(data)
 
-    assert processed_data['numerical_field'].isnull().sum() == 0
\ No newline at end of file
+    assert processed_data['numerical_field'].isnull().sum() == 0
+
+def test_it_keeps_narrow_and_nullable_dtypes():
+    data = pd.DataFrame({
+        'float32_field': np.array([1, 2, np.nan, 5], dtype='float32'),
+        'nullable_int_field': pd.array([1, None, 3, 4], dtype='Int64'),
+        'category_field': pd.Categorical(['a', 'b', None, 'b'])
+    })
+
+    processed_data = MissingDataHandler().handle_missing_data(data)
+
+    assert processed_data['float32_field'].dtype == 'float32'
+    assert processed_data['float32_field'].tolist() == pytest.approx([1.0, 2.0, 8 / 3, 5.0])
+    assert processed_data['nullable_int_field'].dtype == 'Float64'
+    assert processed_data['nullable_int_field'].tolist() == [1.0, 8 / 3, 3.0, 4.0]
+    assert processed_data['category_field'].tolist() == ['a', 'b', 'b', 'b']
+
+
+def test_transform_leaves_the_input_frame_unchanged():
+    data = pd.DataFrame({
+        'float_field': [1.0, np.nan, 3.0],
+        'categorical_field': ['a', None, 'a']
+    })
+    view = data['float_field'].to_numpy()
+    original = data.copy()
+
+    processed_data = MissingDataHandler().handle_missing_data(data)
+
+    pd.testing.assert_frame_equal(data, original)
+    assert np.isnan(view[1])
+    assert processed_data['float_field'].tolist() == [1.0, 2.0, 3.0]
+
+    # copy=False fills the frame's own float buffer
+    MissingDataHandler().fit(data).transform(data, copy=False)
+    assert view[1] == 2.0
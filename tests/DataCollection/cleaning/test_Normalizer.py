@@ -1,6 +1,7 @@
+import numpy as np
 import pandas as pd
 import pytest
-from DataCollection.cleaning.Normalizer import Normalizer
+from DataCleaning.Normalizer import Normalizer
 
 def test_normalize():
     data = pd.DataFrame({
@@ -15,4 +16,43 @@ def test_normalize():
     assert normalized_data['feature1'].mean() == pytest.approx(0, abs=1e-6)
     assert normalized_data['feature1'].std() == pytest.approx(1, abs=2e-1)
     assert normalized_data['feature2'].mean() == pytest.approx(0, abs=1e-6)
-    assert normalized_data['feature2'].std() == pytest.approx(1, abs=2e-1)
\ No newline at end of file
+    assert normalized_data['feature2'].std() == pytest.approx(1, abs=2e-1)
+
+def test_normalize_preserves_float32_in_place():
+    data = pd.DataFrame({
+        'feature1': pd.Series([1.0, 2.0, 3.0, 4.0], dtype='float32')
+    })
+    buffer = data['feature1'].to_numpy()
+
+    normalized_data = Normalizer().fit(data).transform(data, copy=False)
+
+    assert normalized_data['feature1'].dtype == 'float32'
+    assert np.shares_memory(normalized_data['feature1'].to_numpy(), buffer)
+    assert normalized_data['feature1'].mean() == pytest.approx(0, abs=1e-6)
+
+def test_normalize_leaves_the_input_frame_unchanged():
+    data = pd.DataFrame({
+        'feature1': pd.Series([1.0, 2.0, 3.0, 4.0], dtype='float32'),
+        'feature2': [1.0, 2.0, 3.0, 4.0]
+    })
+    views = [data[col].to_numpy() for col in data.columns]
+    original = data.copy()
+
+    normalized_data = Normalizer().normalize(data)
+
+    pd.testing.assert_frame_equal(data, original)
+    assert [view.tolist() for view in views] == [[1.0, 2.0, 3.0, 4.0]] * 2
+    assert normalized_data['feature1'].dtype == 'float32'
+    assert normalized_data['feature2'].mean() == pytest.approx(0, abs=1e-6)
+
+
+def test_normalize_downcast_float32():
+    data = pd.DataFrame({
+        'feature1': [1, 2, 3, 4],
+        'feature2': pd.array([1.0, 2.0, None, 4.0], dtype='Float64')
+    })
+
+    normalized_data = Normalizer(downcast_float32=True).normalize(data)
+
+    assert normalized_data['feature1'].dtype == 'float32'
+    assert normalized_data['feature2'].dtype == 'Float32'
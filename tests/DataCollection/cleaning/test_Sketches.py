@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import RobustScaler
+from DataCleaning.DataCleaningPipeline import DataCleaningPipeline
+from DataCleaning.Encoder import Encoder
+from DataCleaning.IncrementalStatistics import ApproximateValueCounts, RunningValueCounts
+from DataCleaning.Sketches import HeavyHitters, HyperLogLog, QuantileSketch
+
+def _chunks(values, n_chunks):
+    bounds = np.linspace(0, len(values), n_chunks + 1).astype(int)
+    return [values.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+def _zipf_column(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(rng.zipf(1.3, n) % 100_000).astype(str)
+
+@pytest.mark.parametrize('error', [0.01, 0.001])
+def test_heavy_hitters_stay_within_error_bound(error):
+    values = _zipf_column(200_000)
+    sketch = HeavyHitters(error)
+    for chunk in _chunks(values, 10):
+        sketch.update(chunk)
+
+    exact = values.value_counts()
+    estimated = sketch.counts.reindex(exact.index, fill_value=0)
+    assert len(sketch.counts) <= sketch.capacity
+    assert (estimated <= exact).all()
+    assert (exact - estimated).max() <= error * len(values)
+    # Everything more frequent than the error bound is retained, including the mode
+    assert set(exact.index[exact > error * len(values)]) <= set(sketch.counts.index)
+    assert sketch.counts.idxmax() == exact.idxmax()
+
+@pytest.mark.parametrize('cardinality', [10, 5_000, 200_000])
+def test_hyperloglog_estimate_within_error_bound(cardinality):
+    rng = np.random.default_rng(1)
+    values = pd.Series(rng.permutation(np.repeat(np.arange(cardinality), 3))).astype(str)
+    sketch = HyperLogLog(0.01)
+    for chunk in _chunks(values, 4):
+        sketch.update(chunk)
+
+    # Four standard errors
+    assert sketch.estimate() == pytest.approx(cardinality, rel=0.04)
+
+def test_hyperloglog_hashes_categorical_like_object_values():
+    values = pd.Series(['a', 'b', 'c', 'a'])
+    as_object, as_category = HyperLogLog(), HyperLogLog()
+    as_object.update(values)
+    as_category.update(values.astype('category'))
+    np.testing.assert_array_equal(as_object.registers, as_category.registers)
+
+@pytest.mark.parametrize('error', [0.01, 0.001])
+def test_quantile_sketch_rank_error_within_bound(error):
+    values = np.random.default_rng(2).lognormal(size=500_000)
+    sketch = QuantileSketch(error)
+    for chunk in np.array_split(values, 25):
+        sketch.update(chunk)
+
+    quantiles = np.linspace(0.01, 0.99, 99)
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(quantiles)) / len(values)
+    assert not sketch.is_exact
+    assert np.max(np.abs(ranks - quantiles)) <= error
+    assert sum(level.size for level in sketch.levels) < len(values) / 50
+
+def test_quantile_sketch_is_exact_below_capacity_and_adds_repeated_values():
+    values = np.random.default_rng(3).normal(size=500)
+    sketch = QuantileSketch(0.001)
+    sketch.update(values)
+    np.testing.assert_allclose(sketch.quantile([0.25, 0.5, 0.75]), np.quantile(values, [0.25, 0.5, 0.75]))
+
+    sketch.add(10.0, 1_000_000)
+    assert sketch.count == 1_000_500
+    assert sketch.quantile(0.5) == 10.0
+
+def test_approximate_value_counts_are_exact_for_low_cardinality():
+    data = pd.DataFrame({'category': _zipf_column(10_000).str[-1]})
+    exact, approximate = RunningValueCounts(['category']), ApproximateValueCounts(['category'])
+    exact.update(data)
+    approximate.update(data)
+
+    pd.testing.assert_series_equal(approximate.value_counts['category'].sort_index(),
+                                   exact.value_counts['category'].sort_index(), check_names=False)
+    assert approximate.cardinality('category') == exact.cardinality('category')
+    assert approximate.mode('category') == exact.mode('category')
+
+def test_approximate_value_counts_estimate_high_cardinality():
+    data = pd.DataFrame({'id': pd.Series(np.arange(50_000)).astype(str)})
+    approximate = ApproximateValueCounts(['id'], heavy_hitters_error=0.01)
+    for chunk in _chunks(data, 5):
+        approximate.update(chunk)
+
+    # Evictions can empty every counter, which must not read as "no values"
+    assert approximate.heavy_hitters['id'].evicted
+    assert approximate.cardinality('id') == pytest.approx(50_000, rel=0.04)
+
+    encoder = Encoder(max_onehot_cardinality=50, approximate_statistics={'heavy_hitters_error': 0.01})
+    encoded = encoder.fit(data).transform(data.iloc[:5])
+    # Far too many ids for one-hot, rather than one-hot with a single [None] category
+    assert encoder.fitted_strategies['id'] == 'hashing'
+    assert encoded.shape == (5, encoder.n_hash_features)
+
+def test_pipeline_with_approximate_statistics_and_robust_scaling():
+    rng = np.random.default_rng(4)
+    data = pd.DataFrame({
+        'value': rng.standard_cauchy(2000),
+        'category': rng.choice(['a', 'b', 'c'], 2000).astype(object)
+    })
+
+    # Low-cardinality columns come out of the sketches exactly
+    exact = DataCleaningPipeline().process(data.copy())
+    approximate = DataCleaningPipeline(approximate_statistics={}).process(data.copy())
+    pd.testing.assert_frame_equal(approximate, exact)
+
+    robust = DataCleaningPipeline(robust_scaling=True).process(data.copy())
+    expected = RobustScaler().fit_transform(data[['value']]).ravel()
+    np.testing.assert_allclose(robust['value'].to_numpy(), expected)
+
+    fused = DataCleaningPipeline(robust_scaling=True, fused=True).process(data.copy())
+    pd.testing.assert_frame_equal(fused, robust)
+
+def test_unknown_approximate_statistics_option_raises():
+    with pytest.raises(ValueError, match="Unknown approximate statistics options"):
+        DataCleaningPipeline(approximate_statistics={'heavy_hitter_error': 0.01})
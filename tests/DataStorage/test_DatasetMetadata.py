@@ -1,13 +1,13 @@
+import numpy as np
 import pytest
 import json
 import os
-from unittest.mock import patch, mock_open
 from DataStorage.DatasetMetadata import DatasetMetadata
 
 
 @pytest.fixture
-def mock_metadata_file():
-    """Fixture to create a mock metadata file."""
+def mock_metadata_file(tmp_path, monkeypatch):
+    """Fixture to create a metadata file with two datasets."""
     mock_data = {
         "datasets": [
             {
@@ -28,9 +28,11 @@ def mock_metadata_file():
             }
         ]
     }
-    mock_data_str = json.dumps(mock_data)
-    with patch("builtins.open", mock_open(read_data=mock_data_str)):
-        yield DatasetMetadata.METADATA_FILE
+    # A real file rather than a patched open, since saving the embedding index renames its files into place
+    metadata_file = tmp_path / "metadata.json"
+    metadata_file.write_text(json.dumps(mock_data))
+    monkeypatch.setattr(DatasetMetadata, "METADATA_FILE", str(metadata_file))
+    return DatasetMetadata.METADATA_FILE
 
 
 @pytest.fixture
@@ -95,4 +97,145 @@ def test_list_datasets(mock_metadata_file):
     datasets = DatasetMetadata.list_datasets()
     assert len(datasets) == 2
     assert datasets[0]["id"] == "dataset_1"
-    assert datasets[1]["id"] == "dataset_2"
\ No newline at end of file
+    assert datasets[1]["id"] == "dataset_2"
+
+class FakeSimilarityModel:
+    """Bag-of-words embeddings so search tests need no model download."""
+
+    def __init__(self, dimension=64):
+        self.dimension = dimension
+        self.encoded = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=False):
+        self.encoded.append(list(texts))
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().replace(".", " ").split():
+                vectors[row, sum(word.encode()) % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+
+@pytest.fixture
+def fake_similarity_model(monkeypatch):
+    model = FakeSimilarityModel()
+    monkeypatch.setattr(DatasetMetadata, "similarity_model", model)
+    monkeypatch.setattr(DatasetMetadata, "_embedding_index", None)
+    return model
+
+
+def test_search_top_k_embeds_each_description_once(set_metadata_path, fake_similarity_model):
+    """Descriptions are embedded when added and persisted, queries only embed the query."""
+    for dataset_id, description in [("nba", "NBA player stats per season"),
+                                    ("stocks", "Daily stock prices and trading volumes"),
+                                    ("weather", "Hourly weather observations by city")]:
+        DatasetMetadata.add_dataset({"id": dataset_id, "description": description,
+                                     "data_source": "api", "data_link": f"https://example.com/{dataset_id}"})
+    assert os.path.exists(DatasetMetadata.embedding_index_path() + ".npy")
+    fake_similarity_model.encoded.clear()
+
+    matches = DatasetMetadata.search_top_k("stock prices", top_k=2)
+
+    assert [dataset["id"] for dataset, _ in matches][0] == "stocks"
+    assert len(matches) == 2 and matches[0][1] >= matches[1][1]
+    assert fake_similarity_model.encoded == [["stock prices"]]
+
+    # A fresh process loads the persisted matrix instead of re-embedding the catalog
+    DatasetMetadata._embedding_index = None
+    fake_similarity_model.encoded.clear()
+    assert DatasetMetadata.search_by_description("NBA player stats per season")["id"] == "nba"
+    assert fake_similarity_model.encoded == [["NBA player stats per season"]]
+
+
+def test_search_top_k_reembeds_updated_and_externally_added_descriptions(set_metadata_path, fake_similarity_model):
+    """Updated descriptions are re-embedded and datasets missing from the index are embedded in one batch."""
+    DatasetMetadata.save_metadata([
+        {"id": "a", "description": "soccer match results", "data_source": "api", "data_link": "",
+         "date_created": "2024-01-01T00:00:00", "date_modified": "2024-01-01T00:00:00"},
+        {"id": "b", "description": "housing prices by region", "data_source": "api", "data_link": "",
+         "date_created": "2024-01-01T00:00:00", "date_modified": "2024-01-01T00:00:00"}
+    ])
+
+    assert DatasetMetadata.search_top_k("soccer results", top_k=1)[0][0]["id"] == "a"
+    assert sorted(fake_similarity_model.encoded[0]) == ["housing prices by region", "soccer match results"]
+
+    DatasetMetadata.update_dataset("b", {"description": "soccer league table and match results"})
+    matches = DatasetMetadata.search_top_k("soccer league table", top_k=2, min_score=0.0)
+    assert matches[0][0]["id"] == "b"
+
+
+def test_sqlite_backend_keeps_the_class_api(tmp_path, fake_similarity_model, monkeypatch):
+    """A .db metadata file is stored in SQLite behind the same DatasetMetadata calls."""
+    monkeypatch.setattr(DatasetMetadata, "METADATA_FILE", str(tmp_path / "metadata.db"))
+    DatasetMetadata.add_dataset({"id": "nba", "description": "NBA player stats per season",
+                                 "data_source": "api", "data_link": "https://example.com/nba"})
+    DatasetMetadata.add_dataset({"id": "weather", "description": "Hourly weather observations by city",
+                                 "data_source": "webscraping", "data_link": "https://example.com/weather"})
+
+    assert DatasetMetadata.search_by_id("weather")["data_source"] == "webscraping"
+    assert DatasetMetadata.update_dataset("nba", {"data_link": "https://example.com/nba2"})["id"] == "nba"
+    assert DatasetMetadata.search_by_id("nba")["data_link"] == "https://example.com/nba2"
+    assert [dataset["id"] for dataset in DatasetMetadata.list_datasets()] == ["nba", "weather"]
+    assert [dataset["id"] for dataset in DatasetMetadata.find_datasets(data_source="api")] == ["nba"]
+    assert DatasetMetadata.search_top_k("weather by city", top_k=1)[0][0]["id"] == "weather"
+    with pytest.raises(ValueError):
+        DatasetMetadata.add_dataset({"id": "nba", "description": "", "data_source": "api", "data_link": ""})
+
+
+@pytest.mark.parametrize("file_name", ["metadata.json", "metadata.db", "metadata.jsonl"])
+def test_bulk_apis_write_once_and_embed_in_one_batch(tmp_path, fake_similarity_model, monkeypatch, file_name):
+    """add_datasets, update_datasets and search_by_descriptions embed all their descriptions in one call."""
+    monkeypatch.setattr(DatasetMetadata, "METADATA_FILE", str(tmp_path / file_name))
+    DatasetMetadata.add_datasets([
+        {"id": "nba", "description": "NBA player stats per season", "data_source": "api", "data_link": ""},
+        {"id": "stocks", "description": "Daily stock prices and trading volumes", "data_source": "api", "data_link": ""},
+        {"id": "weather", "description": "Hourly weather observations by city", "data_source": "api", "data_link": ""}
+    ])
+    assert len(fake_similarity_model.encoded) == 1 and len(fake_similarity_model.encoded[0]) == 3
+
+    found = DatasetMetadata.search_by_ids(["weather", "missing", "nba"])
+    assert [dataset and dataset["id"] for dataset in found] == ["weather", None, "nba"]
+
+    updated = DatasetMetadata.update_datasets({"nba": {"description": "Soccer league tables"},
+                                               "stocks": {"data_link": "https://example.com/stocks"},
+                                               "missing": {"description": "Nothing"}})
+    assert [dataset and dataset["id"] for dataset in updated] == ["nba", "stocks", None]
+    assert fake_similarity_model.encoded[1] == ["Soccer league tables"]
+    assert DatasetMetadata.search_by_id("stocks")["data_link"] == "https://example.com/stocks"
+
+    fake_similarity_model.encoded.clear()
+    matches = DatasetMetadata.search_by_descriptions(["Soccer league tables", "Hourly weather observations by city",
+                                                      "quantum chromodynamics"])
+    assert [dataset and dataset["id"] for dataset in matches] == ["nba", "weather", None]
+    assert len(fake_similarity_model.encoded) == 1
+
+
+@pytest.mark.parametrize("file_name", ["metadata.json", "metadata.db"])
+def test_search_hybrid_reranks_lexical_candidates_with_cached_query_embeddings(tmp_path, fake_similarity_model,
+                                                                               monkeypatch, file_name):
+    """Lexical candidates are reranked by embedding, repeated queries are not re-embedded and writes are indexed."""
+    monkeypatch.setattr(DatasetMetadata, "METADATA_FILE", str(tmp_path / file_name))
+    DatasetMetadata.add_datasets([
+        {"id": "nba_player_stats_2023", "description": "NBA player stats for the 2023 season",
+         "data_source": "api", "data_link": ""},
+        {"id": "nba_team_standings", "description": "NBA team standings by season", "data_source": "api", "data_link": ""},
+        {"id": "stock_prices", "description": "Daily stock prices and trading volumes",
+         "data_source": "api", "data_link": ""},
+    ])
+    fake_similarity_model.encoded.clear()
+
+    matches = DatasetMetadata.search_hybrid("NBA player stats 2023", top_k=2)
+    assert [dataset["id"] for dataset, _ in matches] == ["nba_player_stats_2023", "nba_team_standings"]
+    assert matches[0][1] > matches[1][1]
+    # Only the query was embedded; the second search is served from the query cache
+    assert fake_similarity_model.encoded == [["NBA player stats 2023"]]
+    assert DatasetMetadata.search_hybrid("NBA player stats 2023", top_k=2) == matches
+    assert len(fake_similarity_model.encoded) == 1
+
+    # No word in common with any dataset: falls back to a full embedding search
+    assert DatasetMetadata.search_hybrid("volumes traded daily", top_k=1)[0][0]["id"] == "stock_prices"
+
+    DatasetMetadata.update_dataset("stock_prices", {"description": "NBA player salaries"})
+    assert "salaries" in DatasetMetadata.load_lexical_index().postings
+    assert DatasetMetadata.search_hybrid("player salaries", top_k=1)[0][0]["id"] == "stock_prices"
+    assert DatasetMetadata.search_by_description("NBA player stats for the 2023 season")["id"] == "nba_player_stats_2023"
@@ -0,0 +1,45 @@
+from DataStorage.LexicalIndex import LexicalIndex, tokenize
+
+
+DOCUMENTS = {
+    "nba_player_stats_2023": "NBA player stats for the 2023 season",
+    "nba_team_standings": "NBA team standings by season",
+    "premier_league_results": "Premier League match results",
+    "stock_prices": "Daily stock prices and trading volumes",
+}
+
+
+def _index(documents):
+    index = LexicalIndex()
+    index.upsert([f"{doc_id}" for doc_id in documents], [f"{doc_id} {text}" for doc_id, text in documents.items()])
+    return index
+
+
+def test_tokenize_splits_ids_into_words():
+    assert tokenize("nba_player_stats_2023: NBA Player-Stats") == ["nba", "player", "stats", "2023", "nba", "player", "stats"]
+
+
+def test_rare_terms_outrank_common_ones():
+    index = _index(DOCUMENTS)
+    results = index.search("NBA player stats 2023", top_k=3)
+    assert [doc_id for doc_id, _ in results][:2] == ["nba_player_stats_2023", "nba_team_standings"]
+    assert index.search("cricket", top_k=3) == []
+
+
+def test_incremental_updates_match_a_fresh_build():
+    index = _index(DOCUMENTS)
+    assert index.upsert(["stock_prices", "weather"], ["stock_prices Hourly stock quotes", "weather Hourly weather"]) == 2
+    index.remove(["premier_league_results"])
+    # Unchanged texts are not reindexed
+    assert index.upsert(["weather"], ["weather Hourly weather"]) == 0
+
+    documents = dict(DOCUMENTS, stock_prices="Hourly stock quotes", weather="Hourly weather")
+    del documents["premier_league_results"]
+    fresh = _index(documents)
+    assert set(index.postings) == set(fresh.postings) and index.total_length == fresh.total_length
+    for query in ["hourly stock", "nba season", "weather quotes"]:
+        assert index.search(query, top_k=4) == fresh.search(query, top_k=4)
+    assert "league" not in index.postings
+
+    assert index.sync(["weather"], ["weather Hourly weather"])
+    assert len(index) == 1 and not index.sync(["weather"], ["weather Hourly weather"])
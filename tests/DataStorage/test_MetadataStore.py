@@ -0,0 +1,158 @@
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import pytest
+from DataStorage.MetadataStore import (JsonMetadataStore, LogMetadataStore, MetadataStore, SqliteMetadataStore,
+                                      migrate_json_to_sqlite, open_metadata_store)
+
+
+def _dataset(dataset_id, data_source="api", date="2024-01-01T00:00:00"):
+    return {"id": dataset_id, "description": f"Description of {dataset_id}.", "data_source": data_source,
+            "data_link": f"https://example.com/{dataset_id}", "date_created": date, "date_modified": date}
+
+
+def test_open_metadata_store_picks_backend_by_extension(tmp_path):
+    assert isinstance(open_metadata_store(str(tmp_path / "metadata.json")), JsonMetadataStore)
+    assert isinstance(open_metadata_store(str(tmp_path / "metadata.db")), SqliteMetadataStore)
+    assert isinstance(open_metadata_store(str(tmp_path / "metadata.jsonl")), LogMetadataStore)
+
+
+def test_incomplete_backend_fails_on_instantiation(tmp_path):
+    class ReadOnlyStore(MetadataStore):
+        def load_all(self):
+            return []
+
+    with pytest.raises(TypeError):
+        ReadOnlyStore(str(tmp_path / "metadata.txt"))
+
+
+@pytest.mark.parametrize("file_name", ["metadata.json", "metadata.db", "metadata.jsonl"])
+def test_inserting_an_existing_id_raises_and_writes_nothing(tmp_path, file_name):
+    store = open_metadata_store(str(tmp_path / file_name))
+    store.insert(_dataset("a"))
+
+    with pytest.raises(ValueError, match="'a'"):
+        store.insert_many([_dataset("b"), {**_dataset("a"), "description": "Duplicate."}])
+    with pytest.raises(ValueError, match="'c'"):
+        store.insert_many([_dataset("c"), _dataset("c")])
+    assert store.load_all() == [_dataset("a")]
+    assert [dataset["id"] for dataset in open_metadata_store(str(tmp_path / file_name)).load_all()] == ["a"]
+
+
+def test_sqlite_store_uses_wal_and_indexes(tmp_path):
+    store = SqliteMetadataStore(str(tmp_path / "metadata.db"))
+    connection = store.connection()
+    assert connection.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    plan = " ".join(str(row) for row in connection.execute(
+        "EXPLAIN QUERY PLAN SELECT document FROM datasets WHERE data_source = ?", ("api",)))
+    assert "datasets_data_source" in plan
+    plan = " ".join(str(row) for row in connection.execute(
+        "EXPLAIN QUERY PLAN SELECT document FROM datasets WHERE id = ?", ("a",)))
+    assert "INDEX" in plan
+
+
+def test_sqlite_store_reads_and_writes_single_datasets(tmp_path):
+    store = SqliteMetadataStore(str(tmp_path / "metadata.db"))
+    store.insert(_dataset("a"))
+    store.insert({**_dataset("b", "webscraping", "2024-03-01T00:00:00"), "rows": 10})
+    store.update({**_dataset("a"), "description": "Changed."})
+
+    assert store.get("a")["description"] == "Changed."
+    assert store.get("b")["rows"] == 10
+    assert store.get("missing") is None
+    assert [dataset["id"] for dataset in store.find(modified_after="2024-02-01T00:00:00")] == ["b"]
+    with pytest.raises(ValueError):
+        store.insert(_dataset("a"))
+
+
+def test_migrate_json_to_sqlite_is_idempotent(tmp_path):
+    json_path, sqlite_path = tmp_path / "metadata.json", str(tmp_path / "metadata.db")
+    datasets = [_dataset("a"), _dataset("b", "webscraping")]
+    json_path.write_text(json.dumps({"datasets": datasets}))
+
+    assert migrate_json_to_sqlite(str(json_path), sqlite_path) == 2
+    assert migrate_json_to_sqlite(str(json_path), sqlite_path) == 2
+    assert SqliteMetadataStore(sqlite_path).load_all() == datasets
+
+
+def test_json_store_caches_until_another_process_edits_the_file(tmp_path):
+    path = tmp_path / "metadata.json"
+    JsonMetadataStore(str(path)).save_all([{**_dataset("a"), "tags": ["sports"]}, _dataset("b")])
+    store = JsonMetadataStore(str(path))
+
+    assert store.get("a")["description"] == "Description of a."
+    store.get("a")["description"] = "Edited copy."
+    assert store.get("b") is not None and store.get("a")["description"] == "Description of a."
+    assert (store.hits, store.misses) == (3, 1)
+    store.load_all()[0]["tags"].append("edited")
+    store.get_many(["a"])[0]["tags"].append("edited")
+    assert store.get("a")["tags"] == ["sports"]
+
+    script = ("import json, sys; path = sys.argv[1]; data = json.load(open(path)); "
+              "data['datasets'][0]['description'] = 'Rewritten by another process.'; "
+              "json.dump(data, open(path, 'w'))")
+    subprocess.run([sys.executable, "-c", script, str(path)], check=True)
+
+    assert store.get("a")["description"] == "Rewritten by another process."
+    assert store.misses == 2
+    # Writes through the store refresh the cache without a reread
+    store.update({**_dataset("b"), "description": "Updated."})
+    assert store.get("b")["description"] == "Updated."
+    assert store.misses == 2
+
+
+def _register(path, worker, count):
+    store = LogMetadataStore(path, compact_bytes=4096)
+    for i in range(count):
+        store.insert(_dataset(f"worker{worker}_{i}"))
+    store.wait_for_compaction()
+
+
+def test_log_store_replays_only_new_operations(tmp_path):
+    path = str(tmp_path / "metadata.jsonl")
+    writer, reader = LogMetadataStore(path), LogMetadataStore(path)
+    writer.insert(_dataset("a"))
+    writer.insert(_dataset("b"))
+    assert [dataset["id"] for dataset in reader.load_all()] == ["a", "b"]
+
+    writer.update({**_dataset("a"), "description": "Updated."})
+    assert reader.get("a")["description"] == "Updated."
+    assert reader.get("b") is not None
+    assert (reader.hits, reader.misses) == (1, 2)
+
+    # A torn trailing line is ignored until it is complete
+    with open(path, 'a') as file:
+        file.write('{"op": "put", "dataset": {"id": "c"')
+    assert reader.get("c") is None
+
+
+def test_log_store_skips_a_torn_line_followed_by_later_appends(tmp_path):
+    path = str(tmp_path / "metadata.jsonl")
+    store = LogMetadataStore(path)
+    store.insert(_dataset("a"))
+    with open(path, 'a') as file:
+        file.write('{"op": "put", "dataset": {"id": "b"')
+    store.insert(_dataset("c"))
+
+    assert [dataset["id"] for dataset in store.load_all()] == ["a", "c"]
+    assert [dataset["id"] for dataset in LogMetadataStore(path).load_all()] == ["a", "c"]
+
+
+def test_log_store_survives_concurrent_writers_and_compaction(tmp_path):
+    path = str(tmp_path / "metadata.jsonl")
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_register, args=(path, worker, 50)) for worker in range(4)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    store = LogMetadataStore(path)
+    assert len(store.load_all()) == 200
+    assert os.path.exists(store.snapshot_path)
+    assert store.compact()
+    assert os.path.getsize(path) == 0
+    assert len(LogMetadataStore(path).load_all()) == 200
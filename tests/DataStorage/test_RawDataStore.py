@@ -0,0 +1,131 @@
+import json
+import os
+import pandas as pd
+import pytest
+from common.DataRequirements import DataRequirements
+from DataStorage.DatasetMetadata import DatasetMetadata
+from DataStorage.RawDataStore import RawDataStore, json_to_frame, parse_timeframe
+
+
+@pytest.fixture
+def games_file(tmp_path):
+    records = [{"team": team, "date": f"{year}-0{month}-15", "points": points, "box": {"q1": 20}}
+               for year, team, month, points in [(2022, "Lakers", 1, 101), (2023, "Lakers", 2, 110),
+                                                 (2023, "Celtics", 3, 99), (2024, "Lakers", 4, 120)]]
+    path = tmp_path / "games.json"
+    path.write_text(json.dumps(records))
+    return str(path)
+
+
+def test_parse_timeframe():
+    assert parse_timeframe("2023") == (pd.Timestamp("2023-01-01"), pd.Period("2023", "Y").end_time)
+    assert parse_timeframe("seasons 2019-2021")[1].year == 2021
+    assert parse_timeframe("2023-01-01 to 2023-03-31")[0] == pd.Timestamp("2023-01-01")
+    assert parse_timeframe("last season") is None
+
+
+def test_json_is_converted_once_and_again_after_it_changes(games_file):
+    store = RawDataStore()
+    store.read(games_file)
+    schema = os.path.join(store.columnar_path(games_file), "schema.json")
+    converted_at = os.stat(schema).st_mtime_ns
+    store.read(games_file)
+    assert os.stat(schema).st_mtime_ns == converted_at
+
+    with open(games_file, 'w') as file:
+        json.dump([{"team": "Knicks", "date": "2025-01-01", "points": 90, "box": None}], file)
+    assert store.read(games_file)["team"].tolist() == ["Knicks"]
+
+
+def test_filters_and_timeframe_are_pushed_down(games_file):
+    data = RawDataStore().read(games_file, columns=["points", "box"], filters={"Team": "lakers", "venue": "home"},
+                               timeframe="2023")
+    assert data.to_dict("records") == [{"points": 110, "box": '{"q1": 20}'}]
+
+
+def test_json_to_frame_accepts_column_dicts():
+    assert json_to_frame({"data": {"a": [1, 2], "b": ["x", "y"]}}).shape == (2, 2)
+    with pytest.raises(ValueError):
+        json_to_frame({"a": 1})
+
+
+def test_read_raw_data_uses_requirements(games_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(DatasetMetadata, "METADATA_FILE", str(tmp_path / "metadata.json"))
+    DatasetMetadata.save_metadata([{"id": "games", "description": "NBA games", "data_source": "local",
+                                    "data_link": games_file, "date_created": "", "date_modified": ""}])
+    requirements = DataRequirements(timeframe="2023-2024", filters={"team": "Lakers"})
+    data = DatasetMetadata.read_raw_data("games", columns=["date", "points"], requirements=requirements)
+    assert data["points"].tolist() == [110, 120]
+    assert DatasetMetadata.read_raw_data("missing") is None
+
+
+@pytest.mark.parametrize("extension", [".json", ".csv", ".jsonl"])
+def test_iter_chunks_streams_filtered_chunks(tmp_path, extension):
+    data = pd.DataFrame({"team": ["Lakers", "Celtics"] * 50, "season": [2022] * 50 + [2023] * 50,
+                         "points": range(100)})
+    path = str(tmp_path / f"games{extension}")
+    if extension == ".json":
+        data.to_json(path, orient="records")
+    elif extension == ".csv":
+        data.to_csv(path, index=False)
+    else:
+        data.to_json(path, orient="records", lines=True)
+
+    chunks = list(RawDataStore().iter_chunks(path, chunk_rows=30, columns=["points"], filters={"team": "Lakers"},
+                                             timeframe="2023"))
+    assert all(len(chunk) <= 30 and list(chunk.columns) == ["points"] for chunk in chunks)
+    expected = data[(data["team"] == "Lakers") & (data["season"] == 2023)]
+    assert pd.concat(chunks)["points"].tolist() == expected["points"].tolist()
+    assert pd.concat(chunks).index.tolist() == expected.index.tolist()
+
+
+def test_pipeline_and_validator_consume_iter_raw_data(games_file, tmp_path, monkeypatch):
+    from DataCleaning.DataCleaningPipeline import DataCleaningPipeline
+    from DataCollection.DataValidator import DataValidator
+
+    monkeypatch.setattr(DatasetMetadata, "METADATA_FILE", str(tmp_path / "metadata.json"))
+    DatasetMetadata.save_metadata([{"id": "games", "description": "NBA games", "data_source": "local",
+                                    "data_link": games_file, "date_created": "", "date_modified": ""}])
+    assert DataValidator().validate_stream(DatasetMetadata.iter_raw_data("games", chunk_rows=3)) == \
+        (True, "Validation passed: 4 rows, 4 columns.")
+    assert DataValidator().validate_stream(DatasetMetadata.iter_raw_data("missing"))[0] is False
+
+    columns = ["team", "points"]
+    streamed = DataCleaningPipeline().fit_stream(DatasetMetadata.iter_raw_data("games", chunk_rows=3, columns=columns))
+    in_memory = DataCleaningPipeline().fit(DatasetMetadata.read_raw_data("games", columns=columns))
+    cleaned = pd.concat(streamed.transform_stream(DatasetMetadata.iter_raw_data("games", chunk_rows=3,
+                                                                                columns=columns)))
+    pd.testing.assert_frame_equal(cleaned.reset_index(drop=True), in_memory.transform(
+        DatasetMetadata.read_raw_data("games", columns=columns)).reset_index(drop=True), check_dtype=False)
+
+
+@pytest.mark.parametrize("records, expected_points", [
+    # "2022-23" does not parse as a date, so the season is not guessed at and no row is dropped
+    ([{"team": "LAL", "season": "2022-23", "points": 101}, {"team": "BOS", "season": "2022-23", "points": 99}], [101]),
+    # A weekday is not a date; the game date is
+    ([{"team": "LAL", "weekday": "Monday", "game_date": "2022-01-03", "points": 101},
+      {"team": "LAL", "weekday": "Friday", "game_date": "2023-03-03", "points": 110}], [110]),
+    # Nor is a birthday the time of the record
+    ([{"team": "LAL", "birthday": "1984-12-30", "points": 101}], [101]),
+])
+def test_timeframe_is_only_pushed_down_to_date_columns(tmp_path, records, expected_points):
+    path = tmp_path / "games.json"
+    path.write_text(json.dumps(records))
+    data = RawDataStore().read(str(path), filters={"team": "LAL"}, timeframe="2023")
+    assert data["points"].tolist() == expected_points
+
+
+def test_csv_chunks_share_the_sample_dtypes(tmp_path):
+    # A missing integer past the sample
+    data = pd.DataFrame({"points": range(1500), "win": [True, False] * 750})
+    path = str(tmp_path / "games.csv")
+    data.to_csv(path, index=False)
+    with open(path) as file:
+        lines = file.read().splitlines()
+    lines[1201] = ",True"
+    with open(path, 'w') as file:
+        file.write("\n".join(lines) + "\n")
+
+    chunks = list(RawDataStore().iter_chunks(path, chunk_rows=500))
+    assert [chunk.dtypes.tolist() for chunk in chunks] == [chunks[0].dtypes.tolist()] * 3
+    assert pd.isna(chunks[2].loc[1200, "points"]) and chunks[2].loc[1201, "points"] == 1201
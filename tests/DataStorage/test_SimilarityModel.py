@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError
+
+import numpy as np
+import pytest
+from DataStorage.SimilarityModel import EmbeddingClient, EmbeddingWorker, SimilarityModel
+
+
+class LengthModel:
+    """Embeds each sentence as [length, word count]."""
+
+    def encode(self, sentences, **kwargs):
+        return np.array([[len(sentence), len(sentence.split())] for sentence in sentences], dtype=np.float32)
+
+
+def slow_loader(model_name):
+    time.sleep(0.05)
+    return LengthModel()
+
+
+def test_model_is_loaded_once_across_threads():
+    calls = []
+
+    def loader(model_name):
+        calls.append(model_name)
+        return slow_loader(model_name)
+
+    model = SimilarityModel("test-model", loader=loader)
+    assert not model.is_loaded
+    threads = [threading.Thread(target=model.encode, args=(["a b"],)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["test-model"]
+    np.testing.assert_array_equal(model.encode(["a b"]), [[3, 2]])
+
+
+def test_warm_up_loads_in_the_background():
+    model = SimilarityModel("test-model", loader=slow_loader)
+    model.warm_up().join()
+    assert model.is_loaded
+
+
+def test_importing_dataset_metadata_does_not_load_the_model():
+    src = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+    code = ("import sys; from DataStorage.DatasetMetadata import DatasetMetadata; "
+            "print('sentence_transformers' in sys.modules, DatasetMetadata.similarity_model.is_loaded)")
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(src))
+    output = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["False", "False"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="the worker process relies on fork")
+def test_embedding_worker_serves_encode_requests():
+    worker = EmbeddingWorker("test-model", loader=slow_loader)
+    worker.start()
+    try:
+        client = worker.client()
+        np.testing.assert_array_equal(client.encode(["one", "two words"]), [[3, 1], [9, 2]])
+    finally:
+        worker.stop()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="the worker process relies on fork")
+def test_embedding_worker_rejects_clients_without_its_key():
+    worker = EmbeddingWorker("test-model", loader=slow_loader)
+    other = EmbeddingWorker("test-model", loader=slow_loader)
+    assert worker.authkey != other.authkey and len(worker.authkey) == 32
+    worker.start()
+    try:
+        with pytest.raises(AuthenticationError):
+            EmbeddingClient(worker.address, b'embeddings').encode(["one"])
+        # The worker keeps serving clients that have the key
+        np.testing.assert_array_equal(worker.client().encode(["one"]), [[3, 1]])
+    finally:
+        worker.stop()
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+from DataStorage.EmbeddingIndex import EmbeddingIndex
+from DataStorage.VectorIndex import BruteForceIndex, IVFIndex, VectorIndex, VectorStore
+
+
+def _clustered_vectors(rows, dimension=32, clusters=20, seed=0):
+    """Unit vectors scattered around a few directions, like embeddings of related descriptions."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    vectors = centers[rng.integers(clusters, size=rows)] + 0.5 * rng.normal(size=(rows, dimension))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _exact(vectors, query, top_k):
+    scores = vectors @ query
+    return list(np.argsort(-scores, kind='stable')[:top_k])
+
+
+def test_brute_force_matches_exact_search_after_inserts_and_deletes():
+    vectors = _clustered_vectors(500)
+    keys = [f"d{i}" for i in range(len(vectors))]
+    index = BruteForceIndex()
+    index.add(keys[:300], vectors[:300])
+    index.add(keys[300:], vectors[300:])
+    index.remove(keys[::2])
+    # Replacing an existing key overwrites its vector
+    index.add([keys[1]], vectors[:1])
+
+    expected = vectors.copy()
+    expected[1] = vectors[0]
+    remaining = np.arange(1, len(vectors), 2)
+    query = vectors[7]
+    result = index.search(query, 5)
+    assert [key for key, _ in result] == [keys[i] for i in remaining[_exact(expected[remaining], query, 5)]]
+    assert len(index) == len(remaining)
+    assert keys[0] not in index and keys[1] in index
+
+
+@pytest.mark.parametrize("quantization, tolerance", [('float16', 1e-3), ('int8', 2e-2)])
+def test_quantized_scores_are_close_to_float32(quantization, tolerance):
+    vectors = _clustered_vectors(200)
+    store = VectorStore(quantization)
+    store.add([str(i) for i in range(len(vectors))], vectors)
+    np.testing.assert_allclose(store.scores(vectors[0]), vectors @ vectors[0], atol=tolerance)
+    assert store.nbytes < vectors.nbytes
+
+
+def test_ivf_recall_against_brute_force():
+    vectors = _clustered_vectors(5000)
+    keys = [f"d{i}" for i in range(len(vectors))]
+    index = IVFIndex(n_probe=8, train_size=1000)
+    for start in range(0, len(vectors), 500):
+        index.add(keys[start:start + 500], vectors[start:start + 500])
+    assert index.centroids is not None
+
+    queries = _clustered_vectors(50, seed=1)
+    hits = 0
+    for query in queries:
+        expected = {keys[i] for i in _exact(vectors, query, 10)}
+        hits += len(expected & {key for key, _ in index.search(query, 10)})
+    assert hits / (10 * len(queries)) >= 0.9
+
+
+def test_ivf_deletes_and_updates_after_training():
+    vectors = _clustered_vectors(3000)
+    keys = [f"d{i}" for i in range(len(vectors))]
+    index = IVFIndex(train_size=1000)
+    index.add(keys, vectors)
+    index.remove(keys[:10])
+    assert len(index) == 2990
+    assert keys[0] not in index
+    assert keys[0] not in {key for key, _ in index.search(vectors[0], 20)}
+
+    # Moving a vector finds it under its new position
+    index.add([keys[100]], -vectors[500:501])
+    assert index.search(-vectors[500], 1)[0][0] == keys[100]
+    assert len(index) == 2990
+
+
+def test_embedding_index_round_trips_through_ivf(tmp_path):
+    vectors = _clustered_vectors(100)
+    ids = [f"d{i}" for i in range(len(vectors))]
+    descriptions = [f"description {i}" for i in range(len(vectors))]
+    path = str(tmp_path / "metadata.embeddings")
+
+    index = EmbeddingIndex(path, "model", IVFIndex(train_size=50))
+    assert index.upsert(ids, descriptions, lambda texts: vectors[[int(text.split()[1]) for text in texts]]) == 100
+    index.save()
+
+    loaded = EmbeddingIndex.load(path, "model", BruteForceIndex())
+    assert sorted(loaded.ids) == sorted(ids)
+    assert loaded.is_current("d3", "description 3")
+    assert loaded.search(vectors[3], 1)[0][0] == "d3"
+
+
+def test_ivf_centroids_are_cluster_means_when_trailing_clusters_are_empty():
+    nearby = np.array([[1, 0.2, 0], [1, 0, 0.2], [1, -0.2, 0]], dtype=np.float32)
+    nearby /= np.linalg.norm(nearby, axis=1, keepdims=True)
+    # Duplicate starting centroids leave the last clusters without members
+    vectors = np.vstack([nearby, np.tile(np.float32([[0, 1, 0]]), (5, 1))])
+    index = IVFIndex(n_lists=4, train_size=len(vectors), kmeans_iterations=1)
+    index.add([f"d{i}" for i in range(len(vectors))], vectors)
+
+    mean = nearby.sum(axis=0) / np.linalg.norm(nearby.sum(axis=0))
+    assert np.isclose(index.centroids @ mean, 1).any()
+    assert np.isclose(index.centroids @ np.float32([0, 1, 0]), 1).any()
+
+
+@pytest.mark.parametrize("index", [BruteForceIndex(), BruteForceIndex('int8'),
+                                   IVFIndex(n_lists=8, train_size=256, quantization='float16')])
+def test_score_ranks_only_the_given_keys(index):
+    vectors = _clustered_vectors(1000)
+    keys = [f"d{i}" for i in range(len(vectors))]
+    index.add(keys, vectors)
+    candidates = keys[100:150] + ["missing"]
+    query = vectors[120]
+
+    scores = dict(index.score(query, candidates))
+    assert set(scores) == set(keys[100:150])
+    ranked = [key for key, _ in index.score(query, candidates)]
+    assert ranked[0] == "d120"
+    assert np.allclose([scores[key] for key in keys[100:150]], vectors[100:150] @ query, atol=2e-2)
+
+
+def test_incomplete_index_fails_on_instantiation():
+    class AddOnlyIndex(VectorIndex):
+        def add(self, keys, vectors):
+            pass
+
+    with pytest.raises(TypeError):
+        AddOnlyIndex()
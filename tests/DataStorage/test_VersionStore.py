@@ -0,0 +1,75 @@
+import os
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from DataStorage.DatasetMetadata import DatasetMetadata
+from DataStorage.VersionStore import VersionStore
+
+
+def _games(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"game": np.arange(rows), "team": rng.choice(["Lakers", "Celtics", "Knicks"], rows),
+                         "points": rng.integers(80, 130, rows)})
+
+
+def test_versions_share_unchanged_chunks(tmp_path):
+    store = VersionStore(str(tmp_path), average_chunk_rows=64)
+    data = _games(5000)
+    assert store.commit("games", data) == 1
+    size = store.nbytes
+
+    # Insert a few rows in the middle and edit one value: only the chunks around the edits change
+    edited = pd.concat([data.iloc[:2000], _games(10, seed=1), data.iloc[2000:]], ignore_index=True)
+    edited.loc[4000, "points"] = 0
+    assert store.commit("games", edited) == 2
+
+    diff = store.diff("games", 1)
+    assert diff["new_rows"] == 5010 and diff["old_rows"] == 5000
+    assert diff["chunks_shared"] > 0.9 * (diff["chunks_shared"] + diff["chunks_added"])
+    assert 10 <= diff["rows_added"] < 0.1 * 5010
+    assert store.nbytes - size < 0.2 * size
+    pd.testing.assert_frame_equal(store.read("games", 1), data)
+    pd.testing.assert_frame_equal(store.read("games"), edited)
+
+
+def test_retention_and_garbage_collection(tmp_path):
+    store = VersionStore(str(tmp_path), average_chunk_rows=64)
+    for seed in range(3):
+        store.commit("games", _games(1000, seed=seed))
+    assert store.apply_retention("games", keep_last=1, keep_within=timedelta(0)) == [1, 2]
+    assert store.versions("games") == [3]
+    # Chunks written moments ago are protected by the grace period
+    assert store.collect_garbage() == 0
+    assert store.collect_garbage(grace_seconds=0) > 0
+    pd.testing.assert_frame_equal(store.read("games"), _games(1000, seed=2))
+    with pytest.raises(ValueError):
+        store.read("games", 1)
+
+
+def test_commit_raw_data_records_the_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(DatasetMetadata, "METADATA_FILE", str(tmp_path / "metadata.json"))
+    DatasetMetadata.save_metadata([{"id": "games", "description": "NBA games", "data_source": "local",
+                                    "data_link": "", "date_created": "", "date_modified": ""}])
+    DatasetMetadata.commit_raw_data("games", _games(300))
+    assert DatasetMetadata.commit_raw_data("games", _games(300).iloc[:200]) == 2
+    assert DatasetMetadata.search_by_id("games")["version"] == 2
+    assert DatasetMetadata.diff_raw_data("games", 1)["new_rows"] == 200
+    assert os.path.isdir(str(tmp_path / "metadata.versions"))
+
+
+def test_commit_hashes_nested_values(tmp_path):
+    store = VersionStore(str(tmp_path), average_chunk_rows=64)
+    data = pd.DataFrame({"game": [1, 2], "box_score": [{"points": 101}, [3, 4]]})
+    assert store.commit("games", data) == 1
+    assert store.commit("games", data) == 2
+    assert store.diff("games", 1)["chunks_added"] == 0
+    pd.testing.assert_frame_equal(store.read("games"), data)
+
+
+@pytest.mark.parametrize("dataset_id", ["../../outside", "nested/games", "..", ""])
+def test_dataset_ids_cannot_leave_the_root(tmp_path, dataset_id):
+    store = VersionStore(str(tmp_path / "store"))
+    with pytest.raises(ValueError):
+        store.commit(dataset_id, _games(10))
+    assert os.listdir(str(tmp_path)) == []